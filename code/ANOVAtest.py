@@ -9,6 +9,7 @@ The purpose is to test if there are any statistically significant differences be
 Dependencies:
 - SciPy for statistical calculations
 - pandas for data manipulation
+- Streaming_ANOVA, which accumulates the count, mean and M2 of each group chunk by chunk instead of holding all the values
 
 Functions:
 - flatten(matrix): Flattens a 2D matrix into a 1D list
@@ -17,7 +18,7 @@ Functions:
 Usage:
 1. Ensure that you have the required libraries installed.
 2. Place the CSV file of the experiment in the same directory as this script.
-3. Run the script.
+3. Run the script. Importing it only defines the functions.
 
 Example:
 An example is provided within the script to demonstrate its usage. Uncomment it to see how it works.
@@ -27,34 +28,41 @@ __author__ = 'ANQI WANG (aw222@ic.ac.uk)'
 __version__ = '0.0.1'
 __license__ = "None"
 
-from scipy import stats  # Import stats module from scipy library for statistical calculations
-import pandas as pd  # Import pandas library for data manipulation
+from itertools import chain  # For joining the rows of a matrix
+import numpy as np  # Import numpy library for array conversion
+import Streaming_ANOVA  # One-way ANOVA over the groups, one chunk at a time
 
 # Define a function to flatten a 2D matrix into a 1D list
 def flatten(matrix):
     '''
     Flatten a 2D matrix into a 1D list
     '''
-    result = []
-    for sublist in matrix:
-        result += sublist  # Append each element of the sublist to the result list
-    return result
+    return list(chain.from_iterable(matrix))  # Join the rows in one pass, without rebuilding the list for each row
 
 # Define a function to perform ANOVA on multiple matrices
 def ANOVA(*matrixs):
     '''
     Take the final results of growth count matrices and perform ANOVA analysis on multiple matrices
     '''
-    flatten_matrixs = []
-    for matrix in matrixs:
-        # Flatten each matrix into a 1D list and store in a new variable
-        flatten_matrixs.append(flatten(matrix))
-    anova_table = stats.f_oneway(*flatten_matrixs)  # Perform one-way ANOVA
+    anova = Streaming_ANOVA.OnewayANOVA()
+    for i, matrix in enumerate(matrixs):
+        # Add the values of each matrix as one group, without flattening it into a list
+        anova.add(i, np.asarray(matrix, dtype=float))
+    anova_table = anova.result()  # Perform one-way ANOVA, same F and p-value as scipy.stats.f_oneway
     print(anova_table)  # Directly print the result
+    return anova_table
 
-# Read experimental data from a CSV file
-data1 = pd.read_csv('ExperimentName.csv')  
-ANOVA(data1)
+def main():
+    '''
+    Read the experimental data from a CSV file and perform ANOVA analysis on it
+    '''
+    # pandas is only needed here, so it is not loaded with the module
+    import pandas as pd
+    data1 = pd.read_csv('ExperimentName.csv')  
+    ANOVA(data1)
+
+if __name__ == "__main__":
+    main()
 
 # Test code:
 # Define example data for groups
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+
+"""
+This Python script, 'Animation.py', writes the weeks of a run into one animated GIF or one multipage PDF, a frame at a time, while the simulation runs.
+
+Each frame is encoded and written to the file as soon as it is appended, and then dropped, so the memory used stays the same however many weeks are run, and no PNG file is written in between. The frames can be the state arrays of the CA, drawn with the black, gray and white palette of 'Rendering', or any PIL image (e.g. a PNG opened from disk, see 'png2gif.py' and 'SavingPlot.py').
+
+1. GIF: The header and the palette are written with the first frame, and every frame after it is LZW-encoded on its own with the GIF plugin of Pillow. The states share the global palette; other images get a palette of their own.
+
+2. PDF: The first frame creates the file, and every later frame is added as a new page with Pillow's incremental PDF update (append=True).
+
+Usage:
+    ca = CA_Model.CA(100, 100, plot_results=False, animation='../results/ClGS_output.gif')
+    ca.evolution(260)
+
+    with AnimationWriter('../results/RIS_output.pdf') as pdf:
+        for name in png_files:
+            with Image.open(name) as image:
+                pdf.append(image)
+"""
+
+__appname__ = 'Animation'
+__author__ = 'ANQI WANG (aw222@ic.ac.uk)'
+__version__ = '0.0.1'
+__license__ = "None"
+
+import os
+
+import numpy as np
+from PIL import GifImagePlugin, Image
+
+import Rendering
+
+
+class AnimationWriter:
+    """
+    This class appends frames to a GIF or a multipage PDF, one at a time.
+
+    Args:
+        path (str): The file to write, ending with '.gif' or '.pdf'. An existing file is replaced.
+        duration (int): The time each frame of a GIF is shown, in milliseconds.
+        loop (int): The number of times a GIF is played, 0 for ever.
+        scale (int): The number of pixels of each side of a cell, for state frames.
+        resolution (float): The resolution of the pages of a PDF, in dots per inch.
+    """
+    def __init__(self, path, duration=300, loop=0, scale=1, resolution=72.0):
+        self.format = os.path.splitext(path)[1].lower()
+        if self.format not in ('.gif', '.pdf'):
+            raise ValueError(f"Unknown animation format '{self.format}', expected '.gif' or '.pdf'")
+        self.path = path
+        self.duration = duration
+        self.loop = loop
+        self.scale = scale
+        self.resolution = resolution
+        self.frames = 0
+        self._file = None
+        if os.path.exists(path):
+            os.remove(path)
+
+    def _image(self, frame):
+        # A state array is drawn with the palette of Rendering, an image is used as it is
+        if isinstance(frame, np.ndarray):
+            return Rendering.state_image(frame, self.scale), False
+        if self.format == '.gif' and frame.mode != 'P':
+            frame = frame.convert('RGB').convert('P', palette=Image.Palette.ADAPTIVE)
+        return frame, True
+
+    def append(self, frame):
+        """
+        Write one more frame.
+
+        Args:
+            frame (numpy array or PIL.Image): The coded states of the cells (as in CA.state), or an image.
+        """
+        image, own_palette = self._image(frame)
+        if self.format == '.pdf':
+            image.save(self.path, resolution=self.resolution, append=self.frames > 0)
+        else:
+            if self._file is None:
+                self._file = open(self.path, 'wb')
+                # getheader may change the image it is given
+                header, _ = GifImagePlugin.getheader(image.copy(), None, {'loop': self.loop, 'optimize': False})
+                self._file.writelines(header)
+            self._file.writelines(GifImagePlugin.getdata(image, duration=self.duration, include_color_table=own_palette))
+            self._file.flush()
+        self.frames += 1
+
+    def close(self):
+        if self._file is not None:
+            # The trailer of the GIF
+            self._file.write(b';')
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
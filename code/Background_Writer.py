@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+
+"""
+This Python script, 'Background_Writer.py', runs the slow output of a simulation (writing snapshots to disk, rendering frames) in background threads, so that the simulation can go on with the next week in the meantime.
+
+The simulation hands each task to a 'BackgroundWriter' with 'submit'. The tasks wait in a bounded queue until a worker thread picks them up. When the queue is full, 'submit' blocks until a worker has taken a task (back-pressure), so a disk that cannot keep up slows the simulation down instead of filling the memory with pending snapshots. The data handed over must not be changed by the simulation afterwards, so pass copies of arrays that are updated in place.
+
+When the writer is closed, it waits for the pending tasks and returns a 'WriterReport': how long the workers were busy, how long the simulation waited for them, and how much of the work was overlapped with the simulation.
+
+Usage:
+    writer = BackgroundWriter(max_pending=4)
+    for m in range(num_of_weeks):
+        ...
+        writer.submit(store.append, ca.state.copy(), ca.grid.copy())
+    print(writer.close())
+"""
+
+__appname__ = 'Background_Writer'
+__author__ = 'ANQI WANG (aw222@ic.ac.uk)'
+__version__ = '0.0.1'
+__license__ = "None"
+
+import queue
+import threading
+import time
+from collections import namedtuple
+
+
+class WriterReport(namedtuple('WriterReport', ['tasks', 'busy', 'waited', 'overlapped'])):
+    """
+    The time spent by a BackgroundWriter, in seconds.
+
+    tasks: The number of tasks run.
+    busy: The total time the workers spent running tasks.
+    waited: The time the simulation was blocked, on a full queue or waiting for the last tasks at the end.
+    overlapped: The part of the busy time that ran while the simulation went on (busy - waited, at least 0).
+    """
+    def __str__(self):
+        share = self.overlapped / self.busy * 100 if self.busy else 100
+        return (f"{self.tasks} background tasks: {self.busy:.2f} s of work, {self.overlapped:.2f} s ({share:.0f}%) "
+                f"overlapped with the simulation, {self.waited:.2f} s waited")
+
+
+class BackgroundWriter:
+    """
+    This class runs tasks in background threads, fed from a bounded queue.
+
+    Args:
+        workers (int): The number of worker threads. With one worker, the tasks run in the order they were submitted.
+        max_pending (int): The number of tasks that can wait in the queue before 'submit' blocks.
+    """
+    def __init__(self, workers=1, max_pending=4):
+        self._queue = queue.Queue(max_pending)
+        self._lock = threading.Lock()
+        self._error = None
+        self.tasks = 0
+        self.busy = 0.0
+        self.waited = 0.0
+        self._threads = [threading.Thread(target=self._work, daemon=True) for _ in range(workers)]
+        for thread in self._threads:
+            thread.start()
+
+    def _work(self):
+        while True:
+            task = self._queue.get()
+            if task is None:
+                return
+            func, args = task
+            start = time.perf_counter()
+            try:
+                # After an error, the remaining tasks are dropped
+                if self._error is None:
+                    func(*args)
+            except BaseException as error:
+                self._error = error
+            finally:
+                with self._lock:
+                    self.tasks += 1
+                    self.busy += time.perf_counter() - start
+
+    def _raise(self):
+        # Raise the error of a failed task in the thread of the simulation
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+
+    def submit(self, func, *args):
+        """
+        Queue func(*args) to be run by a worker, blocking while the queue is full.
+
+        Args:
+            func (callable): The task.
+            *args: Its arguments. They must not be changed after the call.
+        """
+        self._raise()
+        start = time.perf_counter()
+        self._queue.put((func, args))
+        self.waited += time.perf_counter() - start
+
+    def close(self):
+        """
+        Wait for all the queued tasks and stop the workers.
+
+        Returns:
+            WriterReport: The time spent by the workers and by the simulation waiting for them.
+        """
+        start = time.perf_counter()
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+        self.waited += time.perf_counter() - start
+        self._threads = []
+        self._raise()
+        return WriterReport(self.tasks, self.busy, self.waited, max(self.busy - self.waited, 0.0))
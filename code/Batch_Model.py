@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+
+"""
+This Python script, 'Batch_Model.py', advances the growth, nitrogen and phosphorus ODEs of every active cell in the CA grid with a single solver call per day, instead of calling 'Cell.one_cell_run' (and its three 'odeint' solves) once per cell.
+
+The state vectors of all active cells are stacked cell by cell into one long vector. The right-hand sides 'Growth_model_sol', 'Ni_model_sol' and 'P_model_sol' are evaluated once per call on (variables, cells) arrays, and because the cells do not interact, the Jacobian of the stacked system is block diagonal. By default the solver is given the analytic Jacobian of every cell as one sparse block-diagonal matrix ('batch_model_jac'). With jac=False it is given the sparsity pattern instead, so that a finite-difference Jacobian costs a handful of right-hand side evaluations, whatever the number of cells.
+
+The script contains six key functions:
+
+1. 'cell_sparsity': Returns the 10x10 Jacobian sparsity pattern of one cell: a 2x2 growth block, a 4x4 nitrogen block and a 4x4 phosphorus block, in the split and the coupled mode alike (see 'Cell.coupled_model_jac').
+
+2. 'batch_model_sol': The stacked right-hand side for a batch of cells, in the form expected by 'scipy.integrate.solve_ivp'.
+
+3. 'batch_model_jac': The Jacobian of 'batch_model_sol', as a sparse block-diagonal matrix built from 'Growth_model_jac', 'Ni_model_jac' and 'P_model_jac' (or 'Cell.coupled_model_jac').
+
+4. 'batch_run': Runs one time step for a batch of cells, following the same rules as 'Cell.one_cell_run'. With mode='coupled' the cells are solved with 'Cell.coupled_model_sol' instead of the three separate models, one solver call per block of 'Cell.coupled_blocks' with the BDF method, as 'Cell.coupled_model' does for one cell.
+
+5. 'batch_grid_run': Runs one time step for the whole (height, width, 10) CA grid. Only the cells that 'Cell.one_cell_run' would evolve are handed to the solver.
+
+6. 'cells_model_sol': The right-hand side of the batch as a (cells, 10) array, for the explicit Runge-Kutta solvers of 'Runge_Kutta'.
+
+The cells are solved with the implicit BDF method of 'solve_ivp' by default (solver='bdf'). With solver='rk4' or 'dopri5' they are integrated with the batched explicit methods of 'Runge_Kutta' instead: no Jacobian and no linear solves, and with 'dopri5' every cell gets its own step size and error control, so a few fast cells do not set the step of the whole batch.
+
+The coupled mode is a different growth model from the split mode (see 'Cell.coupled_model_sol'), not a faster way to solve it: its growth block, where R follows its own value, is much stiffer than the growth model of the split mode, and a batch takes 4 to 5 times longer to solve (see 'JacobianBenchmark').
+
+All of them take an optional 'bundles' argument, the compiled models from 'Cell.compile_models', used in place of the reference right-hand sides and Jacobians.
+"""
+
+__appname__ = 'Batch_Model'
+__author__ = 'ANQI WANG (aw222@ic.ac.uk)'
+__version__ = '0.0.1'
+__license__ = "None"
+
+from functools import partial
+
+import numpy as np
+from scipy import sparse
+from scipy.integrate import solve_ivp
+
+import Cell
+import Parameters
+import Runge_Kutta
+
+# Number of state variables held by each cell
+NUM_VARS = 10
+# Tolerances used by odeint by default, so the batched engine matches the per-cell solves
+RTOL = 1.49012e-8
+ATOL = 1.49012e-8
+# The solvers of 'batch_run': the BDF method of solve_ivp, or the batched explicit methods of Runge_Kutta
+SOLVERS = ('bdf',) + Runge_Kutta.METHODS
+
+
+def cell_sparsity(mode='split'):
+    """
+    Jacobian sparsity pattern of the 10 variables of one cell.
+
+    Args:
+        mode (str): 'split' or 'coupled', as in 'Cell.one_cell_run'.
+
+    Returns:
+        numpy array (10, 10): 1 where a derivative may depend on a variable, 0 otherwise.
+    """
+    if mode not in ('split', 'coupled'):
+        raise ValueError(f"Unknown mode '{mode}', expected 'split' or 'coupled'")
+    # In the coupled mode every model sees the current values of the others, but the nitrogen and phosphorus equations
+    # ignore them and the growth equations ignore NH4 and NO3, so the pattern is the same (see 'Cell.coupled_model_jac')
+    pattern = np.zeros((NUM_VARS, NUM_VARS), dtype=int)
+    pattern[0:2, 0:2] = 1    # R, Nrint
+    pattern[2:6, 2:6] = 1    # N_org, NH4, NO2, NO3
+    pattern[6:10, 6:10] = 1  # POP, SRP, P_ma_int, P_R_int
+    return pattern
+
+
+def batch_model_sol(t, y, params, mode='split', bundles=None):
+    """
+    Calculate the derivatives of all the cells of a batch at time t.
+
+    Args:
+        t (float): The current time.
+        y (numpy array): The stacked states, cell by cell (R, Nrint, ..., P_R_int of the first cell, then the second cell, ...).
+        params (numpy array (9, n)): The params of each cell, rows 0-3 for 'Growth_model_sol', row 4 for 'Ni_model_sol'
+                                     and rows 5-8 for 'P_model_sol'. Not used in the coupled mode.
+        mode (str): 'split' or 'coupled', as in 'Cell.one_cell_run'.
+        bundles (dict): The compiled models from 'Cell.compile_models', or None to use the reference functions.
+
+    Returns:
+        numpy array: The stacked derivatives, in the same order as y.
+    """
+    cells = y.reshape(-1, NUM_VARS).T
+    if mode == 'coupled':
+        return np.asarray(Cell.coupled_model_sol(cells, t, bundles)).T.ravel()
+    bundles = Cell.model_functions(bundles)
+    du_dt = np.empty_like(cells)
+    du_dt[0:2] = bundles['Growth'][0](cells[0:2], t, params[0:4])
+    du_dt[2:6] = bundles['Ni'][0](cells[2:6], t, params[4])
+    du_dt[6:10] = bundles['P'][0](cells[6:10], t, params[5:9])
+    return du_dt.T.ravel()
+
+
+def cells_model_sol(t, cells, params, mode='split', bundles=None):
+    """
+    Calculate the derivatives of the cells of a batch, in the form expected by 'Runge_Kutta.integrate'.
+
+    Args:
+        t (numpy array (n,)): The current time of each cell.
+        cells (numpy array (n, 10)): The state of each cell.
+        params (numpy array (n, 9)): The params of each cell, the columns as the rows of the params of 'batch_model_sol'.
+        mode (str): 'split' or 'coupled', as in 'Cell.one_cell_run'.
+        bundles (dict): The compiled models from 'Cell.compile_models', or None to use the reference functions.
+
+    Returns:
+        numpy array (n, 10): The derivatives of each cell.
+    """
+    return batch_model_sol(t, cells.ravel(), params.T, mode, bundles).reshape(-1, NUM_VARS)
+
+
+def batch_model_jac(t, y, params, mode='split', bundles=None):
+    """
+    Calculate the Jacobian of batch_model_sol at time t.
+
+    Args:
+        t (float): The current time.
+        y (numpy array): The stacked states, cell by cell.
+        params (numpy array (9, n)): The params of each cell, as in 'batch_model_sol'.
+        mode (str): 'split' or 'coupled', as in 'Cell.one_cell_run'.
+        bundles (dict): The compiled models from 'Cell.compile_models', or None to use the reference functions.
+
+    Returns:
+        scipy sparse matrix: The block-diagonal Jacobian, one 10x10 block per cell.
+    """
+    cells = y.reshape(-1, NUM_VARS).T
+    num_cells = cells.shape[1]
+    if mode == 'coupled':
+        blocks = Cell.coupled_model_jac(cells, t, bundles)
+    else:
+        bundles = Cell.model_functions(bundles)
+        blocks = np.zeros((NUM_VARS, NUM_VARS, num_cells))
+        blocks[0:2, 0:2] = bundles['Growth'][1](cells[0:2], t, params[0:4])
+        blocks[2:6, 2:6] = bundles['Ni'][1](cells[2:6], t, params[4])
+        blocks[6:10, 6:10] = bundles['P'][1](cells[6:10], t, params[5:9])
+    # Move the cell axis first: the block of the i-th cell sits at block row i, block column i
+    blocks = np.moveaxis(blocks, -1, 0)
+    return sparse.bsr_matrix((blocks, np.arange(num_cells), np.arange(num_cells + 1)),
+                             shape=(NUM_VARS * num_cells, NUM_VARS * num_cells))
+
+
+def batch_run(t, cells, mode='split', jac=True, bundles=None, solver='bdf', rtol=RTOL, atol=ATOL):
+    """
+    This function runs one time step for a batch of cells with one solver call.
+
+    Args:
+        t (int): The current time point in the simulation.
+        cells (numpy array (n, 10)): The current state of each cell.
+        mode (str): 'split' or 'coupled', as in 'Cell.one_cell_run'.
+        jac (bool): Whether the solver is given the analytic Jacobian (True) or only its sparsity pattern (False).
+                    Not used by the explicit solvers.
+        bundles (dict): The compiled models from 'Cell.compile_models', or None to use the reference functions.
+        solver (str): 'bdf' (solve_ivp), 'rk4' (fixed steps of Runge_Kutta.RK4_STEP) or 'dopri5' (adaptive steps
+                      for each cell).
+        rtol (float): The relative tolerance of 'bdf' and 'dopri5'.
+        atol (float): The absolute tolerance of 'bdf' and 'dopri5'.
+
+    Returns:
+        numpy array (n, 10): The state of each cell after the time step.
+
+    Note: 'Cell.one_cell_run' feeds the nitrogen and phosphorus models with the R, Nrint, N_org and NH4 that the
+    previous solve has just produced. 'Ni_model_sol' and 'P_model_sol' replace these params with the values from the
+    Parameters module, so here all three models are solved together from the values at the start of the step.
+    """
+    if mode not in ('split', 'coupled'):
+        raise ValueError(f"Unknown mode '{mode}', expected 'split' or 'coupled'")
+    if solver not in SOLVERS:
+        raise ValueError(f"Unknown solver '{solver}', expected one of {SOLVERS}")
+    cells = np.asarray(cells, dtype=float)
+    # If this is the first time step, every cell takes the initial values of the system
+    if t == 0:
+        init = Cell.initial_state(Cell.model_functions(bundles).get('parameters', Parameters))
+        return np.tile(np.asarray(init, dtype=float), (len(cells), 1))
+    if len(cells) == 0:
+        return cells.copy()
+
+    R, Nrint, N_org, NH4, NO2, NO3 = cells[:, 0], cells[:, 1], cells[:, 2], cells[:, 3], cells[:, 4], cells[:, 5]
+    params = np.array([NH4, NO3, R, Nrint,  # Growth_model
+                       R,                   # Ni_model
+                       R, Nrint, N_org, NH4])  # P_model
+    # Each cell is evolved to now_t = t+1, as in 'Cell.one_cell_run'
+    now_t = t + 1
+    if solver != 'bdf':
+        y, _ = Runge_Kutta.integrate(partial(cells_model_sol, mode=mode, bundles=bundles), cells, 0, now_t,
+                                     method=solver, rtol=rtol, atol=atol, args=(params.T,))
+        return y
+    if mode == 'coupled':
+        # One call per independent block, so that the stiff growth block does not set the steps of the others
+        new_cells = cells.copy()
+        for columns, model_sol, model_jac in Cell.coupled_blocks(cells.T, bundles):
+            new_cells[:, columns] = _solve_block(model_sol, model_jac if jac else None, cells[:, columns], now_t,
+                                                 rtol, atol)
+        return new_cells
+    if jac:
+        jac_sparsity = None
+    else:
+        # The cells do not interact, so the Jacobian is block diagonal
+        jac_sparsity = sparse.kron(sparse.identity(len(cells), format='csr'), sparse.csr_matrix(cell_sparsity(mode)))
+    result = solve_ivp(batch_model_sol, (0, now_t), cells.ravel(), method='BDF', t_eval=[now_t],
+                       args=(params, mode, bundles), jac=batch_model_jac if jac else None, jac_sparsity=jac_sparsity,
+                       rtol=rtol, atol=atol)
+    return result.y[:, -1].reshape(-1, NUM_VARS)
+
+
+def _solve_block(model_sol, model_jac, cells, now_t, rtol, atol):
+    # Solve one block of 'Cell.coupled_blocks' for a batch of cells (n, k) from 0 to now_t with the BDF method
+    num_cells, size = cells.shape
+
+    def fun(t, y):
+        return np.asarray(model_sol(y.reshape(num_cells, size).T, t)).T.ravel()
+
+    def jac(t, y):
+        blocks = np.moveaxis(np.asarray(model_jac(y.reshape(num_cells, size).T, t)), -1, 0)
+        return sparse.bsr_matrix((blocks, np.arange(num_cells), np.arange(num_cells + 1)),
+                                 shape=(size * num_cells, size * num_cells))
+
+    jac_sparsity = None
+    if model_jac is None:
+        jac_sparsity = sparse.kron(sparse.identity(num_cells, format='csr'), np.ones((size, size)))
+    result = solve_ivp(fun, (0, now_t), cells.ravel(), method='BDF', t_eval=[now_t],
+                       jac=None if model_jac is None else jac, jac_sparsity=jac_sparsity, rtol=rtol, atol=atol)
+    return result.y[:, -1].reshape(num_cells, size)
+
+
+def batch_grid_run(t, grid, mode='split', jac=True, bundles=None, solver='bdf', rtol=RTOL, atol=ATOL):
+    """
+    This function runs one time step for every cell of the CA grid.
+
+    Args:
+        t (int): The current time point in the simulation.
+        grid (numpy array (height, width, 10)): The current state of every cell.
+        mode (str): 'split' or 'coupled', as in 'Cell.one_cell_run'.
+        jac (bool): Whether the solver is given the analytic Jacobian, as in 'batch_run'.
+        bundles (dict): The compiled models from 'Cell.compile_models', or None to use the reference functions.
+        solver (str): 'bdf', 'rk4' or 'dopri5', as in 'batch_run'.
+        rtol (float): The relative tolerance, as in 'batch_run'.
+        atol (float): The absolute tolerance, as in 'batch_run'.
+
+    Returns:
+        numpy array (height, width, 10): The state of every cell after the time step, with the dtype of 'grid'.
+    """
+    new_grid = grid.copy()
+    if t == 0:
+        active = np.ones(grid.shape[:-1], dtype=bool)
+    else:
+        # If there is no seagrass growth in a cell, no evolution takes place
+        active = grid.all(axis=-1)
+    if active.any():
+        new_grid[active] = batch_run(t, grid[active], mode, jac, bundles, solver, rtol, atol)
+    return new_grid
@@ -1,7 +1,7 @@
 #!/usr/bin/env python3
 
 """
-This Python script defines a Cellular Automaton (CA) for simulating seagrass growth and behavior. The CA is a 2D grid where each cell represents a patch of seabed and contains state variables for seagrass and its environment.
+This Python script defines a Cellular Automaton (CA) for simulating seagrass growth and behavior. The CA is a 2D grid where each cell represents a patch of seabed and contains state variables for seagrass and its environment. The values of the model parameters are held by each CA as an immutable 'Parameters.ModelParameters' (CA(..., parameters=...), built e.g. by 'User_Input'), and handed to the models every week, so CAs with different parameters can run side by side in one process. With CA(..., forcing=Seasonal_Forcing.SeasonalForcing.from_seasons(num_of_weeks)), the parameters follow the seasons, looked up week by week.
 
 The script contains a class 'CA' with the following key methods:
 
@@ -13,9 +13,19 @@ The script contains a class 'CA' with the following key methods:
 
 4. 'evolution': This method runs the simulation for a specified number of time steps. In each time step, it applies the transition rules to each cell, saves the state of the grid, and then calculates and plots the frequency of seagrass presence over the course of the simulation.
 
+The daily ODE step can be run cell by cell with 'Cell.one_cell_run' (engine='cell', the default; with cell_cache=Cell_Cache.CellCache() each group of identical cells is solved once), for the whole grid at once with 'Batch_Model.batch_grid_run' (engine='batch', with the BDF method of solve_ivp or, with solver='rk4' or 'dopri5', the batched explicit Runge-Kutta methods of 'Runge_Kutta')). 'Cell.CellStepper', which follows the trajectory of a cell one day at a time, is not an engine of the CA: one_cell_run re-integrates the stored state of a cell over t+1 time units on day t of the week (35 per week), a stepper integrates one time unit per day, so the two give different trajectories ('StepperComparison' measures how far apart). engine='surrogate' replaces the solves by polynomials fitted to them, with held-out error bounds ('Cell_Surrogate.SurrogateEngine', given as surrogate=...). With steady_state=Steady_State.SteadyStateTracker(tol), the nitrogen and phosphorus models of the cells at their equilibrium are not solved until their parameters or state change. With mode='coupled' the growth, nitrogen and phosphorus models of each cell are solved as one coupled system instead of three chained solves (mode='split', the default). The coupled mode is a different growth model, not a solver option, and gives other results than the split mode: R follows its own value during the solve, which makes the growth model much stiffer, so a step costs about as much as in the split mode with engine='cell' and 4 to 5 times more with engine='batch' (see 'JacobianBenchmark'). With profile='reference', 'balanced' or 'fast' the models are solved with the tolerances, output times and method of that solver profile ('Solver_Profiles'), odeint at its default tolerances if None.
+
+The weekly transition rules are applied cell by cell with 'transition_rule' (transition='sequential', the default), where a change of state is seen by the cells visited after it in the same sweep, or to the whole grid at once with 'synchronous_transition' (transition='synchronous'), where every cell is updated from the states at the start of the week. With transition='frontier' the cell by cell sweep only visits the cells kept in an 'ActiveFrontier' (the occupied cells and their empty neighbours), and the germination of the empty cells away from the seagrass is drawn in bulk. With evolution(..., processes=n) and transition='synchronous' the grid is split into tiles that n worker processes keep for the whole run and run in parallel, exchanging only a halo of one cell around each tile every week for the spread of seagrass (see 'Tiled_CA'). In every mode the daily ODE step only visits the cells with seagrass growth, the only ones that 'Cell.one_cell_run' evolves.
+
+The state of each cell is held in 'CA.state', a uint8 array with the codes Parameters.EMPTY, Parameters.GERMINATING and Parameters.SEAGRASS. 'CA.state_names' gives the same states as the strings 'Empty', 'Germinating' and 'Seagrass', for code written against the older object array.
+
 The simulation considers various environmental factors for seagrass growth, including silt concentration, temperature, depth, salinity, nutrient levels, light conditions, and current velocity. These factors influence the recruitment, germination, growth, and reproduction stages of the seagrass lifecycle.
 
-The grid's state is saved at each step, allowing the user to observe the temporal evolution of the seagrass population.
+The grid's state is saved at each step, allowing the user to observe the temporal evolution of the seagrass population. The weekly snapshots (the state code and the variables of every cell) are appended to one compressed 'Snapshot_Store.SnapshotStore' in the folder given as 'snapshots' (./matrix by default). By default the snapshots are compressed and written by a background thread ('Background_Writer'), while the simulation goes on with the next week.
+
+The weeks can be shown live with 'PlotResult' (plot_results=True, which pauses for half a second every week) and/or drawn without any window into the folder given as 'frames', one 'week_{m}.png' per week, by a pool of rendering threads ('Rendering.FrameRenderer'). The frames are drawn in black (empty), gray (germinating) and white (seagrass), the gray levels read by 'PixcelvsT.py'. With 'animation' set to a '.gif' or '.pdf' file, the same frames are also appended to one animation while the simulation runs ('Animation.AnimationWriter').
+
+With evolution(..., metrics=Metrics.MetricsRecorder(path)), the coverage, germination, recolonization and transitions of every week are computed from the states while the simulation runs and written to one time series file, see 'Metrics'.
 """
 
 __appname__ = 'CA_Model'
@@ -23,14 +33,25 @@ __author__ = 'ANQI WANG (aw222@ic.ac.uk)'
 __version__ = '0.0.1'
 __license__ = "None"
 
-import pickle 
 import numpy as np
 import random
 import Parameters
 import Cell
-import matplotlib.pyplot as plt
+import Batch_Model
+import Tiled_CA
+import Snapshot_Store
+import Background_Writer
+import Solver_Profiles
+# matplotlib, scipy.ndimage and the image modules (Rendering and Animation, which load PIL) are imported where they are
+# used, so that importing this module (e.g. in every worker process of a pool) stays fast
+
+# Weights of the 8 neighbours of a cell in the spread of seagrass
+NEIGHBOURS = np.array([[1, 1, 1],
+                       [1, 0, 1],
+                       [1, 1, 1]], dtype=np.uint8)
 
 def PlotResult(matrix,m):
+    import matplotlib.pyplot as plt
     # plot the heat map
     plt.imshow(matrix, cmap='viridis') # viridis -- for the coloured plot 'Greys_r' for bw
     # add colour bar
@@ -41,6 +62,91 @@ def PlotResult(matrix,m):
     # plt.savefig(f'week={m}.png')
     plt.pause(0.5)
     
+def own_transitions(state, grid, draw, N_threshold, P_threshold, out=None):
+    """
+    Apply the transitions of each cell on its own ('Empty' -> 'Germinating', 'Germinating' -> 'Seagrass' and
+    'Seagrass' -> 'Empty'), as in CA.synchronous_transition, to a whole array of cells.
+
+    Args:
+        state (np.array): The coded states of the cells.
+        grid (np.array): The variables of the cells, with one more axis than state.
+        draw (np.array): One uniform random number per cell.
+        N_threshold (float): The nitrogen needed for an empty cell to germinate.
+        P_threshold (float): The phosphorus needed for an empty cell to germinate.
+        out (np.array): The array to write the new states into, a new one if None.
+
+    Returns:
+        out (np.array): The new states.
+    """
+    if out is None:
+        out = np.empty_like(state)
+    germinating = (state == Parameters.EMPTY) & ~grid.all(axis=-1) & (draw < 0.1) & \
+        (grid[..., Parameters.N_IDX] > N_threshold) & (grid[..., Parameters.P_IDX] > P_threshold)
+    out[...] = state
+    out[germinating] = Parameters.GERMINATING
+    out[(state == Parameters.GERMINATING) & (draw < 0.1)] = Parameters.SEAGRASS
+    out[(state == Parameters.SEAGRASS) & (draw < 0.1)] = Parameters.EMPTY
+    return out
+
+def spread_seagrass(new_state, empty, spread_draw, seagrass=None):
+    """
+    Spread the seagrass of new_state to the cells that were empty, as in CA.synchronous_transition. new_state is changed in place.
+
+    Args:
+        new_state (np.array): The coded states after own_transitions.
+        empty (np.array): Whether each cell was empty before own_transitions.
+        spread_draw (np.array): One uniform random number per cell.
+        seagrass (np.array): Whether each cell holds seagrass after own_transitions, with a border of one cell around
+                             new_state taken from the neighbouring part of the grid. If None, the border is empty.
+
+    Returns:
+        new_state (np.array): The states after the spread.
+    """
+    if seagrass is None:
+        seagrass = np.pad(new_state == Parameters.SEAGRASS, 1)
+    from scipy.ndimage import convolve
+    # Count the seagrass neighbours of every cell with one convolution, then drop the border
+    count = convolve(seagrass.astype(np.uint8), NEIGHBOURS, mode='constant', cval=0)[1:-1, 1:-1]
+    new_state[empty & (spread_draw < 1 - 0.8 ** count)] = Parameters.GERMINATING
+    return new_state
+
+class ActiveFrontier:
+    """
+    This class keeps the index of the cells of a CA that the weekly transition sweep has to visit: the occupied cells
+    (not Parameters.EMPTY) and the empty cells next to them. The other empty cells can only germinate on their own,
+    which does not depend on their neighbours.
+
+    The index is built once from the state array and then updated with 'update' each time a cell changes from or to
+    Parameters.EMPTY, by adjusting the number of occupied neighbours of the 8 cells around it.
+
+    Args:
+        state (np.array): The coded states of the cells, as in CA.state.
+    """
+    def __init__(self, state):
+        # Whether each cell is occupied, and how many of its 8 neighbours are
+        self.occupied = state != Parameters.EMPTY
+        from scipy.ndimage import convolve
+        self.count = convolve(self.occupied.astype(np.int16), NEIGHBOURS.astype(np.int16), mode='constant', cval=0)
+
+    def update(self, x, y, old, new):
+        # Record that the state of the cell [x][y] has changed from old to new
+        was_occupied, now_occupied = old != Parameters.EMPTY, new != Parameters.EMPTY
+        if was_occupied == now_occupied:
+            return
+        self.occupied[x, y] = now_occupied
+        change = 1 if now_occupied else -1
+        self.count[max(x - 1, 0):x + 2, max(y - 1, 0):y + 2] += change
+        # A cell is not its own neighbour
+        self.count[x, y] -= change
+
+    def active(self):
+        # Mask of the occupied cells and their empty neighbours
+        return self.occupied | (self.count > 0)
+
+    def active_cells(self):
+        # The coordinates of the active cells, in the order of the sweep in CA.evolution (x, then y)
+        return np.argwhere(self.active())
+
 def get_result(flag_now,flag_last,seagrass_counts):     
     for i in range(len(flag_last)):  
         for j in range(len(flag_last[0])):  
@@ -52,7 +158,10 @@ def get_result(flag_now,flag_last,seagrass_counts):
 # This line declares a new class named "CA" (Cellular Automata).
 class CA:  
     # The "__init__" method is the initialiser (constructor) for the class.
-    def __init__(self, width, height, plot_results=True):
+    def __init__(self, width, height, plot_results=True, engine='cell', mode='split', transition='sequential',
+                 rng=None, snapshots='./matrix', background=True, max_pending=4, frames=None, frame_workers=2,
+                 animation=None, parameters=None, forcing=None, cell_cache=None, surrogate=None, steady_state=None,
+                 solver='bdf', profile=None):
         # print("Grid initialized.")
         # Here the width and height for the cellular automata grid are set.
         self.width = width  
@@ -60,14 +169,81 @@ class CA:
         # The grid is initialised as a 3-dimensional NumPy array of zeroes.
         # It's basically a 2-dimensional grid where each cell has 6 variables (third dimension).
         self.grid = np.zeros((height, width, 10), dtype=int) 
-        # Create a matrix to save the states of each cell
-        self.state = np.zeros((height, width), dtype=object)
+        # Create a matrix to save the states of each cell, coded as Parameters.EMPTY, GERMINATING and SEAGRASS
+        self.state = np.full((height, width), Parameters.EMPTY, dtype=np.uint8)
         self.plot_results = plot_results
+        # How the daily ODE step is solved: 'cell' calls Cell.one_cell_run for each cell, 'batch' solves the whole grid at once.
+        # 'surrogate' replaces the solves by the polynomials fitted by a Cell_Surrogate.SurrogateEngine, and solves the cells
+        # outside their box with Cell.one_cell_run
+        if engine not in ('cell', 'batch', 'surrogate'):
+            raise ValueError(f"Unknown engine '{engine}', expected 'cell', 'batch' or 'surrogate'")
+        self.engine = engine
+        # The solver of engine='batch' (and of the tiles of engine='batch'): 'bdf', 'rk4' or 'dopri5', see Batch_Model.SOLVERS
+        if solver not in Batch_Model.SOLVERS:
+            raise ValueError(f"Unknown solver '{solver}', expected one of {Batch_Model.SOLVERS}")
+        self.solver = solver
+        # The solver profile of the models (a name or a Solver_Profiles.SolverProfile), handed to them with the compiled
+        # models. odeint at its default tolerances on the dense output times of the model functions if None
+        self.profile = Solver_Profiles.get_profile(profile)
+        # Whether the three models of a cell are solved one after the other ('split'), or as one system where R and
+        # Nrint follow their own values in the growth model ('coupled'), which is a different growth model
+        if mode not in ('split', 'coupled'):
+            raise ValueError(f"Unknown mode '{mode}', expected 'split' or 'coupled'")
+        self.mode = mode
+        # Whether the transition rules are applied cell by cell in place ('sequential') or to all cells at once ('synchronous')
+        # or only to the occupied cells and their neighbours ('frontier')
+        if transition not in ('sequential', 'synchronous', 'frontier'):
+            raise ValueError(f"Unknown transition '{transition}', expected 'sequential', 'synchronous' or 'frontier'")
+        self.transition = transition
+        # The index of the active cells for transition='frontier', built when the evolution starts
+        self.frontier = None
+        # The buffer that synchronous_transition writes the new states into, swapped with self.state every week
+        self.next_state = np.empty_like(self.state)
+        # The source of the random numbers of the transition rules: a numpy.random.Generator, or the global
+        # np.random functions if None (so that np.random.seed fixes a run)
+        self.rng = np.random if rng is None else rng
+        # The folder of the SnapshotStore that the weekly snapshots are written to, nothing is written if None
+        self.snapshots = snapshots
+        # Whether the snapshots are written by a background thread, and how many weeks can wait for it before the
+        # simulation is held back
+        self.background = background
+        self.max_pending = max_pending
+        # The WriterReport of the background thread of the last evolution
+        self.writer_report = None
+        # The folder that the weekly images are rendered into without any window, and the number of rendering threads.
+        # No images are rendered if None, live display is set apart with plot_results
+        self.frames = frames
+        self.frame_workers = frame_workers
+        # The WriterReport of the rendering threads of the last evolution
+        self.render_report = None
+        # The .gif or .pdf file that the weekly frames are appended to, none if None
+        self.animation = animation
+        # The values of the model parameters of this CA, a Parameters.ModelParameters (the values of the Parameters
+        # module if None). It cannot be changed in place, so CAs with different parameters can run side by side
+        self.parameters = Parameters.default_parameters() if parameters is None else parameters
+        # The parameters of every week, a Seasonal_Forcing.SeasonalForcing. If None, self.parameters are used every week
+        self.forcing = forcing
+        # The Cell_Cache.CellCache that solves each group of identical cells once for engine='cell', every cell is
+        # solved on its own if None. The other engines (and the tiles of evolution(..., processes=n)) do not use it
+        if cell_cache is not None and engine != 'cell':
+            raise ValueError(f"cell_cache needs engine='cell', got engine='{engine}'")
+        self.cell_cache = cell_cache
+        # The Cell_Surrogate.SurrogateEngine of engine='surrogate', a new one fitted on the trajectory of the cells if None
+        if engine == 'surrogate' and surrogate is None:
+            import Cell_Surrogate
+            surrogate = Cell_Surrogate.SurrogateEngine()
+        self.surrogate = surrogate
+        # The Steady_State.SteadyStateTracker that stops solving the nutrient models of the cells at their equilibrium,
+        # for engine='cell' in the split mode, and not with the tiles of evolution(..., processes=n). The nutrient models
+        # of every evolving cell are solved every day if None
+        if steady_state is not None and (engine != 'cell' or mode != 'split' or cell_cache is not None):
+            raise ValueError("steady_state needs engine='cell', mode='split' and no cell_cache")
+        self.steady_state = steady_state
         
         # Set initial values for each cell
         for x in range (width):
             for y in range (height):
-                self.state[x][y] = 'Empty'
+                self.state[x][y] = Parameters.EMPTY
                 self.grid[x][y][Parameters.N_IDX] = 0.5 # Nitrogen concentration
                 self.grid[x][y][Parameters.P_IDX] = 0.3 # Phosphrus concentration
                 self.grid[x][y][Parameters.C_IDX] = 1.0
@@ -122,6 +298,17 @@ class CA:
         self.reproduction = 5
         self.reproduction_rate = 3
 
+    # The states of the cells as the strings 'Empty', 'Germinating' and 'Seagrass' (a copy, writing to it does not change self.state)
+    @property
+    def state_names(self):
+        return Cell.state_names(self.state)
+
+    # This function changes the state of the cell [x][y], keeping the index of active cells up to date
+    def set_state(self, x, y, code):
+        if self.frontier is not None:
+            self.frontier.update(x, y, self.state[x][y], code)
+        self.state[x][y] = code
+
     # This function initializes the grid with all cells containing seagrass at the start of the simulation.
     def transition_rule(self, x, y):
         
@@ -129,7 +316,8 @@ class CA:
         This function represents a transition rule for a cell at position (x, y) 
         in a grid that models an environment.
 
-        The cell can be in one of three states: 'Empty', 'Germinating', or 'Seagrass'. 
+        The cell can be in one of three states: 'Empty', 'Germinating', or 'Seagrass'
+        (Parameters.EMPTY, Parameters.GERMINATING and Parameters.SEAGRASS in self.state). 
         The function checks the state of the cell and the environmental conditions,
         and updates the cell's state based on these conditions.
 
@@ -152,11 +340,11 @@ class CA:
         # print(f"Initial state at ({x}, {y}): {self.state[x][y]}")
         # Note: Here, 'self' refers to the cell at position (x, y) in the grid.
             # self = self.grid[x][y]
-        if self.state[x][y] == 'Empty':
+        if self.state[x][y] == Parameters.EMPTY:
                 # This line checks if all the variables in a particular grid cell [x][y] are zero.
             if self.grid[x][y].all() == False:  
                     # With a 10% chance, a new cell is grown at the location [x][y] by using the one_cell_run function of A_Cell class.
-                    if np.random.rand() < 0.1:
+                    if self.rng.random() < 0.1:
                         # self.grid[x][y] = self.a_cell.one_cell_run(0, self.grid[x][y])
                         if self.grid[x][y][Parameters.N_IDX] > self.N_THRESHOLD_GROWTH:
                             if self.grid[x][y][Parameters.P_IDX] > self.P_THRESHOLD_GROWTH:
@@ -169,14 +357,14 @@ class CA:
                     #         if self.depth <= 4:  # Adding depth conditions for recruitment
                     #             if self.salinity >= 20:  # Adding salinity conditions for recruitment
                     #                 if random.random() < self.germination_rate:  # Germination rate can be adjusted
-                                self.state[x][y] = 'Germinating'
-        elif self.state[x][y] == 'Germinating':
-            if np.random.rand() < 0.1: 
+                                self.set_state(x, y, Parameters.GERMINATING)
+        elif self.state[x][y] == Parameters.GERMINATING:
+            if self.rng.random() < 0.1: 
                 # if self.grid[x][y][Parameters.R_IDX] > 0.5:
                 #     if self.oxygen < self.oxygen_threshold:  # Conditions for germination completion
-                self.state[x][y] = 'Seagrass'
-        elif self.state[x][y] == 'Seagrass':
-            if np.random.rand() < 0.1: # Random death rate
+                self.set_state(x, y, Parameters.SEAGRASS)
+        elif self.state[x][y] == Parameters.SEAGRASS:
+            if self.rng.random() < 0.1: # Random death rate
                 # if np.random.rand() < self.DISTURBANCE_THRESHOLD_DEATH:
                     # if np.random.rand() < self.CARRYING_CAPACITY:
                         # if np.random.rand() < self.RANDOMNESS_THRESHOLD_DEATH:
@@ -184,7 +372,7 @@ class CA:
                                 # if self.grid[x][y][Parameters.P_IDX] < self.P_THRESHOLD_DEATH:
                                     # if self.grid[x][y][Parameters.LIGHT_IDX] < self.P_THRESHOLD_DEATH:
                                         # if self.grid[x][y][Parameters.P_IDX]>0.5:
-                self.state[x][y] = 'Empty'
+                self.set_state(x, y, Parameters.EMPTY)
                 # Conditions for growth and reproduction
             #         if self.silt >= 0.6 and self.silt <= 0.8 and self.nutrient_n > self.nutrient_n_threshold:
             #             if self.light >= 0.12 and self.light <= 0.37:  # Adding light conditions for growth
@@ -210,15 +398,15 @@ class CA:
             # self.grid[x][y][self.CB_IDX] = min(1, self.grid[x][y][self.CB_IDX])
         # Assuming you're inside the transition_rule function and currently processing a 'Seagrass' cell at position (x, y)
         # Spread/Reproduction
-        if self.state[x][y] == 'Seagrass':
+        if self.state[x][y] == Parameters.SEAGRASS:
             # List of neighboring coordinates
             neighbors = [(x-1, y-1), (x-1, y), (x-1, y+1), (x, y-1), (x, y+1), (x+1, y-1), (x+1, y), (x+1, y+1)]
 
             for nx, ny in neighbors:
                 # Ensure the neighbor coordinates are inside the grid boundaries
                 if 0 <= nx < self.width and 0 <= ny < self.height:
-                    if self.state[nx][ny] == 'Empty' and np.random.rand() < 0.2:  # 20% reproduction chance, for absecnt scenario increased probability (0.25)
-                        self.state[nx][ny] = 'Germinating'  # or 'Seagrass' based on your model's logic
+                    if self.state[nx][ny] == Parameters.EMPTY and self.rng.random() < 0.2:  # 20% reproduction chance, for absecnt scenario increased probability (0.25)
+                        self.set_state(nx, ny, Parameters.GERMINATING)  # or 'Seagrass' based on your model's logic
                 
                 return self.state[x][y]
 
@@ -226,14 +414,71 @@ class CA:
         return self.state[x][y]
     
 
+    def synchronous_transition(self):
+        """
+        This function applies the rules of transition_rule to every cell of the grid at once.
+
+        transition_rule updates self.state in place, one cell after the other, so the cells visited later in a sweep
+        see the changes made before them. Here every cell is updated from the states at the start of the call, with
+        the new states written into a second buffer:
+
+        'Empty' -> 'Germinating' with a 10% chance if the cell has no seagrass growth and enough nitrogen and phosphorus.
+        'Germinating' -> 'Seagrass' with a 10% chance.
+        'Seagrass' -> 'Empty' with a 10% chance.
+
+        Then each cell that is still 'Seagrass' spreads to each of its 8 neighbours that was 'Empty' with a 20% chance,
+        so an empty cell with k such neighbours becomes 'Germinating' with probability 1 - 0.8**k. (The loop over the
+        neighbours in transition_rule stops after the first one.)
+
+        The random numbers are drawn for the whole grid with one call to self.rng.random.
+
+        Returns:
+            state (np.array): The new states, which are also stored in self.state.
+        """
+        state = self.state
+        draw, spread_draw = self.rng.random((2,) + state.shape)
+        new_state = own_transitions(state, self.grid, draw, self.N_THRESHOLD_GROWTH, self.P_THRESHOLD_GROWTH, out=self.next_state)
+        spread_seagrass(new_state, state == Parameters.EMPTY, spread_draw)
+        # Swap the buffers
+        self.state, self.next_state = new_state, state
+        return self.state
+
+    def frontier_transition(self):
+        """
+        This function applies transition_rule to the active cells only, in the same order as the full sweep.
+
+        The active cells are the occupied cells and their empty neighbours (see 'ActiveFrontier'). An empty cell away
+        from them can only germinate on its own, with a 10% chance if it has no seagrass growth and enough nitrogen and
+        phosphorus. Instead of one random draw per such cell, the number of cells that germinate is drawn from a
+        binomial distribution, and that many of the eligible cells are picked at random.
+
+        Returns:
+            state (np.array): The new states, which are also stored in self.state.
+        """
+        if self.frontier is None:
+            self.frontier = ActiveFrontier(self.state)
+        # The empty cells away from the active ones that could germinate on their own
+        far = ~self.frontier.active() & ~self.grid.all(axis=-1) & \
+            (self.grid[..., Parameters.N_IDX] > self.N_THRESHOLD_GROWTH) & (self.grid[..., Parameters.P_IDX] > self.P_THRESHOLD_GROWTH)
+        far_cells = np.argwhere(far)
+        num_germinating = self.rng.binomial(len(far_cells), 0.1)
+        germinating = far_cells[self.rng.choice(len(far_cells), num_germinating, replace=False)]
+        for x, y in self.frontier.active_cells():
+            self.set_state(x, y, self.transition_rule(x, y))
+        for x, y in germinating:
+            # Seagrass that has grown next to the cell during the sweep may already have reached it
+            if self.state[x][y] == Parameters.EMPTY:
+                self.set_state(x, y, Parameters.GERMINATING)
+        return self.state
+
     # This function initializes the grid with some initial cells using a similar random chance mechanism as in transition_rule.
     # The Random initial growth Scenario 
     # def initialize_grid(self):  
     #     for i in range(self.height):  
     #         for j in range(self.width):  
-    #             if np.random.rand() < 0.1: 
+    #             if self.rng.random() < 0.1: 
     #                 self.grid[i][j] = Cell.one_cell_run(0,self.grid[i][j])
-    #                 self.state[i][j] = 'Germinating'
+    #                 self.state[i][j] = Parameters.GERMINATING
     #     # plt.imshow(self.grid, cmap='Greens')
     #     # plt.title('initial')
     #     # plt.show()
@@ -247,9 +492,9 @@ class CA:
     #     for i in range(self.height):
     #         for j in range(self.width):
     #             if (center_x - j)**2 + (center_y - i)**2 <= radius**2:
-    #                 self.state[i][j] = 'Seagrass'
+    #                 self.state[i][j] = Parameters.SEAGRASS
     #             else:
-    #                 self.state[i][j] = 'Empty'
+    #                 self.state[i][j] = Parameters.EMPTY
     #     return self.grid
     
     # This function initializes the grid with clusters of seagrass at the start of the simulation. 
@@ -261,9 +506,9 @@ class CA:
             for j in range(self.width):
                 if (i // cluster_spacing) % 2 == (j // cluster_spacing) % 2 and \
                     i % cluster_spacing < cluster_size and j % cluster_spacing < cluster_size:
-                    self.state[i][j] = 'Seagrass'
+                    self.state[i][j] = Parameters.SEAGRASS
                 else:
-                    self.state[i][j] = 'Empty'
+                    self.state[i][j] = Parameters.EMPTY
         return self.grid
     
     # # The Abesent Scenario
@@ -271,12 +516,12 @@ class CA:
     #     # Initialize the grid with all cells being empty
     #     for i in range(self.height):
     #         for j in range(self.width):
-    #             self.state[i][j] = 'Empty'
+    #             self.state[i][j] = Parameters.EMPTY
 
     #     # Optionally, introduce some initial 'Seagrass' cells
     #     # For instance, setting the center of the grid as 'Seagrass'
     #     center_x, center_y = self.width // 2, self.height // 2
-    #     self.state[center_x][center_y] = 'Seagrass'
+    #     self.state[center_x][center_y] = Parameters.SEAGRASS
     
     #     return self.grid
     
@@ -284,43 +529,159 @@ class CA:
     # def initialize_grid(self):
     #     for i in range(self.height):
     #         for j in range(self.width):
-    #             self.state[i][j] = 'Seagrass'
+    #             self.state[i][j] = Parameters.SEAGRASS
     #     return self.grid
-           
-    def evolution(self, num_of_steps, subplot = None):  
+
+    # This function returns the parameters of week m: those of the seasonal forcing if there is one, else self.parameters
+    def week_parameters(self, m):
+        return self.parameters if self.forcing is None else self.forcing.parameters(m)
+
+    # This function closes the outputs of evolution in this order (the writer thread before the store it writes to),
+    # each one even if closing another one failed, then raises the first error. None stands for an output not in use.
+    def close_outputs(self, tiled=None, writer=None, renderer=None, animation=None, metrics=None, store=None):
+        error = None
+        for name, output in (('tiled', tiled), ('writer', writer), ('renderer', renderer), ('animation', animation),
+                             ('metrics', metrics), ('store', store)):
+            if output is None:
+                continue
+            try:
+                report = output.close()
+            except Exception as exc:
+                error = exc if error is None else error
+                continue
+            if name == 'writer':
+                self.writer_report = report
+            elif name == 'renderer':
+                self.render_report = report
+        if error is not None:
+            raise error
+
+    # With processes set, the grid is split into tiles that many processes keep and run in parallel (see Tiled_CA), which
+    # needs transition='synchronous'. If given, callback(m, self) is called at the end of every week m,
+    # and the weekly metrics are recorded by metrics, a Metrics.MetricsRecorder.
+    def evolution(self, num_of_steps, subplot = None, processes=None, callback=None, metrics=None):  
         # Create an empty grid to hold the seagrass counts
         seagrass_counts = np.zeros((self.height, self.width))
         flag_last = np.zeros((self.height, self.width))
+        if self.transition == 'frontier':
+            # Index the active cells of the current states, which may have been set by initialize_grid
+            self.frontier = ActiveFrontier(self.state)
 
-        for m in range(num_of_steps):  
-            #weekly loop
-            for s in range(7):  
-                for x in range(self.width):  
-                    for y in range(self.height):  
-                        # First let it evolve on its own (daily loop)
-                        self.grid[x][y] = Cell.one_cell_run(s+1,self.grid[x][y])
-            for x in range(self.width):  
-                for y in range(self.height): 
-                    # Then according to the transition rules to diffuse (monthly)
-                    self.state[x][y] = self.transition_rule(x, y)
-                    # Record the growth of seagrass here
-                    # If the conditions for regrowth are met, the corresponding position of the result matrix +1
-                    # Need to judge according to the transition rules
+        # The outputs of the run, closed in the finally block below even if a week fails
+        tiled = store = writer = renderer = animation = None
+        try:
+            tiled = None if processes is None else Tiled_CA.TiledEvolution(self, processes)
+            # The compiled models of each set of parameters met so far
+            compiled = {}
+            if self.snapshots is not None:
+                # The values of the Parameters module, with the model parameters of this CA in place of its own. With a
+                # seasonal forcing, those of its first week, and its schedule of the parameters that change week by week
+                parameters = dict(Snapshot_Store.describe_parameters(Parameters), **self.week_parameters(0)._asdict(),
+                                  engine=self.engine, mode=self.mode, transition=self.transition, processes=processes,
+                                  forcing=None if self.forcing is None else self.forcing.describe())
+                store = Snapshot_Store.SnapshotStore(self.snapshots, 'w', self.height, self.width, num_vars=self.grid.shape[-1],
+                                                     seed=Snapshot_Store.describe_rng(self.rng), parameters=parameters)
+            if store is not None and self.background:
+                writer = Background_Writer.BackgroundWriter(max_pending=self.max_pending)
+            if self.frames is not None:
+                import Rendering
+                renderer = Rendering.FrameRenderer(self.frames, workers=self.frame_workers, max_pending=2 * self.frame_workers)
+            if self.animation is not None:
+                import Animation
+                animation = Animation.AnimationWriter(self.animation)
+            if metrics is not None:
+                metrics.start(self, num_of_steps)
+            if tiled is not None:
+                # The tiles only send back the states of the cells for the outputs that read them every week, and the
+                # variables of the cells for those that read them too; the rest is gathered at the end of the run
+                weekly_grid = store is not None or callback is not None
+                weekly_state = weekly_grid or renderer is not None or animation is not None or metrics is not None or \
+                    self.plot_results
+            for m in range(num_of_steps):  
+                #weekly loop
+                if metrics is not None:
+                    # The states at the start of the week, for the metrics that compare them with the states at its end
+                    old_state = self.state.copy()
+                if tiled is not None:
+                    # The days and the transitions of the week, tile by tile in the worker processes
+                    tiled.week(m, state=weekly_state, grid=weekly_grid)
+                else:
+                    # The season parameters stay the same for the whole week, so compile the models once for its seven days,
+                    # and only once for all the weeks that share the same parameters
+                    parameters = self.week_parameters(m)
+                    if parameters not in compiled:
+                        compiled[parameters] = Cell.compile_models(parameters, self.profile)
+                    bundles = compiled[parameters]
+                    for s in range(7):  
+                        if self.engine == 'batch':
+                            # First let it evolve on its own, all cells with one solver call (daily loop)
+                            self.grid = Batch_Model.batch_grid_run(s+1, self.grid, self.mode, bundles=bundles,
+                                                                   solver=self.solver,
+                                                                   **Solver_Profiles.batch_tolerances(self.profile))
+                        elif self.engine == 'surrogate':
+                            # First let it evolve on its own, the cells in the fitted box with the surrogate (daily loop)
+                            self.grid = self.surrogate.run_grid(s+1, self.grid, self.mode, bundles)
+                        elif self.steady_state is not None:
+                            # First let it evolve on its own, without solving the nutrients of the frozen cells (daily loop)
+                            self.grid = self.steady_state.run_grid(s+1, self.grid, self.mode, bundles, self.state)
+                        elif self.cell_cache is not None:
+                            # First let it evolve on its own, each group of identical cells solved once (daily loop)
+                            self.grid = self.cell_cache.run_grid(s+1, self.grid, self.mode, bundles)
+                        else:
+                            # Only the cells with seagrass growth evolve in one_cell_run, so only visit those
+                            for x, y in np.argwhere(self.grid.all(axis=-1)):  
+                                # First let it evolve on its own (daily loop)
+                                self.grid[x][y] = Cell.one_cell_run(s+1,self.grid[x][y],self.mode,bundles=bundles)
+                    if self.steady_state is not None:
+                        # The share of the evolving cells that were frozen this week
+                        self.steady_state.end_week()
+                    if self.transition == 'synchronous':
+                        # Then according to the transition rules to diffuse, all cells at once (weekly)
+                        self.synchronous_transition()
+                    elif self.transition == 'frontier':
+                        # Then according to the transition rules to diffuse, visiting only the active cells (weekly)
+                        self.frontier_transition()
+                    else:
+                        for x in range(self.width):  
+                            for y in range(self.height): 
+                                # Then according to the transition rules to diffuse (monthly)
+                                self.state[x][y] = self.transition_rule(x, y)
+                                # Record the growth of seagrass here
+                                # If the conditions for regrowth are met, the corresponding position of the result matrix +1
+                                # Need to judge according to the transition rules
 
             
-            # save the matrix  
-            with open(f"./matrix/matrix_week={m}.pkl", "wb") as f:
-                pickle.dump(self.grid, f)
-            # print(f"Saved grid for week={m}")  # Print confirmation message
-            # Read the matrix
-            # with open("matrix_week=0.pkl", "rb") as f:  
-                # loaded_grid = pickle.load(f)
-            # print(f"Loaded grid for week={m}: {loaded_grid}")  # Print loaded grid
-            if self.plot_results:
+                # save the matrix  
+                if writer is not None:
+                    # Hand copies to the writer thread, as the simulation changes the arrays in place
+                    writer.submit(store.append, self.state.copy(), self.grid.copy())
+                elif store is not None:
+                    store.append(self.state, self.grid)
+                # print(f"Saved grid for week={m}")  # Print confirmation message
+                # Read the matrix
+                # loaded_grid = Snapshot_Store.SnapshotStore("./matrix").grid(m)
+                # print(f"Loaded grid for week={m}: {loaded_grid}")  # Print loaded grid
+                flag_now = Cell.Have_seagrass(self.state, self.height, self.width)
+                if renderer is not None:
+                    renderer.submit(m, self.state.copy())
+                if animation is not None:
+                    animation.append(self.state)
+                if self.plot_results:
+                    PlotResult(flag_now, m)
+                if metrics is not None:
+                    metrics.update(m, old_state, self.state)
+                if callback is not None:
+                    callback(m, self)
+            #         seagrass_counts=get_result(flag_now, flag_last, seagrass_counts)
+            #         PlotResult(seagrass_counts,m)
+            #         flag_last = flag_now
+            if tiled is not None:
+                # The states and the variables of the cells at the end of the run
+                tiled.gather()
                 flag_now = Cell.Have_seagrass(self.state, self.height, self.width)
-                PlotResult(flag_now, m)
-        #         seagrass_counts=get_result(flag_now, flag_last, seagrass_counts)
-        #         PlotResult(seagrass_counts,m)
-        #         flag_last = flag_now
+        finally:
+            # Stop the pool and the threads and flush the files, so that nothing is left running and the store holds
+            # the weeks written so far, whether or not the run got to its end
+            self.close_outputs(tiled, writer, renderer, animation, metrics, store)
         # return seagrass_counts
         return flag_now
@@ -5,10 +5,16 @@ This Python script contains functions for simulating the growth and nutrient int
 
 The script contains two main functions:
 
-1. `Have_seagrass`: This function determines the presence of seagrass in each cell of a given grid. It receives a 3D numpy array representing the simulation grid, where each cell is a 1D array representing the cell's state. A cell with all elements equal to zero is considered to be without seagrass. The function returns a 2D numpy array of the same dimensions as the input grid, where each element corresponds to a cell in the grid. A value of 1 indicates the presence of seagrass, while 0 indicates its absence.
+1. `Have_seagrass`: This function determines the presence of seagrass in each cell of a given grid. It receives a 2D array with the state of each cell, coded as Parameters.EMPTY, Parameters.GERMINATING and Parameters.SEAGRASS (or the names 'Empty', 'Germinating' and 'Seagrass'). The function returns a 2D numpy array of the same dimensions as the input grid, where 0 marks an empty cell, 1 a germinating cell and 2 a cell with seagrass. `state_codes` and `state_names` convert between the coded states and their names.
 
 2. `one_cell_run`: This function runs a single time step for a cell in the simulation. It receives a time point (`t`) and a `grid` representing the current state of the system. The function first checks whether `t` is equal to 0. If so, it initializes the system using the `Growth_Model`, `Ni_Model`, and `P_Model`. If `t` is not 0, it checks whether there is any seagrass in the grid. If there is no seagrass, the function simply returns the original `grid`. If there is seagrass, the function performs one step of the simulation by calling the `Growth_Model`, `Ni_Model`, and `P_Model` again.
 
+3. `coupled_model_sol` and `coupled_model`: The growth, nitrogen and phosphorus models written as one system of 10 ODEs, where each model sees the current values of the others instead of a frozen snapshot. `one_cell_run(t, grid, mode='coupled')` solves a cell with this system, while `mode='split'` (the default) keeps the three chained solves. This is a different growth model, not a faster way to solve the same one: in the split mode `Growth_model_sol` is given the R and Nrint of the stored state as constants, and R grows exponentially over the solve (from the initial values, R is 1.2e11 after one day), while in the coupled mode R and Nrint follow their own values (R is 1.9e2 after one day). The nitrogen and phosphorus equations ignore the values of the other models they are given, so `coupled_model_jac`, the analytic Jacobian of the system, is block diagonal, `coupled_blocks` splits the system into its three independent blocks, and `coupled_model` solves each on its own. That is three solver calls per cell, as in the split mode, so the coupled mode does not save any solver overhead.
+
+4. `compile_models`: Compiles the right-hand sides and Jacobians of the three models for one set of season parameters (a `Parameters.ModelParameters`, or the Parameters module) (see 'compile_Growth_model', 'compile_Ni_model' and 'compile_P_model'). The result can be given as `bundles` to `one_cell_run`, `coupled_model`, `CellStepper` and 'Batch_Model', so that the terms that only depend on the season are computed once per week instead of at every evaluation. `compile_models(season, profile)` also carries the solver profile of the models (see 'Solver_Profiles').
+
+The script also contains the `CellStepper` class, a stateful alternative to calling the three models over and over. It keeps one solver per model between calls, so that advancing a cell from one day to the next only integrates over that day, instead of re-integrating from time 0 (`Growth_model`) or over a fixed 100-day window (`Ni_model` and `P_model`). It follows another time base than the daily loop of `CA.evolution`, and is not one of its engines (see 'StepperComparison').
+
 The overall program is designed for simulating how seagrass might grow and interact with its environment over time, considering factors like nutrients (specifically nitrogen and phosphorus) and growth rates.
 """
 
@@ -18,21 +24,54 @@ __version__ = '0.0.1'
 __license__ = "None"
 
 import numpy as np
+from scipy.integrate import LSODA
 
 import Growth_Model
 import Parameters
 import Ni_Model
 import P_Model
+import Solver_Profiles
 
 num_of_weeks = 52
+def state_codes(state):
+    """
+    Convert the names of cell states ('Empty', 'Germinating', 'Seagrass') to their uint8 codes.
+
+    Args:
+        state (np.array): The states, as names or already as codes.
+
+    Returns:
+        codes (np.array): The states as Parameters.EMPTY, Parameters.GERMINATING and Parameters.SEAGRASS, with the shape of 'state'.
+    """
+    state = np.asarray(state)
+    if state.dtype.kind not in ('O', 'U', 'S'):
+        return state.astype(np.uint8, copy=False)
+    codes = np.full(state.shape, Parameters.EMPTY, dtype=np.uint8)
+    for code, name in enumerate(Parameters.STATE_NAMES):
+        codes[state == name] = code
+    return codes
+
+
+def state_names(state):
+    """
+    Convert coded cell states to their names, for code that still works with 'Empty', 'Germinating' and 'Seagrass'.
+
+    Args:
+        state (np.array): The states as uint8 codes.
+
+    Returns:
+        names (np.array): An object array of the state names, with the shape of 'state'.
+    """
+    return np.array(Parameters.STATE_NAMES, dtype=object)[np.asarray(state)]
+
+
 def Have_seagrass(state, height, width):
     """
     This function determines the presence of seagrass in a given grid.
 
     Args:
-        grid (np.array): A 3D numpy array representing the simulation grid.
-                         Each cell in the grid is a 1D array representing the cell's state.
-                         A cell with all elements equal to zero is considered to be without seagrass.
+        state (np.array): A 2D array with the state of each cell of the simulation grid, as the codes
+                          Parameters.EMPTY, Parameters.GERMINATING and Parameters.SEAGRASS or as their names.
         height (int): The number of rows in the grid.
         width (int): The number of columns in the grid.
 
@@ -48,53 +87,339 @@ def Have_seagrass(state, height, width):
     """
     result = np.zeros((height, width), dtype=int)
     
-    # If there is no seagrass (i.e., all elements in the grid's cell are 0), set the corresponding cell in 'result' to 0
-    for x in range(width):
-        for y in range(height):
-            # If all elements in the grid's cell are 0 (indicating no seagrass), continue to the next cell
-            if state[x][y] == 'Empty':
-                continue
-            elif state[x][y] == 'Germinating':
-                result[x][y] = 1
-            else: # If not all elements in the grid's cell are 0 (indicating presence of seagrass), set the corresponding cell in 'result' to 1
-                result[x][y] = 2
+    # The codes are 0 for an empty cell, 1 for a germinating cell and 2 for a cell with seagrass, as in 'result'
+    result[:, :] = state_codes(state)[:height, :width]
 
     return result
 
 
 
+def initial_state(parameters=Parameters):
+    """
+    The state of a cell at time 0.
+
+    Args:
+        parameters: A Parameters.ModelParameters, or the Parameters module.
+
+    Returns:
+        list: R, Nrint, N_org, NH4, NO2, NO3, POP, SRP, P_ma_int and P_R_int.
+    """
+    return [parameters.R, parameters.Nrint, parameters.N_org, parameters.NH4, parameters.NO2, parameters.NO3,
+            parameters.POP, parameters.SRP, parameters.P_ma_int, parameters.P_R_int]
+
+
+def compile_models(season=Parameters, profile=None):
+    """
+    Compile the growth, nitrogen and phosphorus models for one set of season parameters.
+
+    Args:
+        season: An object with the season parameters of the models, e.g. a Parameters.ModelParameters or the
+                Parameters module.
+        profile: The solver profile the models are solved with, a name or a Solver_Profiles.SolverProfile. If None,
+                 odeint at its default tolerances on the dense output times of the model functions.
+
+    Returns:
+        bundles (dict): The (sol, jac) pair of each model, under the keys 'Growth', 'Ni' and 'P', the parameters
+                        themselves under 'parameters' (for the initial state of the cells), and the SolverProfile (or
+                        None) under 'profile'.
+    """
+    return {'Growth': Growth_Model.compile_Growth_model(season),
+            'Ni': Ni_Model.compile_Ni_model(season),
+            'P': P_Model.compile_P_model(season),
+            'parameters': season,
+            'profile': Solver_Profiles.get_profile(profile)}
+
+
+def model_functions(bundles=None):
+    """
+    Return the right-hand sides and Jacobians to use for the three models.
+
+    Args:
+        bundles (dict): The result of 'compile_models', or None for the reference functions of the model modules.
+
+    Returns:
+        bundles (dict): The (sol, jac) pair of each model, under the keys 'Growth', 'Ni' and 'P', and the parameters
+                        under 'parameters'.
+    """
+    if bundles is not None:
+        return bundles
+    return {'Growth': (Growth_Model.Growth_model_sol, Growth_Model.Growth_model_jac),
+            'Ni': (Ni_Model.Ni_model_sol, Ni_Model.Ni_model_jac),
+            'P': (P_Model.P_model_sol, P_Model.P_model_jac),
+            'parameters': Parameters}
+
+
 # This method runs one time step for a cell
-def one_cell_run(t, grid):
+def one_cell_run(t, grid, mode='split', jac=True, bundles=None, parameters=None, frozen=False):
     """
     This function runs one time step for a cell in the simulation. 
 
     Args:
         t (int): The current time point in the simulation.
         grid (list): The current state of the system.
+        mode (str): 'split' solves the growth, nitrogen and phosphorus models one after the other,
+                    'coupled' solves the coupled growth model, where R and Nrint follow their own values, with
+                    'coupled_model'. The two modes give different results.
+        jac (bool): Whether the solvers are given the analytic Jacobians of the models (True),
+                    or estimate them by finite differences (False).
+        bundles (dict): The compiled models from 'compile_models', or None to use the reference functions.
+        parameters (Parameters.ModelParameters): The parameters of the simulation, used when no bundles are given.
+                                                 If both are None, the values of the Parameters module are used.
+        frozen (bool): Whether the nitrogen and phosphorus variables are at a steady state (see 'Steady_State'), so
+                       that only the growth model is solved and they are kept as they are. Only in the split mode.
 
     Returns:
         grid (list): The state of the system after the time step.
     """
+    if mode not in ('split', 'coupled'):
+        raise ValueError(f"Unknown mode '{mode}', expected 'split' or 'coupled'")
     # print(f"Grid before time step {t}: {grid}")  # Print grid before time step
     # Unpack the grid into its components
     R, Nrint, N_org, NH4, NO2, NO3, POP, SRP, P_ma_int, P_R_int = grid
     
+    if bundles is None and parameters is not None:
+        bundles = compile_models(parameters)
+    bundles = model_functions(bundles)
     # If this is the first time step, initialize the system
+    init = bundles.get('parameters', Parameters)
+    # The solver profile of the models, odeint at its default tolerances if None
+    profile = bundles.get('profile')
+    if t == 0 and mode == 'coupled':
+        return coupled_model(initial_state(init), 0, jac, bundles)
     if t == 0:
-        R, Nrint = Growth_Model.Growth_model(Parameters.NH4,Parameters.NO3,Parameters.R,Parameters.Nrint,t)
-        N_org, NH4, NO2, NO3 = Ni_Model.Ni_model(R, Parameters.N_org,Parameters.NH4,Parameters.NO2,Parameters.NO3,t)
-        POP, SRP, P_ma_int, P_R_int = P_Model.P_model(Parameters.POP, Parameters.SRP, Parameters.P_ma_int, Parameters.P_R_int, R, Nrint, N_org, NH4, 0)
+        R, Nrint = Growth_Model.Growth_model(init.NH4,init.NO3,init.R,init.Nrint,t,jac,bundles['Growth'],profile=profile)
+        N_org, NH4, NO2, NO3 = Ni_Model.Ni_model(R, init.N_org,init.NH4,init.NO2,init.NO3,t,jac,bundles['Ni'],profile=profile)
+        POP, SRP, P_ma_int, P_R_int = P_Model.P_model(init.POP, init.SRP, init.P_ma_int, init.P_R_int, R, Nrint, N_org, NH4, 0, jac, bundles['P'], profile=profile)
     else:
         # If there is no seagrass growth, no evolution takes place
         if grid.all() == False:
             return grid
         # If seagrass is present, perform a time step evolution using the growth and nutrient models
-        R, Nrint = Growth_Model.Growth_model(NH4, NO3, R, Nrint, t+1)
-        N_org, NH4, NO2, NO3 = Ni_Model.Ni_model(R, N_org, NH4, NO2, NO3, t+1)
-        POP, SRP, P_ma_int, P_R_int = P_Model.P_model(POP, SRP, P_ma_int, P_R_int, R, Nrint, N_org, NH4, t+1)
+        if mode == 'coupled':
+            return coupled_model(grid, t+1, jac, bundles)
+        R, Nrint = Growth_Model.Growth_model(NH4, NO3, R, Nrint, t+1, jac, bundles['Growth'], profile=profile)
+        if not frozen:
+            N_org, NH4, NO2, NO3 = Ni_Model.Ni_model(R, N_org, NH4, NO2, NO3, t+1, jac, bundles['Ni'], profile=profile)
+            POP, SRP, P_ma_int, P_R_int = P_Model.P_model(POP, SRP, P_ma_int, P_R_int, R, Nrint, N_org, NH4, t+1, jac, bundles['P'], profile=profile)
     
     # Update the grid with the new state of the system
     grid = [R, Nrint, N_org, NH4, NO2, NO3, POP, SRP, P_ma_int, P_R_int]
     # print(f"Grid after time step {t}: {grid}")  # Print grid after time step
     return grid
 
+
+def coupled_blocks(grid, bundles=None):
+    """
+    Split the coupled model of one cell into the independent blocks of its Jacobian (see 'coupled_model_jac').
+
+    The nitrogen and phosphorus equations ignore the R, Nrint, N_org and NH4 they are given, and the growth equations
+    the NH4 and NO3, so each block only depends on its own variables. The values given to a block for the other models
+    are those of grid, and solving the blocks one by one gives the same result as solving 'coupled_model_sol' at once.
+
+    Args:
+        grid (list): The state of the cell (R, Nrint, N_org, NH4, NO2, NO3, POP, SRP, P_ma_int, P_R_int).
+        bundles (dict): The compiled models from 'compile_models', or None to use the reference functions.
+
+    Returns:
+        list: One (columns, model_sol, model_jac) per block, where columns is the slice of the block in the state of
+              the cell, and model_sol(y, t) and model_jac(y, t) are the odeint style right-hand side and Jacobian of
+              the block.
+    """
+    R, Nrint, N_org, NH4, NO2, NO3 = grid[:6]
+    bundles = model_functions(bundles)
+    growth_sol = bundles['Growth'][0]
+    ni_sol, ni_jac = bundles['Ni']
+    p_sol, p_jac = bundles['P']
+    return [
+        # R and Nrint follow the state of the block
+        (slice(0, 2), lambda y, t: growth_sol(y, t, [NH4, NO3, y[0], y[1]]),
+         lambda y, t: Growth_Model.Growth_model_params_jac(t, [NH4, NO3, y[0], y[1]])),
+        (slice(2, 6), lambda y, t: ni_sol(y, t, R), lambda y, t: ni_jac(y, t, R)),
+        (slice(6, 10), lambda y, t: p_sol(y, t, [R, Nrint, N_org, NH4]),
+         lambda y, t: p_jac(y, t, [R, Nrint, N_org, NH4])),
+    ]
+
+
+def coupled_model_sol(y, t, bundles=None):
+    """
+    Calculate the derivatives of all 10 variables of a cell at time t, with the three models coupled.
+
+    In one_cell_run the nitrogen model is given the R from the growth solve that has just finished, and the phosphorus
+    model the R, Nrint, N_org and NH4 from both, each held fixed over the whole solve. Here every model is given the
+    current values of the other variables at each evaluation instead. The nitrogen and phosphorus equations ignore
+    these values, but the growth equations do not: R and Nrint follow their own values instead of those of the
+    stored state, so this is a different growth model from the split mode.
+
+    Args:
+        y (list or numpy array): R, Nrint, N_org, NH4, NO2, NO3, POP, SRP, P_ma_int and P_R_int.
+                                 Each entry may also be an array with one value per cell.
+        t (float): The current time.
+        bundles (dict): The compiled models from 'compile_models', or None to use the reference functions.
+
+    Returns:
+        list: The derivatives of the 10 variables, in the same order.
+    """
+    R, Nrint, N_org, NH4, NO2, NO3, POP, SRP, P_ma_int, P_R_int = y
+    bundles = model_functions(bundles)
+    dR_dt, dNrint_dt = bundles['Growth'][0]([R, Nrint], t, [NH4, NO3, R, Nrint])
+    dNorg_dt, dNH4_dt, dNO2_dt, dNO3_dt = bundles['Ni'][0]([N_org, NH4, NO2, NO3], t, R)
+    dPOP_dt, dSRP_dt, dP_ma_int_dt, dP_R_int_dt = bundles['P'][0]([POP, SRP, P_ma_int, P_R_int], t, [R, Nrint, N_org, NH4])
+    return [dR_dt, dNrint_dt, dNorg_dt, dNH4_dt, dNO2_dt, dNO3_dt, dPOP_dt, dSRP_dt, dP_ma_int_dt, dP_R_int_dt]
+
+
+def coupled_model_jac(y, t, bundles=None):
+    """
+    Calculate the Jacobian of coupled_model_sol with respect to the 10 variables of a cell.
+
+    The nitrogen and phosphorus equations ignore the R, Nrint, N_org and NH4 they are given (see 'Ni_model_sol' and
+    'P_model_sol'), so the Jacobian is block diagonal: the growth block comes from 'Growth_model_params_jac', the others
+    from 'Ni_model_jac' and 'P_model_jac'.
+
+    Args:
+        y (list or numpy array): R, Nrint, N_org, NH4, NO2, NO3, POP, SRP, P_ma_int and P_R_int.
+                                 Each entry may also be an array with one value per cell.
+        t (float): The current time.
+        bundles (dict): The compiled models from 'compile_models', or None to use the reference functions.
+
+    Returns:
+        numpy array (10, 10): J[i][j] is the derivative of the i-th equation with respect to the j-th variable.
+                              With one value per cell in y, the shape is (10, 10, n).
+    """
+    R, Nrint, N_org, NH4, NO2, NO3, POP, SRP, P_ma_int, P_R_int = y
+    jac = np.zeros((10, 10) + np.shape(R))
+    jac[0:2, 0:2] = Growth_Model.Growth_model_params_jac(t, [NH4, NO3, R, Nrint])
+    bundles = model_functions(bundles)
+    jac[2:6, 2:6] = bundles['Ni'][1]([N_org, NH4, NO2, NO3], t, R)
+    jac[6:10, 6:10] = bundles['P'][1]([POP, SRP, P_ma_int, P_R_int], t, [R, Nrint, N_org, NH4])
+    return jac
+
+
+# This method calculates the current state of a cell using the coupled model
+def coupled_model(grid, now_t, jac=True, bundles=None):
+    """
+    Solve the coupled model of one cell from time 0 up to now_t, with one odeint call per block of 'coupled_blocks'.
+
+    The blocks are independent, so the result only differs from a single solve of 'coupled_model_sol' within the
+    tolerances of the solver, and the single solve was about twice as slow: every step of the stiff growth block was
+    also a step of the nitrogen and phosphorus blocks. It is a different model from the split mode (see
+    'coupled_model_sol'), and costs about as much per cell.
+
+    Args:
+        grid (list): The state of the cell at time 0.
+        now_t (int): The time point to solve up to.
+        jac (bool): Whether odeint is given 'coupled_model_jac' (True) or estimates the Jacobian itself (False).
+        bundles (dict): The compiled models from 'compile_models', or None to use the reference functions.
+
+    Returns:
+        grid (list): The state of the cell at now_t.
+    """
+    grid = np.asarray(grid, dtype=float)
+    if now_t == 0:
+        return [float(value) for value in grid]
+    # With a solver profile in the bundles, its tolerances and method (the output times are always 0 and now_t here)
+    profile = None if bundles is None else bundles.get('profile')
+    result = grid.copy()
+    for columns, model_sol, model_jac in coupled_blocks(grid, bundles):
+        # R is very stiff once it follows its own value, so allow more internal steps than the default 500
+        result[columns] = Solver_Profiles.solve(model_sol, grid[columns], [0, now_t], Dfun=model_jac if jac else None,
+                                                profile=profile, mxstep=5000)[-1]
+    return list(result)
+
+
+# Tolerances used by odeint by default, so that the stepper matches the model functions
+RTOL = 1.49012e-8
+ATOL = 1.49012e-8
+
+class CellStepper:
+    """
+    This class advances the state of one cell from one day to the next, keeping the solvers between calls.
+
+    'Growth_model', 'Ni_model' and 'P_model' integrate from the initial state up to now_t on every call
+    and keep only the last value. A CellStepper keeps one LSODA solver per model instead, so advancing from
+    day k to day k+1 only integrates over that day. advance_to(now_t) returns the same values as the three
+    model functions called with the initial state of the stepper and now_t.
+
+    This is not what engine='cell' computes over a week (see 'StepperComparison'): 'CA.evolution' calls one_cell_run
+    with t = 1 to 7, each time on the state stored the day before, so each day re-integrates the stored state over
+    t+1 time units (35 per week), and the growth model is given the R and Nrint of that state. A stepper integrates
+    one time unit per day, and its growth solver keeps the R and Nrint of its initial state. The trajectories of the
+    two differ from the first day, so the stepper is not an engine of the CA.
+
+    Args:
+        grid (list): The initial state of the cell (R, Nrint, N_org, NH4, NO2, NO3, POP, SRP, P_ma_int, P_R_int).
+        t (int): The time point of the initial state.
+        mode (str): 'split' keeps one solver per model, 'coupled' one solver per block of 'coupled_blocks'.
+        jac (bool): Whether the solvers are given the analytic Jacobians of the models.
+        bundles (dict): The compiled models from 'compile_models', or None to use the reference functions.
+
+    Usage:
+        stepper = CellStepper(grid)
+        grid = stepper.step()   # state at day 1
+        grid = stepper.step()   # state at day 2, only the second day is integrated
+    """
+    def __init__(self, grid, t=0, mode='split', jac=True, bundles=None):
+        if mode not in ('split', 'coupled'):
+            raise ValueError(f"Unknown mode '{mode}', expected 'split' or 'coupled'")
+        self.t = t
+        self.bundles = bundles
+        self.state = np.array(grid, dtype=float)
+        R, Nrint, N_org, NH4, NO2, NO3, POP, SRP, P_ma_int, P_R_int = self.state
+        if mode == 'coupled':
+            # One solver per independent block of the coupled system, as in 'coupled_model'
+            self._solvers = [(columns, _make_solver(model_sol, model_jac if jac else None, self.state[columns], t))
+                             for columns, model_sol, model_jac in coupled_blocks(self.state, bundles)]
+        else:
+            # One solver per model, with the same params as the model functions get in one_cell_run
+            bundles = model_functions(bundles)
+            growth_sol, growth_jac = bundles['Growth']
+            ni_sol, ni_jac = bundles['Ni']
+            p_sol, p_jac = bundles['P']
+            self._solvers = [
+                (slice(0, 2), _make_solver(growth_sol, growth_jac if jac else None, [R, Nrint], t, [NH4, NO3, R, Nrint])),
+                (slice(2, 6), _make_solver(ni_sol, ni_jac if jac else None, [N_org, NH4, NO2, NO3], t, R)),
+                (slice(6, 10), _make_solver(p_sol, p_jac if jac else None,
+                                            [POP, SRP, P_ma_int, P_R_int], t, [R, Nrint, N_org, NH4])),
+            ]
+
+    def step(self, days=1):
+        """
+        Advance the cell by a number of days.
+
+        Args:
+            days (int): The number of days to advance.
+
+        Returns:
+            grid (numpy array): The state of the cell after the step.
+        """
+        return self.advance_to(self.t + days)
+
+    def advance_to(self, now_t):
+        """
+        Advance the cell up to the time point now_t.
+
+        Args:
+            now_t (float): The time point to advance to. It cannot be earlier than the current time of the stepper.
+
+        Returns:
+            grid (numpy array): The state of the cell at now_t.
+        """
+        if now_t < self.t:
+            raise ValueError(f"Cannot step back from t={self.t} to t={now_t}")
+        for part, solver in self._solvers:
+            # Let the solver take its own steps until it has passed now_t
+            while solver.t < now_t:
+                message = solver.step()
+                if solver.status == 'failed':
+                    raise RuntimeError(f"Solver failed at t={solver.t}: {message}")
+            if solver.t == now_t:
+                self.state[part] = solver.y
+            else:
+                # The solver has stepped beyond now_t, interpolate inside its last step
+                self.state[part] = solver.dense_output()(now_t)
+        self.t = now_t
+        return self.state.copy()
+
+def _make_solver(model_sol, model_jac, init, t, *args):
+    # Wrap an odeint style right-hand side f(y, t, *args), and its Jacobian if given, into an LSODA solver with no end time
+    jac = None if model_jac is None else (lambda t, y: model_jac(y, t, *args))
+    return LSODA(lambda t, y: model_sol(y, t, *args), t, init, np.inf, rtol=RTOL, atol=ATOL, jac=jac)
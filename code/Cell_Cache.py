@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+
+"""
+This Python script, 'Cell_Cache.py', puts a deduplicating cache in front of the cell solver 'Cell.one_cell_run'.
+
+Many cells of the grid hold the same 10 variables: on the first day every cell starts from the same values of the Parameters, and as the grid is an int array, which truncates the variables every day, many cells keep identical values for weeks after that. The cells of one day are grouped by their variables, each group is solved once with 'Cell.one_cell_run', and the result is copied back to every cell of the group. The results are also kept in a bounded cache across days and weeks, keyed by the day, the mode, the parameters of the models and the variables of the cell, so a group that has already been solved is not solved again. When the cache is full, the entry that was used least recently is dropped.
+
+The cells are grouped by their exact values by default, which gives the same grid as calling 'one_cell_run' on every cell. With a tolerance, the variables are rounded to multiples of it before grouping, and every cell of a group gets the result of the first cell of the group: fewer solves, but only an approximation of the exact run.
+
+The script contains these key parts:
+
+1. 'CacheReport': The number of cells, solves, hits and evictions of a CellCache, and its hit rate.
+
+2. 'CellCache': The cache, with 'run_cells' for an array of cells and 'run_grid' for the evolving cells of a CA grid.
+
+Usage:
+    cache = CellCache(maxsize=65536)
+    ca = CA_Model.CA(100, 100, cell_cache=cache)
+    ca.evolution(52)
+    print(cache.report())
+"""
+
+__appname__ = 'Cell_Cache'
+__author__ = 'ANQI WANG (aw222@ic.ac.uk)'
+__version__ = '0.0.1'
+__license__ = "None"
+
+from collections import OrderedDict, namedtuple
+
+import numpy as np
+
+import Cell
+
+
+class CacheReport(namedtuple('CacheReport', ['cells', 'groups', 'solves', 'hits', 'evictions', 'size'])):
+    """
+    What a CellCache has saved.
+
+    cells: The number of cells run.
+    groups: The number of groups of identical cells (within the tolerance), summed over the calls.
+    solves: The number of groups solved with 'Cell.one_cell_run'.
+    hits: The number of groups found in the cache.
+    evictions: The number of entries dropped from the full cache.
+    size: The number of entries in the cache.
+    """
+    @property
+    def hit_rate(self):
+        # The share of the cells that did not need their own solve
+        return 1 - self.solves / self.cells if self.cells else 0.0
+
+    def __str__(self):
+        return (f"{self.cells} cells in {self.groups} groups: {self.solves} solves, {self.hits} cache hits "
+                f"({self.hit_rate * 100:.1f}% of the cells not solved), {self.evictions} evictions, "
+                f"{self.size} entries")
+
+
+class CellCache:
+    """
+    This class runs 'Cell.one_cell_run' once per group of identical cells, and keeps the results in a bounded LRU cache.
+
+    Args:
+        maxsize (int): The largest number of results kept across calls. 0 only groups the cells of each call.
+        tolerance (float): If given, the variables of the cells are rounded to multiples of it before grouping, and
+                           each group gets the result of its first cell. Exact grouping if None.
+        jac (bool): Whether the solvers are given the analytic Jacobians, as in 'Cell.one_cell_run'.
+    """
+    def __init__(self, maxsize=65536, tolerance=None, jac=True):
+        if maxsize < 0:
+            raise ValueError(f"maxsize must be at least 0, got {maxsize}")
+        if tolerance is not None and tolerance <= 0:
+            raise ValueError(f"tolerance must be positive or None, got {tolerance}")
+        self.maxsize = maxsize
+        self.tolerance = tolerance
+        self.jac = jac
+        self.entries = OrderedDict()
+        self.cells = self.groups = self.solves = self.hits = self.evictions = 0
+
+    def _group_keys(self, cells):
+        # The values the cells are grouped by: the variables themselves, or their multiples of the tolerance (kept as
+        # floats, as the variables can grow far beyond the range of an int64 once divided by the tolerance)
+        if self.tolerance is None:
+            return np.ascontiguousarray(cells)
+        return np.round(cells / self.tolerance)
+
+    def _store(self, key, result):
+        if self.maxsize == 0:
+            return
+        self.entries[key] = result
+        if len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def run_cells(self, t, cells, mode='split', bundles=None):
+        """
+        Run one time step for an array of cells, solving each group of identical cells once.
+
+        Args:
+            t (int): The current time point, as in 'Cell.one_cell_run'.
+            cells (numpy array (n, 10)): The variables of the cells.
+            mode (str): 'split' or 'coupled', as in 'Cell.one_cell_run'.
+            bundles (dict): The compiled models from 'Cell.compile_models', or None for the values of the Parameters module.
+
+        Returns:
+            numpy array (n, 10): The variables of the cells after the time step, as floats.
+        """
+        cells = np.asarray(cells)
+        if len(cells) == 0:
+            return np.zeros(cells.shape, dtype=float)
+        keys = self._group_keys(cells)
+        unique, first, inverse = np.unique(keys, axis=0, return_index=True, return_inverse=True)
+        # The results are only valid for the same day, mode, parameters of the models and solver profile
+        context = (t, mode) + ((None, None) if bundles is None else (bundles.get('parameters'), bundles.get('profile')))
+        results = np.empty((len(unique), cells.shape[1]), dtype=float)
+        for i, (row, cell) in enumerate(zip(unique, cells[first])):
+            key = context + (row.dtype.str, row.tobytes())
+            result = self.entries.get(key)
+            if result is None:
+                result = np.asarray(Cell.one_cell_run(t, cell, mode, self.jac, bundles), dtype=float)
+                self._store(key, result)
+                self.solves += 1
+            else:
+                self.entries.move_to_end(key)
+                self.hits += 1
+            results[i] = result
+        self.cells += len(cells)
+        self.groups += len(unique)
+        return results[inverse.ravel()]
+
+    def run_grid(self, t, grid, mode='split', bundles=None):
+        """
+        Run one time step for the cells of a CA grid that 'Cell.one_cell_run' evolves (those with all 10 variables
+        non-zero), in place.
+
+        Args:
+            t (int): The current time point, as in 'Cell.one_cell_run'.
+            grid (numpy array (height, width, 10)): The variables of the cells.
+            mode (str): 'split' or 'coupled', as in 'Cell.one_cell_run'.
+            bundles (dict): The compiled models from 'Cell.compile_models'.
+
+        Returns:
+            numpy array: The grid, with the same dtype as before (an int grid truncates the results as one_cell_run does).
+        """
+        evolving = grid.all(axis=-1)
+        if evolving.any():
+            grid[evolving] = self.run_cells(t, grid[evolving], mode, bundles)
+        return grid
+
+    def report(self):
+        """
+        Returns:
+            CacheReport: The number of cells, solves, hits and evictions so far.
+        """
+        return CacheReport(self.cells, self.groups, self.solves, self.hits, self.evictions, len(self.entries))
+
+    def clear(self):
+        # Drop the cached results, but keep the counts
+        self.entries.clear()
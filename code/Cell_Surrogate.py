@@ -0,0 +1,422 @@
+#!/usr/bin/env python3
+
+"""
+This Python script, 'Cell_Surrogate.py', replaces the daily ODE solves of 'Cell.one_cell_run' by a fitted approximation, for studies (e.g. large sensitivity analyses) where the patterns of the CA matter more than the exact nutrient trajectories.
+
+For one set of model parameters, cells are sampled uniformly in a box of the 10 variables, and every sample is run through 'Cell.one_cell_run' for each day of the week (t = 1 to 7, as in 'CA.evolution'). A polynomial in the variables is then fitted by least squares to the new values of each model, for each day. In the split mode the new values of the growth, nitrogen and phosphorus models only depend on the variables of the same model, so each model gets its own polynomial in 2 or 4 variables; in the coupled mode one polynomial in all 10 variables is fitted. The growth rate of R depends exponentially on R, so that R_new spans orders of magnitude over the box, and its log growth over the day, log(R_new / R), is fitted instead of R itself. The variables whose box spans more than a factor of 10 are sampled uniformly in log scale.
+
+A share of the samples is held out of the fit, and the largest and the root mean square error of every variable on them are kept as the error bounds of the surrogate, with the largest exact value of the variable to put them in scale. Cells outside the box, and days that were not fitted, are solved exactly with 'Cell.one_cell_run'.
+
+The cells of a run leave any fixed box quickly: each day moves them further along their trajectory, and R grows by orders of magnitude within a few weeks. So unless it is given a box, a SurrogateEngine fits the box of the cells it is handed ('box_of' the evolving cells of that day), for that day of the week only, and fits it again whenever more than a share of the cells have left it. A fit costs one exact solve per sample, so it is only made when more cells would be emulated than the samples it costs; on a small grid the engine solves every cell exactly, at the cost of engine='cell'.
+
+The script contains these key parts:
+
+1. 'default_box' and 'box_of': A box around the initial state of the cells, or around the cells of a grid (e.g. the evolving cells of a day, or the snapshots of a short exact run).
+
+2. 'CellSurrogate': The fitted polynomials of one set of parameters, with 'fit', 'predict', 'run_cells', 'save' and 'load'.
+
+3. 'SurrogateEngine': Fits a CellSurrogate on the trajectory of the cells (or over a given box, or uses one loaded) for every set of parameters met in a run, and runs the evolving cells of the grid with it (CA(..., engine='surrogate')).
+
+Usage:
+    surrogate = CellSurrogate.fit(parameters, samples=400)
+    print(surrogate.error_table())
+    ca = CA_Model.CA(100, 100, engine='surrogate', surrogate=SurrogateEngine(samples=400))
+    ca.evolution(52)
+    print(ca.surrogate.report())
+"""
+
+__appname__ = 'Cell_Surrogate'
+__author__ = 'ANQI WANG (aw222@ic.ac.uk)'
+__version__ = '0.0.1'
+__license__ = "None"
+
+from collections import namedtuple
+from itertools import combinations_with_replacement
+
+import numpy as np
+
+import Cell
+import Parameters
+
+# Names of the 10 variables of a cell, in the order of 'Cell.one_cell_run'
+VARIABLES = ('R', 'Nrint', 'N_org', 'NH4', 'NO2', 'NO3', 'POP', 'SRP', 'P_ma_int', 'P_R_int')
+# The variables of each model, whose new values only depend on the variables of the same model in the split mode
+BLOCKS = {'split': [slice(0, 2), slice(2, 6), slice(6, 10)], 'coupled': [slice(0, 10)]}
+# The variables fitted as the log of their growth over the day
+LOG_GROWTH = (0,)
+# The days of the week run by 'CA.evolution'
+DAYS = range(1, 8)
+# The number of cells sampled by a fit
+SAMPLES = 400
+
+
+def default_box(parameters=None, low=0.5, high=2.0):
+    """
+    A box around the initial state of the cells.
+
+    Args:
+        parameters (Parameters.ModelParameters): The parameters of the initial state, the Parameters module if None.
+        low (float): The lower corner, as a multiple of the initial state.
+        high (float): The upper corner, as a multiple of the initial state.
+
+    Returns:
+        tuple: The lower and upper corners, two arrays of the 10 variables.
+    """
+    state = np.abs(np.asarray(Cell.initial_state(Parameters if parameters is None else parameters), dtype=float))
+    return state * low, state * high
+
+
+def box_of(cells, margin=0.1):
+    """
+    The box of the cells, widened by a margin on every side.
+
+    Args:
+        cells (numpy array (..., 10)): The variables of the cells, e.g. 'SnapshotStore.grid(week)' of an exact run.
+                                       Only the cells with all variables non-zero (those that evolve) are used.
+        margin (float): The share of the range of each variable added on both sides (below, at most this share of
+                        the smallest value for the positive variables). Where all the cells have the same value, this
+                        share of the value is added instead.
+
+    Returns:
+        tuple: The lower and upper corners, two arrays of the 10 variables.
+    """
+    cells = np.asarray(cells, dtype=float).reshape(-1, len(VARIABLES))
+    cells = cells[cells.all(axis=1)]
+    if len(cells) == 0:
+        raise ValueError("There are no evolving cells to build the box from")
+    lo, hi = cells.min(axis=0), cells.max(axis=0)
+    span = np.where(hi > lo, hi - lo, np.abs(hi))
+    # The variables that are positive in every cell stay positive
+    return np.where(lo > 0, np.maximum(lo - margin * span, lo * (1 - margin)), lo - margin * span), hi + margin * span
+
+
+def polynomial_features(z, degree):
+    """
+    All the monomials of the columns of z up to a degree, the constant first.
+
+    Args:
+        z (numpy array (n, k)): The variables, scaled to [-1, 1].
+        degree (int): The largest degree.
+
+    Returns:
+        numpy array (n, m): One column per monomial.
+    """
+    columns = [np.ones(len(z))]
+    for d in range(1, degree + 1):
+        for combo in combinations_with_replacement(range(z.shape[1]), d):
+            columns.append(np.prod(z[:, combo], axis=1))
+    return np.column_stack(columns)
+
+
+class CellSurrogate:
+    """
+    This class holds the polynomials fitted to 'Cell.one_cell_run' for one set of parameters.
+
+    Args:
+        lo (numpy array): The lower corner of the box of the 10 variables.
+        hi (numpy array): The upper corner of the box.
+        degree (int): The degree of the polynomials.
+        mode (str): 'split' or 'coupled', as in 'Cell.one_cell_run'.
+        coefficients (dict): For each day, the coefficients of the polynomial of each block of BLOCKS[mode].
+        log_growth (dict): For each day, whether each variable is fitted as its log growth.
+        max_error (dict): For each day, the largest held-out error of each variable.
+        rms_error (dict): For each day, the root mean square held-out error of each variable.
+        scale (dict): For each day, the largest absolute exact value of each variable on the held-out cells.
+    """
+    def __init__(self, lo, hi, degree, mode, coefficients, log_growth, max_error, rms_error, scale):
+        if mode not in BLOCKS:
+            raise ValueError(f"Unknown mode '{mode}', expected 'split' or 'coupled'")
+        self.lo = np.asarray(lo, dtype=float)
+        self.hi = np.asarray(hi, dtype=float)
+        self.degree = degree
+        self.mode = mode
+        self.coefficients = coefficients
+        self.log_growth = log_growth
+        self.max_error = max_error
+        self.rms_error = rms_error
+        self.scale = scale
+
+    @classmethod
+    def fit(cls, parameters=None, box=None, samples=SAMPLES, degree=2, mode='split', holdout=0.25, days=DAYS, seed=0,
+            jac=True):
+        """
+        Sample the box, run the samples through 'Cell.one_cell_run' and fit the polynomials.
+
+        Args:
+            parameters (Parameters.ModelParameters): The parameters of the models, the Parameters module if None.
+            box (tuple): The lower and upper corners of the box of the 10 variables, 'default_box(parameters)' if None.
+            samples (int): The number of cells sampled, for the fit and the held-out errors.
+            degree (int): The degree of the polynomials.
+            mode (str): 'split' or 'coupled', as in 'Cell.one_cell_run'.
+            holdout (float): The share of the samples held out of the fit to measure its errors.
+            days (iterable of int): The days fitted.
+            seed (int): The seed of the samples.
+            jac (bool): Whether the exact solves are given the analytic Jacobians.
+
+        Returns:
+            CellSurrogate: The fitted surrogate.
+        """
+        if not 0 < holdout < 1:
+            raise ValueError(f"holdout must be between 0 and 1, got {holdout}")
+        lo, hi = default_box(parameters) if box is None else (np.asarray(box[0], dtype=float), np.asarray(box[1], dtype=float))
+        if np.any(hi < lo):
+            raise ValueError("The upper corner of the box must not be below the lower corner")
+        bundles = Cell.compile_models(Parameters if parameters is None else parameters)
+        rng = np.random.default_rng(seed)
+        cells = lo + (hi - lo) * rng.random((samples, len(VARIABLES)))
+        wide = (lo > 0) & (hi > 10 * lo)
+        cells[:, wide] = np.exp(np.log(lo[wide]) + np.log(hi[wide] / lo[wide]) * rng.random((samples, wide.sum())))
+        test = np.zeros(samples, dtype=bool)
+        test[rng.permutation(samples)[:max(1, int(samples * holdout))]] = True
+        surrogate = cls(lo, hi, degree, mode, {}, {}, {}, {}, {})
+        for t in days:
+            new = np.array([Cell.one_cell_run(t, cell, mode, jac, bundles) for cell in cells], dtype=float)
+            # The log growth can only be fitted where the variable and its new value are positive
+            log_growth = np.zeros(len(VARIABLES), dtype=bool)
+            log_growth[list(LOG_GROWTH)] = (cells[:, LOG_GROWTH] > 0).all(axis=0) & (new[:, LOG_GROWTH] > 0).all(axis=0)
+            targets = surrogate._targets(cells, new, log_growth)
+            features = [surrogate._features(cells[~test], block) for block in BLOCKS[mode]]
+            surrogate.coefficients[t] = [np.linalg.lstsq(f, targets[~test][:, block], rcond=None)[0]
+                                         for f, block in zip(features, BLOCKS[mode])]
+            surrogate.log_growth[t] = log_growth
+            error = surrogate.predict(t, cells[test]) - new[test]
+            surrogate.max_error[t] = np.abs(error).max(axis=0)
+            surrogate.rms_error[t] = np.sqrt(np.square(error).mean(axis=0))
+            surrogate.scale[t] = np.abs(new[test]).max(axis=0)
+        return surrogate
+
+    def _features(self, cells, block):
+        # The monomials of the variables of one block, scaled to [-1, 1] in the box
+        span = np.where(self.hi > self.lo, self.hi - self.lo, 1.0)
+        z = 2 * (cells[:, block] - self.lo[block]) / span[block] - 1
+        return polynomial_features(z, self.degree)
+
+    @staticmethod
+    def _targets(cells, new, log_growth):
+        targets = new.copy()
+        targets[:, log_growth] = np.log(new[:, log_growth] / cells[:, log_growth])
+        return targets
+
+    def inside(self, cells):
+        """
+        Returns:
+            numpy array of bool: Whether each cell lies in the box of the fit.
+        """
+        return ((cells >= self.lo) & (cells <= self.hi)).all(axis=1)
+
+    def predict(self, t, cells):
+        """
+        The new values of the cells after day t, from the polynomials, wherever the cells are.
+
+        Args:
+            t (int): A fitted day.
+            cells (numpy array (n, 10)): The variables of the cells.
+
+        Returns:
+            numpy array (n, 10): Their approximate values after the day.
+        """
+        cells = np.asarray(cells, dtype=float)
+        new = np.empty_like(cells)
+        for block, coefficients in zip(BLOCKS[self.mode], self.coefficients[t]):
+            new[:, block] = self._features(cells, block) @ coefficients
+        log_growth = self.log_growth[t]
+        new[:, log_growth] = cells[:, log_growth] * np.exp(new[:, log_growth])
+        return new
+
+    def run_cells(self, t, cells, bundles=None, jac=True, exact=False):
+        """
+        Run one time step for an array of cells: the cells in the box with the polynomials, the others (and every cell
+        on a day that was not fitted) with 'Cell.one_cell_run'.
+
+        Args:
+            t (int): The current time point, as in 'Cell.one_cell_run'.
+            cells (numpy array (n, 10)): The variables of the cells.
+            bundles (dict): The compiled models for the exact solves, from 'Cell.compile_models'.
+            jac (bool): Whether the exact solves are given the analytic Jacobians.
+            exact (bool): Whether every cell is solved exactly, e.g. because the errors of the fit are too large.
+
+        Returns:
+            tuple: The new values of the cells (numpy array (n, 10)), and whether each cell was emulated.
+        """
+        cells = np.asarray(cells, dtype=float)
+        if exact or t not in self.coefficients:
+            emulated = np.zeros(len(cells), dtype=bool)
+        else:
+            emulated = self.inside(cells)
+        new = np.empty_like(cells)
+        if emulated.any():
+            new[emulated] = self.predict(t, cells[emulated])
+        for i in np.flatnonzero(~emulated):
+            new[i] = Cell.one_cell_run(t, cells[i], self.mode, jac, bundles)
+        return new, emulated
+
+    def relative_error(self):
+        """
+        Returns:
+            numpy array: The largest held-out error of each variable over the fitted days, relative to the largest
+                         exact value of the variable on the same day.
+        """
+        return np.max([self.max_error[t] / np.where(self.scale[t] > 0, self.scale[t], 1.0) for t in self.max_error], axis=0)
+
+    def error_table(self):
+        """
+        Returns:
+            str: The largest held-out errors of every variable over the fitted days, absolute and relative.
+        """
+        lines = [f"{'variable':>10} {'max error':>12} {'rms error':>12} {'relative':>10}"]
+        worst = np.max([self.max_error[t] for t in self.max_error], axis=0)
+        rms = np.max([self.rms_error[t] for t in self.rms_error], axis=0)
+        for name, e, r, relative in zip(VARIABLES, worst, rms, self.relative_error()):
+            lines.append(f"{name:>10} {e:>12.4g} {r:>12.4g} {relative:>10.2%}")
+        return "\n".join(lines)
+
+    def save(self, path):
+        """
+        Save the surrogate into a .npz file.
+        """
+        days = sorted(self.coefficients)
+        arrays = {'lo': self.lo, 'hi': self.hi, 'degree': self.degree, 'mode': self.mode, 'days': days}
+        for t in days:
+            for i, coefficients in enumerate(self.coefficients[t]):
+                arrays[f'coefficients_{t}_{i}'] = coefficients
+            arrays[f'log_growth_{t}'] = self.log_growth[t]
+            arrays[f'max_error_{t}'] = self.max_error[t]
+            arrays[f'rms_error_{t}'] = self.rms_error[t]
+            arrays[f'scale_{t}'] = self.scale[t]
+        np.savez(path, **arrays)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Load a surrogate saved with 'save'.
+        """
+        with np.load(path) as data:
+            mode = str(data['mode'])
+            days = [int(t) for t in data['days']]
+            return cls(data['lo'], data['hi'], int(data['degree']), mode,
+                       {t: [data[f'coefficients_{t}_{i}'] for i in range(len(BLOCKS[mode]))] for t in days},
+                       {t: data[f'log_growth_{t}'] for t in days},
+                       {t: data[f'max_error_{t}'] for t in days},
+                       {t: data[f'rms_error_{t}'] for t in days},
+                       {t: data[f'scale_{t}'] for t in days})
+
+
+class SurrogateReport(namedtuple('SurrogateReport', ['cells', 'emulated', 'fits', 'max_relative_error'])):
+    """
+    What a SurrogateEngine has run.
+
+    cells: The number of cells run.
+    emulated: The number of them run with the polynomials, the others were solved exactly (outside the box, or with
+              a surrogate over the error bound of the engine).
+    fits: The number of surrogates fitted, one per set of parameters and mode.
+    max_relative_error: The largest held-out error of the surrogates used, relative to the largest exact value of
+                        the variable.
+    """
+    def __str__(self):
+        share = self.emulated / self.cells * 100 if self.cells else 0
+        return (f"{self.cells} cells: {self.emulated} ({share:.1f}%) emulated, {self.cells - self.emulated} solved "
+                f"exactly, {self.fits} surrogates fitted, held-out error at most "
+                f"{self.max_relative_error:.2%}")
+
+
+class SurrogateEngine:
+    """
+    This class runs the daily step of the evolving cells of a CA with a CellSurrogate for every set of parameters.
+
+    With a box, a surrogate is fitted over it for all the days of the week the first time a set of parameters is met.
+    Without one, the surrogates follow the trajectory of the cells: on each day of the week, the surrogate of that day
+    is fitted on 'box_of' the evolving cells, and fitted again when more than refit_share of them are outside its box.
+    As a fit costs one exact solve per sample, it is only made when more cells are outside the box than it samples;
+    until then, the cells are solved exactly.
+
+    Args:
+        box (tuple): The lower and upper corners of the box of the fit, the box of the cells of each day if None.
+        surrogates (dict): Surrogates already fitted or loaded, keyed by (parameters, mode), used for all the days
+                           and never fitted again.
+        max_relative_error (float): If given, a surrogate whose held-out error (see 'CellSurrogate.relative_error') is
+                                    larger for any variable is not used, and its cells are solved exactly.
+        refit_share (float): The share of the cells outside the box of the surrogate of a day above which it is
+                             fitted again, without a box.
+        margin (float): The margin of the box of the cells, as in 'box_of'.
+        **fit_args: Other arguments of 'CellSurrogate.fit', e.g. samples or degree.
+    """
+    def __init__(self, box=None, surrogates=None, max_relative_error=None, refit_share=0.5, margin=0.1, **fit_args):
+        if not 0 <= refit_share < 1:
+            raise ValueError(f"refit_share must be at least 0 and below 1, got {refit_share}")
+        self.box = box
+        self.max_relative_error = max_relative_error
+        self.refit_share = refit_share
+        self.margin = margin
+        self.surrogates = {} if surrogates is None else dict(surrogates)
+        self.fit_args = fit_args
+        self.cells = self.emulated = self.fits = 0
+        self.used = set()
+
+    def surrogate(self, parameters, mode='split', t=None, cells=None):
+        """
+        Args:
+            parameters (Parameters.ModelParameters): The parameters of the models.
+            mode (str): 'split' or 'coupled', as in 'Cell.one_cell_run'.
+            t (int): The day of the week, for the surrogates that follow the trajectory of the cells.
+            cells (numpy array (n, 10)): The evolving cells of the day, for the surrogates that follow their trajectory.
+
+        Returns:
+            CellSurrogate: The surrogate of a set of parameters (and of the day, without a box), fitted now if it is
+                           not known yet or the cells have left its box, or None if a fit would cost more exact solves
+                           than it saves.
+        """
+        key = (parameters, mode)
+        if key not in self.surrogates and self.box is None and cells is not None:
+            key = (parameters, mode, t)
+            surrogate = self.surrogates.get(key)
+            outside = len(cells) if surrogate is None else int((~surrogate.inside(cells)).sum())
+            if outside > self.refit_share * len(cells) and outside > self.fit_args.get('samples', SAMPLES):
+                surrogate = self.surrogates[key] = CellSurrogate.fit(parameters, box_of(cells, self.margin), mode=mode,
+                                                                     days=(t,), **self.fit_args)
+                self.fits += 1
+            if surrogate is None:
+                return None
+        elif key not in self.surrogates:
+            self.surrogates[key] = CellSurrogate.fit(parameters, self.box, mode=mode, **self.fit_args)
+            self.fits += 1
+        self.used.add(key)
+        return self.surrogates[key]
+
+    def run_grid(self, t, grid, mode='split', bundles=None):
+        """
+        Run one time step for the cells of a CA grid that 'Cell.one_cell_run' evolves, in place.
+
+        Args:
+            t (int): The current time point, as in 'Cell.one_cell_run'.
+            grid (numpy array (height, width, 10)): The variables of the cells.
+            mode (str): 'split' or 'coupled', as in 'Cell.one_cell_run'.
+            bundles (dict): The compiled models from 'Cell.compile_models'.
+
+        Returns:
+            numpy array: The grid, with the same dtype as before.
+        """
+        evolving = grid.all(axis=-1)
+        if evolving.any():
+            parameters = Cell.model_functions(bundles).get('parameters', Parameters)
+            if parameters is Parameters:
+                parameters = Parameters.default_parameters()
+            cells = grid[evolving].astype(float)
+            surrogate = self.surrogate(parameters, mode, t, cells)
+            if surrogate is None:
+                new = np.array([Cell.one_cell_run(t, cell, mode, bundles=bundles) for cell in cells])
+                emulated = np.zeros(len(cells), dtype=bool)
+            else:
+                exact = self.max_relative_error is not None and surrogate.relative_error().max() > self.max_relative_error
+                new, emulated = surrogate.run_cells(t, cells, bundles, exact=exact)
+            grid[evolving] = new
+            self.cells += len(new)
+            self.emulated += int(emulated.sum())
+        return grid
+
+    def report(self):
+        """
+        Returns:
+            SurrogateReport: The number of cells emulated and solved exactly, and the error bound of the surrogates used.
+        """
+        errors = [self.surrogates[key].relative_error().max() for key in self.used if self.surrogates[key].max_error]
+        return SurrogateReport(self.cells, self.emulated, self.fits, max(errors, default=0.0))
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+This script measures the cold start time of the command line entry point ('cli.py'): the wall time of 'python cli.py --help' and of the help of every subcommand, each run in a fresh Python process, as a shell would start it. It also times the import of the modules that every worker process of a pool loads ('import CA_Model', ...).
+
+Every command is run several times and the median is kept. The medians are printed, and appended to a CSV log with the date and the git commit of the code, so that the start time can be followed from one change to the next. With a budget (in seconds), the script exits with an error if the median of any command of cli.py is over it (the modules of the model need scipy, and are only tracked).
+
+Usage:
+    python ColdStartBenchmark.py [runs] [budget]
+"""
+__appname__ = 'ColdStartBenchmark'
+__author__ = 'ANQI WANG (aw222@ic.ac.uk)'
+__version__ = '0.0.1'
+__license__ = "None"
+
+import csv
+import datetime
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+# The script that is timed, next to this one
+CLI = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cli.py')
+
+# The commands that are timed: the arguments given to cli.py
+COMMANDS = [['--help'], ['run', '--help'], ['sweep', '--help'], ['ensemble', '--help'], ['compare', '--help'],
+            ['analyze', '--help']]
+
+# The modules whose import is timed
+MODULES = ['Parameters', 'CA_Model', 'Ensemble']
+
+# The CSV log of the results
+LOG = 'cold_start.csv'
+
+
+def git_commit():
+    '''
+    Return the short hash of the git commit of the code, or '' outside a git repository
+    '''
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=os.path.dirname(CLI), capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ''
+
+
+def cold_start(args, runs=5):
+    '''
+    Run 'python args' in a fresh process 'runs' times, and return the median wall time in seconds
+    '''
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable] + args, stdout=subprocess.DEVNULL, check=True, cwd=os.path.dirname(CLI))
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def benchmark(runs=5, commands=COMMANDS, modules=MODULES):
+    '''
+    Time every command and the import of every module, and return their names and median wall times
+    '''
+    rows = [(' '.join(args), cold_start([CLI] + args, runs)) for args in commands]
+    rows += [(f"import {module}", cold_start(['-c', f"import {module}"], runs)) for module in modules]
+    return rows
+
+
+def log_results(rows, path=LOG):
+    '''
+    Append the results to the CSV log, with the date and the git commit
+    '''
+    new = not os.path.exists(path)
+    date = datetime.datetime.now().isoformat(timespec='seconds')
+    commit = git_commit()
+    with open(path, 'a', newline='') as f:
+        writer = csv.writer(f)
+        if new:
+            writer.writerow(['date', 'commit', 'command', 'seconds'])
+        for command, seconds in rows:
+            writer.writerow([date, commit, command, f"{seconds:.4f}"])
+
+
+if __name__ == "__main__":
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    budget = float(sys.argv[2]) if len(sys.argv) > 2 else None
+    rows = benchmark(runs)
+    log_results(rows)
+    print(f"Cold start of cli.py and of the modules, median of {runs} runs")
+    for command, seconds in rows:
+        print(f"{command:>18} {seconds:>8.3f} s")
+    over = [command for command, seconds in rows[:len(COMMANDS)] if budget is not None and seconds > budget]
+    if over:
+        sys.exit(f"Over the budget of {budget} s: {', '.join(over)}")
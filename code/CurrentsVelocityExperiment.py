@@ -2,6 +2,7 @@
 """
 This script simulates and visualizes a Modified Mock Cellular Automata model to explore the effect of varying current velocities on seagrass growth.
 The grid-based simulation evolves over time based on given parameters and rules. The output grids are saved as CSV files and visualized using Matplotlib.
+The experiment only runs when the script is run directly, not when it is imported.
 """
 
 __appname__ = 'CurrentsVelocityExperiment'
@@ -11,8 +12,6 @@ __license__ = "None"
 
 # Import required libraries
 import numpy as np
-import pandas as pd
-import matplotlib.pyplot as plt
 
 # Define mock parameters for the cellular automata model
 # These include various physical and environmental parameters
@@ -82,33 +81,37 @@ grid_size = (100, 100)
 current_velocities = [0.5, 1.5, 3.0]
 velocity_labels = ['low', 'medium', 'high']
 
-# Initialize the plot to visualize the output grids
-fig, axes = plt.subplots(1, 3, figsize=(18, 6))
+if __name__ == "__main__":
+    import pandas as pd
+    import matplotlib.pyplot as plt
 
-# Loop through each velocity to generate, visualize, and save the grids
-for ax, (velocity, label) in zip(axes, zip(current_velocities, velocity_labels)):
-    grid = run_mock_ca_model(velocity, grid_size)
-    
-    # Flatten the grid and save it to a CSV file through a Pandas DataFrame
-    flattened_grid = grid.flatten()
-    df = pd.DataFrame({
-        'Seagrass_Coverage': flattened_grid,
-        'Current_Velocity': [velocity] * len(flattened_grid)
-    })
-    df.to_csv(f'../data/seagrass_coverage_{label}_velocity.csv', index=False)
-    
-    # Visualization of the grid
-    ax.imshow(grid, cmap="GnBu", origin='lower')
-    ax.set_title(f"Current Velocity: {velocity} m/s", fontsize=20, fontweight = 'bold')
-    ax.set_xticks(np.arange(0, grid_size[0], 10))
-    ax.set_yticks(np.arange(0, grid_size[1], 10))
-    ax.set_xticklabels([])
-    ax.set_yticklabels([])
-    ax.grid(which='both', axis='both', linestyle='-', color='white', linewidth=0.5)
+    # Initialize the plot to visualize the output grids
+    fig, axes = plt.subplots(1, 3, figsize=(18, 6))
 
-# Finalize the plot and display
-plt.tight_layout()
-plt.subplots_adjust(top=5)
-# Uncomment the following line to set a super title for the plot
-# plt.suptitle("Seagrass Growth Patterns for Different Current Velocities", y=0.95, fontsize=20)
-plt.show()
+    # Loop through each velocity to generate, visualize, and save the grids
+    for ax, (velocity, label) in zip(axes, zip(current_velocities, velocity_labels)):
+        grid = run_mock_ca_model(velocity, grid_size)
+        
+        # Flatten the grid and save it to a CSV file through a Pandas DataFrame
+        flattened_grid = grid.flatten()
+        df = pd.DataFrame({
+            'Seagrass_Coverage': flattened_grid,
+            'Current_Velocity': [velocity] * len(flattened_grid)
+        })
+        df.to_csv(f'../data/seagrass_coverage_{label}_velocity.csv', index=False)
+        
+        # Visualization of the grid
+        ax.imshow(grid, cmap="GnBu", origin='lower')
+        ax.set_title(f"Current Velocity: {velocity} m/s", fontsize=20, fontweight = 'bold')
+        ax.set_xticks(np.arange(0, grid_size[0], 10))
+        ax.set_yticks(np.arange(0, grid_size[1], 10))
+        ax.set_xticklabels([])
+        ax.set_yticklabels([])
+        ax.grid(which='both', axis='both', linestyle='-', color='white', linewidth=0.5)
+
+    # Finalize the plot and display
+    plt.tight_layout()
+    plt.subplots_adjust(top=5)
+    # Uncomment the following line to set a super title for the plot
+    # plt.suptitle("Seagrass Growth Patterns for Different Current Velocities", y=0.95, fontsize=20)
+    plt.show()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+
+"""
+This Python script, 'Ensemble.py', runs an ensemble of independent replicates of the CA, spread over a pool of worker processes, to get confidence bands on the stochastic seagrass dynamics.
+
+Each replicate gets its own numpy.random.Generator, spawned from a numpy.random.SeedSequence of the root seed, and uses it for all the random numbers of its transition rules. The replicates do not share any random state, so re-running an ensemble with the same root seed gives the same results, whatever the number of processes.
+
+The share of cells in each state ('Empty', 'Germinating' and 'Seagrass') is written by every replicate at the end of each week into one (replicates, weeks, 3) array. The array is a .npy file opened as a memory map by the workers, so the results stream in while the replicates run and can be read before the ensemble has finished.
+
+The script contains two key functions:
+
+1. 'run_replicate': Runs one replicate and writes its weekly state shares into its row of the results array.
+
+2. 'run_ensemble': Runs all the replicates in a process pool and returns the results array.
+
+Usage:
+    coverage = run_ensemble(100, 52, root_seed=1, processes=8)[..., Parameters.SEAGRASS]
+"""
+
+__appname__ = 'Ensemble'
+__author__ = 'ANQI WANG (aw222@ic.ac.uk)'
+__version__ = '0.0.1'
+__license__ = "None"
+
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+import numpy as np
+from numpy.lib.format import open_memmap
+
+import CA_Model
+
+
+def run_replicate(index, seed, width, height, num_of_weeks, path, ca_args):
+    """
+    Run one replicate of the CA, and write the share of cells in each state after every week into row 'index' of the results array.
+
+    Args:
+        index (int): The row of the replicate in the results array.
+        seed (numpy.random.SeedSequence): The seed of the random numbers of the replicate.
+        width (int): The width of the grid.
+        height (int): The height of the grid.
+        num_of_weeks (int): The number of weeks to run.
+        path (str): The .npy file of the results array.
+        ca_args (dict): Other arguments of CA, e.g. engine, mode or transition.
+
+    Returns:
+        int: The index of the replicate.
+    """
+    results = open_memmap(path, mode='r+')
+    ca = CA_Model.CA(width, height, plot_results=False, rng=np.random.default_rng(seed), snapshots=None, **ca_args)
+    ca.initialize_grid()
+
+    def record(m, ca):
+        results[index, m] = np.bincount(ca.state.ravel(), minlength=3)[:3] / ca.state.size
+        results.flush()
+
+    ca.evolution(num_of_weeks, callback=record)
+    return index
+
+
+def run_ensemble(num_replicates, num_of_weeks, root_seed=None, processes=None, width=100, height=100, path=None, **ca_args):
+    """
+    Run independent replicates of the CA in a process pool.
+
+    Args:
+        num_replicates (int): The number of replicates.
+        num_of_weeks (int): The number of weeks to run each replicate.
+        root_seed (int): The root seed of the ensemble. The same root seed gives the same results.
+        processes (int): The number of worker processes, the number of cores if None. With 1, the replicates are run
+                         one after the other in this process.
+        width (int): The width of the grid.
+        height (int): The height of the grid.
+        path (str): The .npy file to write the results array into. If None, a temporary file is used and removed
+                    once the results are loaded.
+        **ca_args: Other arguments of CA, e.g. engine='batch' or transition='synchronous'.
+
+    Returns:
+        numpy array (num_replicates, num_of_weeks, 3): The share of cells that are 'Empty', 'Germinating' and
+                                                       'Seagrass' (Parameters.EMPTY, GERMINATING and SEAGRASS) after each week.
+    """
+    seeds = np.random.SeedSequence(root_seed).spawn(num_replicates)
+    temporary = path is None
+    if temporary:
+        handle, path = tempfile.mkstemp(suffix='.npy')
+        os.close(handle)
+    # Weeks that have not been run yet stay NaN
+    results = open_memmap(path, mode='w+', dtype=float, shape=(num_replicates, num_of_weeks, 3))
+    results[...] = np.nan
+    results.flush()
+    args = (range(num_replicates), seeds, repeat(width), repeat(height), repeat(num_of_weeks), repeat(path), repeat(ca_args))
+    try:
+        if processes == 1:
+            for replicate in zip(*args):
+                run_replicate(*replicate)
+        else:
+            with ProcessPoolExecutor(processes) as executor:
+                # Raise the error of any replicate that failed
+                for _ in executor.map(run_replicate, *args):
+                    pass
+        results = np.array(open_memmap(path, mode='r')) if temporary else open_memmap(path, mode='r')
+    finally:
+        if temporary:
+            os.remove(path)
+    return results
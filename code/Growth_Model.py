@@ -3,11 +3,15 @@
 """
 This Python script, 'Growth_Model.py', models the growth of seagrass using ordinary differential equations (ODEs). The model focuses on the seagrass's uptake of nitrogen and its rate of growth, considering various environmental and physiological factors.
 
-The script contains two key functions:
+The script contains four key functions:
 
 1. 'Growth_model_sol': This function calculates the derivative (rate of change) of the seagrass's nitrogen internalization rate (Nrint) and growth rate (R) at a given time. The rates are influenced by parameters like the concentration of nitrogen sources (NH4 and NO3), the temperature, and the light conditions.
 
-2. 'Growth_model': This function computes the current values of Nrint and R for a given set of initial conditions and parameters. It employs the 'odeint' function from the scipy library to numerically solve the system of ODEs defined in 'Growth_model_sol'.
+2. 'Growth_model_jac' and 'Growth_model_params_jac': These functions return the analytic Jacobian of 'Growth_model_sol' with respect to the state, and with respect to the R and Nrint given in params, so that the solver does not have to estimate them by finite differences.
+
+3. 'compile_Growth_model': This function returns versions of 'Growth_model_sol' and 'Growth_model_jac' with every term that does not depend on the state computed once, for use in the inner loop of the solver.
+
+4. 'Growth_model': This function computes the current values of Nrint and R for a given set of initial conditions and parameters. It employs the 'odeint' function from the scipy library to numerically solve the system of ODEs defined in 'Growth_model_sol', with the tolerances, output times and method of a solver profile if one is given (see 'Solver_Profiles').
 
 The model provides a detailed understanding of how various factors affect seagrass growth, which could be helpful in studying seagrass ecology and predicting seagrass dynamics under different environmental scenarios.
 """
@@ -20,13 +24,17 @@ __license__ = "None"
 
 import math
 import numpy as np
-from scipy.integrate import odeint
+
+import Solver_Profiles
 
 
 def Growth_model_sol(R_and_Nrint, t, params):
     """
     Calculate the derivative of R and Nrint at time t.
 
+    Only NumPy operations are applied to the state and params, so R_and_Nrint and params may also hold one
+    column per cell (shapes (2, n) and (4, n)) to evaluate a whole batch of cells at once.
+
     Args:
         R_and_Nrint (tuple of float): A tuple containing the current values of R and Nrint.
         t (float): The current time.
@@ -57,7 +65,7 @@ def Growth_model_sol(R_and_Nrint, t, params):
     
     R_max = 250
     SL = 5
-    f_R = 1- math.exp(-(R-R_max)/SL)
+    f_R = 1- np.exp(-(R-R_max)/SL)
     
     T = 12
     To = 26
@@ -84,9 +92,130 @@ def Growth_model_sol(R_and_Nrint, t, params):
     return du_dt
 
 
+def Growth_model_jac(R_and_Nrint, t, params):
+    """
+    Calculate the Jacobian of Growth_model_sol with respect to R and Nrint.
+
+    Growth_model_sol takes R and Nrint from params, i.e. the values at the start of the solve, so its derivatives do not
+    depend on the state and the Jacobian is zero. See 'Growth_model_params_jac' for the derivatives with respect to params.
+
+    Args:
+        R_and_Nrint (tuple of float): A tuple containing the current values of R and Nrint.
+        t (float): The current time.
+        params (list or numpy array of four floats): The params from Ni_model_sol
+
+    Returns:
+        numpy array (2, 2): J[i][j] is the derivative of the i-th equation (R, Nrint) with respect to the j-th variable.
+                            With one column per cell in params, the shape is (2, 2, n).
+    """
+    return np.zeros((2, 2) + np.shape(params[2]))
+
+
+def Growth_model_params_jac(t, params):
+    """
+    Calculate the derivatives of Growth_model_sol with respect to the R and Nrint given in params.
+
+    This is the Jacobian of the growth equations when R and Nrint follow the state, as in 'Cell.coupled_model_sol'.
+
+    Args:
+        t (float): The current time.
+        params (list or numpy array of four floats): NH4, NO3, R and Nrint (NH4 and NO3 are fixed in Growth_model_sol).
+
+    Returns:
+        numpy array (2, 2): J[i][j] is the derivative of the i-th equation (R, Nrint) with respect to R (j=0) or Nrint (j=1).
+                            With one column per cell in params, the shape is (2, 2, n).
+    """
+    R, Nrint = params[2], params[3]
+    # Same constants as in Growth_model_sol
+    p_N = 0.1
+    N_min = 10
+    N_cri = 15
+    R_max = 250
+    SL = 5
+    T = 12
+    To = 26
+    c = 1
+    d = 3
+    b = 2
+    a = 5
+    fo = 14
+    p_max = 1
+    SR = 0.041
+
+    f_Nrint = (Nrint - N_min)/(N_cri - N_min)
+    exp_R = np.exp(-(R-R_max)/SL)
+    f_R = 1 - exp_R
+    fR_T = 1/(1+(((T-To)/c)**2)**d)
+    g_d = 1 - 1/(1+ b* math.exp(a*(fo - d)))
+    p = p_max * g_d * fR_T * f_Nrint * f_R
+    omega_R = SR * (0.098 + math.exp(-6.59 + 0.2217*T))
+
+    jac = np.zeros((2, 2) + np.shape(R))
+    # dR/dt = (p - omega_R) * R, where p depends on R through f_R and on Nrint through f_Nrint
+    jac[0, 0] = (p - omega_R) + R * p_max * g_d * fR_T * f_Nrint * exp_R / SL
+    jac[0, 1] = R * p_max * g_d * fR_T * f_R / (N_cri - N_min)
+    # dNrint/dt = uptake - p_N * Nrint
+    jac[1, 1] = -p_N
+    return jac
+
+
+def compile_Growth_model(season=None):
+    """
+    Build a right-hand side and Jacobian of the growth model with the state-independent terms computed once.
+
+    The nitrogen uptake, the temperature and depth limitations and the mortality of Growth_model_sol do not depend on the
+    state, so they are computed here and the returned functions only do the arithmetic on R and Nrint.
+
+    Args:
+        season: The season parameters. Growth_model_sol does not read any, the argument is there so that all three
+                models are compiled the same way (see 'Cell.compile_models').
+
+    Returns:
+        tuple: (sol, jac), with the same signatures and results as Growth_model_sol and Growth_model_jac.
+    """
+    # Same constants as in Growth_model_sol
+    v_R_NH4 = 0.1
+    NH4 = 0.3
+    K_NH4 = 0.13
+    v_R_NO3 = 0.29
+    NO3 = 1.2
+    K_NO3 = 0.25
+    p_N = 0.1
+    N_min = 10
+    N_cri = 15
+    R_max = 250
+    SL = 5
+    T = 12
+    To = 26
+    c = 1
+    d = 3
+    b = 2
+    a = 5
+    fo = 14
+    p_max = 1
+    SR = 0.041
+
+    # State-independent terms
+    uptake = v_R_NH4 * NH4 / (NH4 + K_NH4) + v_R_NO3 * NO3 /(NO3 + K_NO3)
+    fR_T = 1/(1+(((T-To)/c)**2)**d)
+    g_d = 1 - 1/(1+ b* math.exp(a*(fo - d)))
+    p_scale = p_max * g_d * fR_T / (N_cri - N_min)
+    omega_R = SR * (0.098 + math.exp(-6.59 + 0.2217*T))
+
+    def sol(R_and_Nrint, t, params):
+        R, Nrint = params[2], params[3]
+        p = p_scale * (Nrint - N_min) * (1 - np.exp(-(R-R_max)/SL))
+        return [(p - omega_R)*R, uptake - p_N*Nrint]
+
+    def jac(R_and_Nrint, t, params):
+        return np.zeros((2, 2) + np.shape(params[2]))
+
+    return sol, jac
+
+
 
 # This method calculates the current R and Nrint using a given Growth_model
-def Growth_model(a,b,c,d,now_t):
+def Growth_model(a,b,c,d,now_t,jac=True,bundle=None,parameters=None,profile=None):
     # set class variables according to the passed parameters
     NH4,NO3,R,Nrint = a,b,c,d
     
@@ -94,10 +223,18 @@ def Growth_model(a,b,c,d,now_t):
     growth_init = [R,Nrint]
     # generate a range of time steps
     t = np.linspace(0, now_t, num=now_t+1)  # Generate an array of time points   
+    # a solver profile (a Solver_Profiles.SolverProfile) may only ask for the values at 0 and now_t
+    t = Solver_Profiles.sample_times(t, now_t, profile)
     # define parameters for the ODE
     params = [NH4,NO3,R,Nrint]
     # solve the ODE using scipy's odeint function
-    result =odeint(Growth_model_sol,growth_init,t,args=(params,)) 
+    # bundle is a (sol, jac) pair from compile_Growth_model, used in place of Growth_model_sol and Growth_model_jac,
+    # and parameters (a Parameters.ModelParameters) builds one for those parameters
+    if bundle is None and parameters is not None:
+        bundle = compile_Growth_model(parameters)
+    model_sol, model_jac = bundle if bundle is not None else (Growth_model_sol, Growth_model_jac)
+    # jac=True hands the analytic Jacobian to the solver instead of letting it estimate one by finite differences
+    result =Solver_Profiles.solve(model_sol,growth_init,t,args=(params,),Dfun=model_jac if jac else None,profile=profile) 
     # split the results into separate variables
     sol_R = result[:,0]
     sol_Nrint = result[:,1]
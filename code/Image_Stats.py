@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+
+"""
+This Python script, 'Image_Stats.py', reads the weekly images of archived runs ('week_N.png' files, drawn in black for empty cells, gray (128) for germinating cells and white (255) for seagrass) and counts the pixels of each gray level, to recover the coverage and germination of runs that were saved only as images.
+
+The images are decoded in a pool of worker processes, and each image is counted with one np.bincount pass over its gray levels. The counts of every image are kept in a JSON cache, with the modification time and size of the file, so analysing the same folders again only decodes the images that are new or have changed.
+
+The script contains these key functions:
+
+1. 'scan_images': Lists the 'week_N.png' files of a folder, in the order of the weeks.
+
+2. 'image_counts': Counts the black, gray and white pixels of one image.
+
+3. 'ingest': Counts the images of several folders in a process pool, using and updating the cache, and returns one table per folder with the same 'week', 'coverage' and 'germinating' columns (in %) as 'Metrics.load_metrics'.
+
+Usage:
+    tables = ingest(['../results/5yrs_Scenario_images/Gray/RIS_5yrs_image'], processes=8)
+    python Image_Stats.py folder [folder ...]
+"""
+
+__appname__ = 'Image_Stats'
+__author__ = 'ANQI WANG (aw222@ic.ac.uk)'
+__version__ = '0.0.1'
+__license__ = "None"
+
+import json
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from PIL import Image
+
+import Rendering
+
+# Gray levels of the empty, germinating and seagrass cells in the images
+LEVELS = Rendering.GRAY_LEVELS
+
+# Default cache file of the pixel counts, in the current folder
+CACHE = 'image_stats.json'
+
+# Columns of the tables returned by 'ingest'
+DTYPE = np.dtype([('week', np.int32), ('black', np.int64), ('gray', np.int64), ('white', np.int64),
+                  ('total', np.int64), ('coverage', np.float64), ('germinating', np.float64)])
+
+
+def scan_images(folder):
+    """
+    List the weekly images of a folder.
+
+    Args:
+        folder (str): The folder of the 'week_N.png' files.
+
+    Returns:
+        list: The (week, path) of each image, sorted by week.
+    """
+    images = []
+    for name in os.listdir(folder):
+        match = re.fullmatch(r'week_(\d+)\.png', name)
+        if match:
+            images.append((int(match.group(1)), os.path.join(folder, name)))
+    return sorted(images)
+
+
+def image_counts(path):
+    """
+    Count the black, gray and white pixels of an image, read as a grayscale image.
+
+    Args:
+        path (str): The image file.
+
+    Returns:
+        list: The numbers of pixels at each level of LEVELS, then the total number of pixels.
+    """
+    with Image.open(path) as image:
+        pixels = np.asarray(image.convert('L'))
+    counts = np.bincount(pixels.ravel(), minlength=256)
+    return [int(counts[level]) for level in LEVELS] + [int(pixels.size)]
+
+
+def _stamp(path):
+    # What makes a cached count out of date: the modification time and the size of the file
+    info = os.stat(path)
+    return [info.st_mtime_ns, info.st_size]
+
+
+def load_cache(path):
+    if path is None or not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_cache(cache, path):
+    # Write to a new file first, so that an interrupted run does not leave half a cache
+    with open(path + '.tmp', 'w') as f:
+        json.dump(cache, f)
+    os.replace(path + '.tmp', path)
+
+
+def ingest(folders, processes=None, cache=CACHE):
+    """
+    Count the pixels of the weekly images of several folders.
+
+    Args:
+        folders (list of str): The folders of the 'week_N.png' files, e.g. one per scenario.
+        processes (int): The number of worker processes, the number of cores if None. With 1, the images are
+                         decoded in this process.
+        cache (str): The JSON file of the cached counts, read and updated. No cache is used if None.
+
+    Returns:
+        dict: For each folder, a numpy structured array with one row per image and the columns of DTYPE.
+    """
+    cached = load_cache(cache)
+    images = {folder: scan_images(folder) for folder in folders}
+    stamps = {}
+    todo = []
+    for folder in folders:
+        for week, path in images[folder]:
+            key = os.path.abspath(path)
+            stamps[key] = _stamp(path)
+            entry = cached.get(key)
+            if entry is None or entry['stamp'] != stamps[key]:
+                todo.append(key)
+
+    if todo:
+        if processes == 1:
+            counts = map(image_counts, todo)
+        else:
+            executor = ProcessPoolExecutor(processes)
+            counts = executor.map(image_counts, todo, chunksize=max(1, len(todo) // (4 * (processes or os.cpu_count() or 1))))
+        try:
+            for key, count in zip(todo, counts):
+                cached[key] = {'stamp': stamps[key], 'counts': count}
+        finally:
+            if processes != 1:
+                executor.shutdown()
+            if cache is not None:
+                save_cache(cached, cache)
+
+    tables = {}
+    for folder in folders:
+        table = np.zeros(len(images[folder]), dtype=DTYPE)
+        for row, (week, path) in enumerate(images[folder]):
+            black, gray, white, total = cached[os.path.abspath(path)]['counts']
+            table[row] = (week, black, gray, white, total, white / total * 100, gray / total * 100)
+        tables[folder] = table
+    return tables
+
+
+if __name__ == "__main__":
+    for folder, table in ingest(sys.argv[1:]).items():
+        last = table[-1] if len(table) else None
+        print(f"{folder}: {len(table)} images" +
+              (f", week {last['week']}: coverage {last['coverage']:.2f}%, germinating {last['germinating']:.2f}%" if last is not None else ""))
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+This script measures what the analytic Jacobians of 'Growth_model_sol', 'Ni_model_sol' and 'P_model_sol' save in 'Cell.one_cell_run'.
+
+A sample of cells is run through 'one_cell_run' twice, once with jac=False (odeint estimates the Jacobians by finite differences) and once with jac=True (odeint is given 'Growth_model_jac', 'Ni_model_jac' and 'P_model_jac'). The right-hand side and Jacobian functions are wrapped with call counters, and the script prints the number of evaluations and the wall time per 'one_cell_run', for the split and the coupled mode. The same comparison is then made for 'Batch_Model.batch_run', which solves the whole sample with one call (one call per block of 'Cell.coupled_blocks' in the coupled mode).
+
+Usage:
+    python JacobianBenchmark.py
+"""
+__appname__ = 'JacobianBenchmark'
+__author__ = 'ANQI WANG (aw222@ic.ac.uk)'
+__version__ = '0.0.1'
+__license__ = "None"
+
+import time
+import numpy as np
+
+import Batch_Model
+import Cell
+import Growth_Model
+import Ni_Model
+import P_Model
+
+# The functions whose calls are counted, as (module, function name)
+COUNTED = [(Growth_Model, 'Growth_model_sol'), (Ni_Model, 'Ni_model_sol'), (P_Model, 'P_model_sol'),
+           (Growth_Model, 'Growth_model_jac'), (Ni_Model, 'Ni_model_jac'), (P_Model, 'P_model_jac'),
+           (Growth_Model, 'Growth_model_params_jac'), (Batch_Model, 'batch_model_sol'),
+           (Batch_Model, 'batch_model_jac')]
+# Number of cells in the sample
+NUM_CELLS = 200
+
+
+def sample_cells(num_cells, seed=0):
+    '''
+    Draw cells around the default initial values, between half and twice each value
+    '''
+    rng = np.random.default_rng(seed)
+    init = np.array([70, 2.4, 25, 0.05, 0.01, 0.22, 0.23, 0.12, 0.02, 0.02])
+    return init * rng.uniform(0.5, 2, (num_cells, len(init)))
+
+
+def run_counted(cells, t, mode, jac, batch=False):
+    '''
+    Run one_cell_run on every cell (or batch_run on all of them) and count the calls of the right-hand sides and Jacobians
+    '''
+    counts = {name: 0 for _, name in COUNTED}
+    originals = {}
+    for module, name in COUNTED:
+        originals[(module, name)] = func = getattr(module, name)
+        def counted(*args, _func=func, _name=name):
+            counts[_name] += 1
+            return _func(*args)
+        setattr(module, name, counted)
+    try:
+        start = time.perf_counter()
+        if batch:
+            Batch_Model.batch_run(t, cells, mode, jac)
+        else:
+            for cell in cells:
+                Cell.one_cell_run(t, cell, mode, jac)
+        elapsed = time.perf_counter() - start
+    finally:
+        # Put the original functions back
+        for (module, name), func in originals.items():
+            setattr(module, name, func)
+    return counts, elapsed
+
+
+def benchmark(num_cells=NUM_CELLS, t=3, seed=0):
+    '''
+    Compare one_cell_run with and without the analytic Jacobians, in the split and the coupled mode
+    '''
+    cells = sample_cells(num_cells, seed)
+    rows = []
+    for mode in ('split', 'coupled'):
+        for jac in (False, True):
+            counts, elapsed = run_counted(cells, t, mode, jac)
+            # Both modes solve the three models separately ('Cell.coupled_blocks' in the coupled mode)
+            rhs = counts['Growth_model_sol'] + counts['Ni_model_sol'] + counts['P_model_sol']
+            jacs = (counts['Growth_model_jac'] + counts['Growth_model_params_jac'] + counts['Ni_model_jac']
+                    + counts['P_model_jac'])
+            rows.append((mode, jac, rhs / num_cells, jacs / num_cells, elapsed / num_cells * 1000))
+    return rows
+
+
+def benchmark_batch(num_cells=NUM_CELLS, t=3, seed=0):
+    '''
+    Compare batch_run with and without the analytic Jacobian, in the split and the coupled mode
+    '''
+    cells = sample_cells(num_cells, seed)
+    rows = []
+    for mode in ('split', 'coupled'):
+        for jac in (False, True):
+            counts, elapsed = run_counted(cells, t, mode, jac, batch=True)
+            if mode == 'coupled':
+                # One solver call per block of 'Cell.coupled_blocks', each evaluating one of the three models
+                rhs = counts['Growth_model_sol'] + counts['Ni_model_sol'] + counts['P_model_sol']
+                jacs = counts['Growth_model_params_jac'] + counts['Ni_model_jac'] + counts['P_model_jac']
+            else:
+                rhs, jacs = counts['batch_model_sol'], counts['batch_model_jac']
+            rows.append((mode, jac, rhs, jacs, elapsed / num_cells * 1000))
+    return rows
+
+
+if __name__ == "__main__":
+    print("Cell.one_cell_run, evaluations per run")
+    print(f"{'mode':<8} {'jac':<6} {'RHS evals':>10} {'Jac evals':>10} {'ms/cell':>8}")
+    for mode, jac, rhs, jacs, ms in benchmark():
+        print(f"{mode:<8} {str(jac):<6} {rhs:>10.1f} {jacs:>10.1f} {ms:>8.2f}")
+    print()
+    print(f"Batch_Model.batch_run, evaluations per batch of {NUM_CELLS} cells")
+    print(f"{'mode':<8} {'jac':<6} {'RHS evals':>10} {'Jac evals':>10} {'ms/cell':>8}")
+    for mode, jac, rhs, jacs, ms in benchmark_batch():
+        print(f"{mode:<8} {str(jac):<6} {rhs:>10d} {jacs:>10d} {ms:>8.2f}")
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+
+"""
+This Python script, 'Metrics.py', collects the weekly metrics of a CA run (coverage, germination, recolonization and transitions between the states) while the simulation runs, so that they can be analysed without saving and reading back the images of every week.
+
+Each metric is computed by a collector from the state codes of the cells at the start and at the end of the week. A collector has the names of its columns, and two methods: 'start(ca)' is called once before the first week, and 'update(old, new)' returns the values of its columns for one week. New metrics can be added by writing a class with the same three members.
+
+The script contains these key parts:
+
+1. 'Coverage' and 'Germinating': The share of cells that hold seagrass, or that are germinating, as in 'PixcelvsT.py' (in %).
+
+2. 'Recolonization': The number of cells where the seagrass came back this week, and the map of how often each cell was recolonized. Unlike 'CA_Model.get_result', which counts the weeks in which a cell starts germinating (flag 1 of 'Cell.Have_seagrass'), it counts the weeks in which a cell starts to hold seagrass.
+
+3. 'Transitions': The number of cells that went from each state to each other state this week.
+
+'Frozen', not among the default collectors, gives the share of the cells whose nutrient models were frozen at their steady state (see 'Steady_State').
+
+4. 'MetricsRecorder': Runs the collectors at the end of every week of 'CA.evolution', and writes the values into one .npy file with one named column per metric and one row per week, which grows as the weeks are run.
+
+Usage:
+    recorder = MetricsRecorder('../results/ClGS_metrics.npy')
+    ca.evolution(260, metrics=recorder)
+    metrics = load_metrics('../results/ClGS_metrics.npy')
+    plt.plot(metrics['week'], metrics['coverage'])
+"""
+
+__appname__ = 'Metrics'
+__author__ = 'ANQI WANG (aw222@ic.ac.uk)'
+__version__ = '0.0.1'
+__license__ = "None"
+
+import numpy as np
+from numpy.lib.format import open_memmap
+
+import Parameters
+
+
+class Coverage:
+    """The share of the cells that hold seagrass at the end of the week, in %."""
+    names = ('coverage',)
+
+    def start(self, ca):
+        pass
+
+    def update(self, old, new):
+        return (np.count_nonzero(new == Parameters.SEAGRASS) / new.size * 100,)
+
+
+class Germinating:
+    """The share of the cells that are germinating at the end of the week, in %."""
+    names = ('germinating',)
+
+    def start(self, ca):
+        pass
+
+    def update(self, old, new):
+        return (np.count_nonzero(new == Parameters.GERMINATING) / new.size * 100,)
+
+
+class Recolonization:
+    """
+    The number of cells that hold seagrass at the end of the week but did not at the end of the week before.
+
+    The cells that hold seagrass when the run starts are not recolonized in the first week, and 'counts' adds up how many times each cell was recolonized over
+    the run. This is the same bookkeeping as 'CA_Model.get_result', but not the same event: get_result counts the
+    onsets of flag 1 of 'Cell.Have_seagrass', which is Parameters.GERMINATING, while this class counts the onsets of
+    Parameters.SEAGRASS.
+    """
+    names = ('recolonized',)
+
+    def start(self, ca):
+        self.counts = np.zeros((ca.height, ca.width), dtype=np.int32)
+        self.last = ca.state == Parameters.SEAGRASS
+
+    def update(self, old, new):
+        now = new == Parameters.SEAGRASS
+        recolonized = now & ~self.last
+        self.counts += recolonized
+        self.last = now
+        return (np.count_nonzero(recolonized),)
+
+
+class Transitions:
+    """The number of cells that went from each state to each state over the week, e.g. 'Empty->Seagrass'."""
+    names = tuple(f'{a}->{b}' for a in Parameters.STATE_NAMES for b in Parameters.STATE_NAMES)
+
+    def start(self, ca):
+        pass
+
+    def update(self, old, new):
+        # One bin per (old, new) pair of state codes
+        n = len(Parameters.STATE_NAMES)
+        return np.bincount((old.astype(np.intp) * n + new).ravel(), minlength=n * n)[:n * n]
+
+
+class Frozen:
+    """
+    The share of the evolving cells whose nutrient models were frozen at their steady state over the week, in %
+    (see 'Steady_State'). NaN if the CA has no steady_state tracker or no cell evolved.
+    """
+    names = ('frozen',)
+
+    def start(self, ca):
+        self.tracker = ca.steady_state
+
+    def update(self, old, new):
+        if self.tracker is None or not self.tracker.weekly:
+            return (np.nan,)
+        return (self.tracker.weekly[-1] * 100,)
+
+
+def default_collectors():
+    return [Coverage(), Germinating(), Recolonization(), Transitions()]
+
+
+class MetricsRecorder:
+    """
+    This class runs the metric collectors at the end of every week of 'CA.evolution' and records their values.
+
+    Args:
+        path (str): The .npy file to write the metrics into, while the weeks are run. If None, they are only kept
+                    in memory, in 'values'.
+        collectors (list): The collectors, 'default_collectors()' if None.
+    """
+    def __init__(self, path=None, collectors=None):
+        self.path = path
+        self.collectors = default_collectors() if collectors is None else collectors
+        names = [name for collector in self.collectors for name in collector.names]
+        if len(set(names)) != len(names):
+            raise ValueError(f"The collectors have repeated column names: {names}")
+        self.dtype = np.dtype([('week', np.int32)] + [(name, np.float64) for name in names])
+        self.values = None
+
+    def start(self, ca, num_of_weeks):
+        """
+        Prepare the collectors and the table of the metrics for a run.
+
+        Args:
+            ca (CA): The CA that is evolved.
+            num_of_weeks (int): The number of weeks of the run.
+        """
+        for collector in self.collectors:
+            collector.start(ca)
+        if self.path is None:
+            self.values = np.zeros(num_of_weeks, dtype=self.dtype)
+        else:
+            self.values = open_memmap(self.path, mode='w+', dtype=self.dtype, shape=(num_of_weeks,))
+        # Weeks that have not been run yet have week -1 and NaN metrics
+        self.values['week'] = -1
+        for name in self.dtype.names[1:]:
+            self.values[name] = np.nan
+
+    def update(self, m, old, new):
+        """
+        Record the metrics of week m.
+
+        Args:
+            m (int): The week.
+            old (numpy array): The state codes of the cells at the start of the week.
+            new (numpy array): The state codes of the cells at the end of the week.
+        """
+        row = [m]
+        for collector in self.collectors:
+            row.extend(collector.update(old, new))
+        self.values[m] = tuple(row)
+        if self.path is not None:
+            self.values.flush()
+
+    def close(self):
+        if self.path is not None and self.values is not None:
+            self.values.flush()
+
+
+def load_metrics(path):
+    """
+    Read the metrics written by a MetricsRecorder.
+
+    Args:
+        path (str): The .npy file.
+
+    Returns:
+        numpy structured array: One row per week that was run, with the columns 'week', 'coverage', ...
+    """
+    values = np.load(path)
+    return values[values['week'] >= 0]
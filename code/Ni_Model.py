@@ -3,11 +3,15 @@
 """
 This Python script, 'Ni_Model.py', models the nitrogen cycle in seagrass growth using a system of ordinary differential equations (ODEs). The model considers various forms of nitrogen, including organic nitrogen (N_org), ammonia (NH4), nitrite (NO2), and nitrate (NO3), and how they evolve over time.
 
-The script contains two key functions:
+The script contains four key functions:
 
 1. 'Ni_model_sol': This function calculates the derivatives (rates of change) of N_org, NH4, NO2, and NO3 at a given time. The rates are influenced by parameters like seagrass growth rate (R), temperature (T), and water column height (h).
 
-2. 'Ni_model': This function computes the current values of N_org, NH4, NO2, and NO3 for a given set of initial conditions and parameters. It employs the 'odeint' function from the scipy library to numerically solve the system of ODEs defined in 'Ni_model_sol'.
+2. 'Ni_model_jac': This function returns the analytic Jacobian of 'Ni_model_sol', which 'Ni_model' hands to the solver so that it does not have to estimate it by finite differences.
+
+3. 'compile_Ni_model': This function takes the parameters of the current season and returns versions of 'Ni_model_sol' and 'Ni_model_jac' with every term that does not depend on the state computed once, for use in the inner loop of the solver.
+
+4. 'Ni_model': This function computes the current values of N_org, NH4, NO2, and NO3 for a given set of initial conditions and parameters. It employs the 'odeint' function from the scipy library to numerically solve the system of ODEs defined in 'Ni_model_sol', with the tolerances, output times and method of a solver profile if one is given (see 'Solver_Profiles').
 
 The model provides a detailed understanding of the nitrogen dynamics in seagrass ecosystems, which could be helpful in studying seagrass ecology and predicting seagrass dynamics under different environmental scenarios.
 """
@@ -19,12 +23,12 @@ __license__ = "None"
 
 import math
 import numpy as np
-from scipy.integrate import odeint
 
 import Parameters
+import Solver_Profiles
 
 # This method calculates the current N_org, NH4, NO2, NO3 using a given Ni_model
-def Ni_model(a,b,c,d,e,now_t):
+def Ni_model(a,b,c,d,e,now_t,jac=True,bundle=None,parameters=None,profile=None):
     # set class variables according to the passed parameters
     R,N_org,NH4,NO2,NO3 = a,b,c,d,e
 
@@ -32,10 +36,18 @@ def Ni_model(a,b,c,d,e,now_t):
     init=[N_org,NH4,NO2,NO3]
     # generate a range of time steps
     t = np.arange(0,100,1)   
+    # a solver profile (a Solver_Profiles.SolverProfile) may only ask for the values at 0 and now_t
+    t = Solver_Profiles.sample_times(t, now_t, profile)
     # define parameters for the ODE
     params = R
     # solve the ODE using scipy's odeint function
-    result =odeint(Ni_model_sol,init,t,args=(params,))
+    # bundle is a (sol, jac) pair from compile_Ni_model, used in place of Ni_model_sol and Ni_model_jac,
+    # and parameters (a Parameters.ModelParameters) builds one for those parameters instead of the Parameters module
+    if bundle is None and parameters is not None:
+        bundle = compile_Ni_model(parameters)
+    model_sol, model_jac = bundle if bundle is not None else (Ni_model_sol, Ni_model_jac)
+    # jac=True hands the analytic Jacobian to the solver instead of letting it estimate one by finite differences
+    result =Solver_Profiles.solve(model_sol,init,t,args=(params,),Dfun=model_jac if jac else None,profile=profile)
     # split the results into separate variables
     sol_N_org = result[:,0] 
     sol_NH4 = result[:,1]
@@ -142,6 +154,155 @@ def Ni_model_sol(fourNivariable,t, params):
     # Return the list of derivatives
     return [dNorgdt,dNH4dt,dNO2dt,dNO3dt]
 
+def Ni_model_jac(fourNivariable, t, params):
+    """
+    Calculate the Jacobian of Ni_model_sol with respect to N_org, NH4, NO2 and NO3.
+
+    Args:
+        fourNivariable (tuple of float): A tuple containing the current values of N_org, NH4, NO2, and NO3.
+        t (float): The current time.
+        params (list or numpy array of one floats): The params from growth_model_sol
+
+    Returns:
+        numpy array (4, 4): J[i][j] is the derivative of the i-th equation with respect to the j-th variable.
+                            With one column per cell in fourNivariable, the shape is (4, 4, n).
+    """
+    N_org, NH4, NO2, NO3 = fourNivariable
+    
+    # Same inputs and constants as in Ni_model_sol
+    DO = Parameters.DO
+    T = Parameters.temperature
+    f_v = 0.001
+    u_max04 = 0.045
+    B = 0.8*Parameters.R
+    R = Parameters.R
+    h = 2
+    N_int = Parameters.N_org
+    v_R_NH4 = 0.01
+    v_ma_NH = 0.005
+    u_max42 = 0.011
+    K_O = 1.0
+    V = 1.066 
+    K_NH = 0.5
+    QN_min = 10
+    QN_max = 40
+    K_NH4 = 0.13
+    u_max23 = 0.046
+    u_denit = 0.37
+    K_NO = 0.25
+    K_NO3 = 0.25
+    K_O3 = 0.1
+    v_ma_NO = 0.03
+    v_R_NO3 = 0.035
+    
+    # First order rates of nitrification (NH4 -> NO2, NO2 -> NO3) and denitrification
+    k_42 = u_max42 * DO/(DO + K_O) * V * (T - 20)
+    k_23 = u_max23 * DO/(DO + K_O) * V * (T - 20)
+    k_denit = u_denit * K_O3/(DO + K_O3) * V * (T - 20)
+    f_N_int = (N_int - QN_min)/(QN_max - QN_min)
+    
+    # Derivatives of the Michaelis-Menten uptakes x/(x + K)
+    dup_NH4 = B/h * v_ma_NH * K_NH/(NH4 + K_NH)**2 * f_N_int * f_v + R/h * v_R_NH4 * K_NH4/(NH4 + K_NH4)**2 * f_v
+    dup_NO3 = B/h * v_ma_NO * K_NO/(NO3 + K_NO)**2 * f_N_int * f_v + R/h * v_R_NO3 * K_NO3/(NO3 + K_NO3)**2 * f_v
+    
+    jac = np.zeros((4, 4) + np.shape(NH4))
+    jac[0, 0] = -u_max04
+    jac[1, 0] = u_max04
+    jac[1, 1] = -dup_NH4 - k_42
+    jac[2, 1] = k_42
+    jac[2, 2] = -k_23
+    jac[3, 2] = k_23
+    jac[3, 3] = -k_denit - dup_NO3
+    return jac
+
+def compile_Ni_model(season=Parameters):
+    """
+    Build a right-hand side and Jacobian of the nitrogen model for one set of season parameters.
+
+    The mortality, sediment fluxes, nitrification and denitrification rates and uptake capacities of Ni_model_sol only
+    depend on the season parameters, so they are computed here once and the returned functions only do the arithmetic
+    on N_org, NH4, NO2 and NO3.
+
+    Args:
+        season: An object with the attributes DO, temperature, R, N_org and ORP_s, e.g. a Parameters.ModelParameters
+                or the Parameters module.
+
+    Returns:
+        tuple: (sol, jac), with the same signatures and results as Ni_model_sol and Ni_model_jac.
+    """
+    # Season parameters, read once
+    DO = season.DO
+    T = season.temperature
+    B = 0.8*season.R
+    R = season.R
+    N_int = season.N_org
+    ORP_s = season.ORP_s
+    
+    # Same constants as in Ni_model_sol
+    f_v = 0.001
+    w_a1 = 0.43
+    f_deta1 = 70
+    w_a2 = 0.23
+    f_deta2 = 60
+    u_max04 = 0.045
+    omega_m = 0.03
+    tox= 0.11
+    K_tox= 3
+    h = 2
+    v_R_NH4 = 0.01
+    v_ma_NH = 0.005
+    u_max42 = 0.011
+    K_O = 1.0
+    V = 1.066 
+    K_NH = 0.5
+    QN_min = 10
+    QN_max = 40
+    K_NH4 = 0.13
+    u_max23 = 0.046
+    u_denit = 0.37
+    K_NO = 0.25
+    K_NO3 = 0.25
+    K_O3 = 0.1
+    v_ma_NO = 0.03
+    v_R_NO3 = 0.035
+    
+    # State-independent terms
+    omega_ma = omega_m + tox * math.exp (K_tox * (T - 26))
+    omega_R = 0.041 * (0.098 + math.exp(-6.59 + 0.2217 * T))
+    N_org_input = f_v * w_a1 * f_deta1 * omega_ma * B/h + f_v * w_a2 * f_deta2 * omega_R * R/h
+    f_N_int = (N_int - QN_min)/(QN_max - QN_min)
+    a_NH4 = B/h * v_ma_NH * f_N_int * f_v
+    b_NH4 = R/h * v_R_NH4 * f_v
+    a_NO3 = B/h * v_ma_NO * f_N_int * f_v
+    b_NO3 = R/h * v_R_NO3 * f_v
+    k_42 = u_max42 * DO/(DO + K_O) * V * (T - 20)
+    k_23 = u_max23 * DO/(DO + K_O) * V * (T - 20)
+    k_denit = u_denit * K_O3/(DO + K_O3) * V * (T - 20)
+    J_NH4 = J_rsed4(ORP_s)
+    J_NO3 = J_rsed3(ORP_s)
+    
+    def sol(fourNivariable, t, params):
+        N_org, NH4, NO2, NO3 = fourNivariable
+        dNorgdt = N_org_input - u_max04 * N_org
+        dNH4dt = u_max04 * N_org + J_NH4 - a_NH4 * NH4/(NH4 + K_NH) - b_NH4 * NH4/(NH4 + K_NH4) - k_42 * NH4
+        dNO2dt = k_42 * NH4 - k_23 * NO2
+        dNO3dt = k_23 * NO2 - k_denit * NO3 - a_NO3 * NO3/(NO3 + K_NO) - b_NO3 * NO3/(NO3 + K_NO3) + J_NO3
+        return [dNorgdt,dNH4dt,dNO2dt,dNO3dt]
+    
+    def jac(fourNivariable, t, params):
+        N_org, NH4, NO2, NO3 = fourNivariable
+        jac = np.zeros((4, 4) + np.shape(NH4))
+        jac[0, 0] = -u_max04
+        jac[1, 0] = u_max04
+        jac[1, 1] = -a_NH4 * K_NH/(NH4 + K_NH)**2 - b_NH4 * K_NH4/(NH4 + K_NH4)**2 - k_42
+        jac[2, 1] = k_42
+        jac[2, 2] = -k_23
+        jac[3, 2] = k_23
+        jac[3, 3] = -k_denit - a_NO3 * K_NO/(NO3 + K_NO)**2 - b_NO3 * K_NO3/(NO3 + K_NO3)**2
+        return jac
+    
+    return sol, jac
+
 def J_rsed4(ORP_s):
     """
     Computes the sediment flux of ammonia (NH4) based on the oxidation-reduction potential (ORP).
@@ -3,6 +3,7 @@
 The code simulates the growth of seagrass under different nutrient conditions using a Cellular Automata (CA) model.
 It generates mock data for the CA model, evolves the system for each nutrient condition, and saves the output
 as CSV files. It also visualizes the seagrass distribution for different nutrient levels.
+The experiment only runs when the script is run directly, not when it is imported.
 """
 
 __appname__ = 'NutrientLevelExpriment'
@@ -13,10 +14,7 @@ __license__ = "None"
 # Importing necessary modules
 # numpy for numerical computations and array manipulation
 import numpy as np
-# matplotlib for visualization
-import matplotlib.pyplot as plt
-# pandas for data manipulation and CSV file creation
-import pandas as pd
+# matplotlib (visualization) and pandas (CSV file creation) are only imported when the experiment is run
 
 
 # Define the size of the grid
@@ -110,34 +108,40 @@ def run_mock_nutrient_experiment(nutrient_level, grid_size, iterations=10):
         ca.grid = np.random.choice([1, 0], size=grid_size, p=[growth_probability, 1 - growth_probability])
     return ca.grid
 
-# Visualization and running the experiment
-# Creating a subplot with 1 row and 3 columns for visualizing each nutrient condition
-fig, axes = plt.subplots(1, 3, figsize=(18, 6))
+if __name__ == "__main__":
+    # matplotlib for visualization
+    import matplotlib.pyplot as plt
+    # pandas for data manipulation and CSV file creation
+    import pandas as pd
 
-for ax, nutrient_level in zip(axes, nutrient_levels):
-    # Run the CA simulation for each nutrient level
-    grid = run_mock_nutrient_experiment(nutrient_level, grid_size)
-    
-    # Saving the grid to a CSV file
-    flattened_matrix = grid.flatten()
-    data = pd.DataFrame({
-        'Seagrass_Coverage': flattened_matrix,
-        'Nutrient_Level': [nutrient_level] * len(flattened_matrix)
-    })
-    csv_filename = f"../data/seagrass_coverage_matrix_nutrient_{nutrient_level}.csv"
-    data.to_csv(csv_filename, index=False)
-    
-    # Visualization code (unchanged)
-    ax.imshow(grid, cmap="GnBu", origin='lower')
-    ax.set_title(f"{nutrient_level} Nutrient Level", fontsize=20, fontweight = 'bold')
-    ax.set_xticks(np.arange(0, grid_size[0], 10))
-    ax.set_yticks(np.arange(0, grid_size[1], 10))
-    ax.set_xticklabels([])
-    ax.set_yticklabels([])
-    ax.grid(which='both', axis='both', linestyle='-', color='white', linewidth=0.5)
+    # Visualization and running the experiment
+    # Creating a subplot with 1 row and 3 columns for visualizing each nutrient condition
+    fig, axes = plt.subplots(1, 3, figsize=(18, 6))
+
+    for ax, nutrient_level in zip(axes, nutrient_levels):
+        # Run the CA simulation for each nutrient level
+        grid = run_mock_nutrient_experiment(nutrient_level, grid_size)
+        
+        # Saving the grid to a CSV file
+        flattened_matrix = grid.flatten()
+        data = pd.DataFrame({
+            'Seagrass_Coverage': flattened_matrix,
+            'Nutrient_Level': [nutrient_level] * len(flattened_matrix)
+        })
+        csv_filename = f"../data/seagrass_coverage_matrix_nutrient_{nutrient_level}.csv"
+        data.to_csv(csv_filename, index=False)
+        
+        # Visualization code (unchanged)
+        ax.imshow(grid, cmap="GnBu", origin='lower')
+        ax.set_title(f"{nutrient_level} Nutrient Level", fontsize=20, fontweight = 'bold')
+        ax.set_xticks(np.arange(0, grid_size[0], 10))
+        ax.set_yticks(np.arange(0, grid_size[1], 10))
+        ax.set_xticklabels([])
+        ax.set_yticklabels([])
+        ax.grid(which='both', axis='both', linestyle='-', color='white', linewidth=0.5)
 
-# Adjust the layout for better visibility
-plt.tight_layout()
-plt.subplots_adjust(top=1.25)
-# plt.suptitle("Mock Seagrass Growth Patterns for Different Nutrient Levels", y=1.25, fontsize=20)
-plt.show()
+    # Adjust the layout for better visibility
+    plt.tight_layout()
+    plt.subplots_adjust(top=1.25)
+    # plt.suptitle("Mock Seagrass Growth Patterns for Different Nutrient Levels", y=1.25, fontsize=20)
+    plt.show()
@@ -3,13 +3,17 @@
 """
 This Python script, 'P_Model.py', models the phosphorus cycle in seagrass growth using a system of ordinary differential equations (ODEs). The model considers various forms of phosphorus, including Phosphorus in Organic Particulates (POP), Soluble Reactive Phosphorus (SRP), internal phosphorus in macroalgae (P_ma_int), and internal phosphorus in seagrass (P_R_int), and how they evolve over time.
 
-The script contains three key functions:
+The script contains five key functions:
 
 1. 'P_model_sol': This function calculates the derivatives (rates of change) of POP, SRP, P_ma_int, and P_R_int at a given time. The rates are influenced by parameters like seagrass growth rate (R), temperature (T), and water column height (h).
 
-2. 'P_model': This function computes the current values of POP, SRP, P_ma_int, and P_R_int for a given set of initial conditions and parameters. It employs the 'odeint' function from the scipy library to numerically solve the system of ODEs defined in 'P_model_sol'.
+2. 'P_model': This function computes the current values of POP, SRP, P_ma_int, and P_R_int for a given set of initial conditions and parameters. It employs the 'odeint' function from the scipy library to numerically solve the system of ODEs defined in 'P_model_sol', with the tolerances, output times and method of a solver profile if one is given (see 'Solver_Profiles').
 
-3. 'lambda_rsed_P': This function calculates a value based on a variable ORP_s using specific formulas. This value appears to be used in the calculation of the rate of change of SRP.
+3. 'P_model_jac': This function returns the analytic Jacobian of 'P_model_sol', which 'P_model' hands to the solver so that it does not have to estimate it by finite differences.
+
+4. 'compile_P_model': This function takes the parameters of the current season and returns versions of 'P_model_sol' and 'P_model_jac' with every term that does not depend on the state computed once, for use in the inner loop of the solver.
+
+5. 'lambda_rsed_P': This function calculates a value based on a variable ORP_s using specific formulas. This value appears to be used in the calculation of the rate of change of SRP.
 
 The model provides a detailed understanding of the phosphorus dynamics in seagrass ecosystems, which could be helpful in studying seagrass ecology and predicting seagrass dynamics under different environmental scenarios.
 """
@@ -21,9 +25,9 @@ __license__ = "None"
 
 import math
 import numpy as np
-from scipy.integrate import odeint
 
 import Parameters
+import Solver_Profiles
 
 def P_model_sol(fourPvariable, t, params):
     """
@@ -171,17 +175,197 @@ def P_model_sol(fourPvariable, t, params):
     return [dPOPdt, dSRPdt, dP_ma_intdt, dP_R_intdt]
 
 
+def P_model_jac(fourPvariable, t, params):
+    """
+    Calculate the Jacobian of P_model_sol with respect to POP, SRP, P_ma_int and P_R_int.
+
+    P_model_sol takes P_ma_int and P_R_int from the Parameters module, so only the POP and SRP columns are non-zero.
+
+    Parameters:
+    fourPvariable (list or numpy array of four floats): The current values of POP, SRP, P_ma_int and P_R_int.
+    t (float): The current time. This input is not used in the function's calculations.
+    params (list or numpy array of four floats): The params from growth_model_sol and Ni_model_sol
+
+    Returns:
+    numpy array (4, 4): J[i][j] is the derivative of the i-th equation with respect to the j-th variable.
+    With one column per cell in fourPvariable, the shape is (4, 4, n).
+    """
+    POP, SRP, P_ma_int, P_R_int = fourPvariable
+
+    # Same inputs and constants as in P_model_sol
+    k_AP = 0.043
+    k_OP = 4.45
+    k_PO = 1
+    DO = Parameters.DO
+    f_T = 26
+    B = 0.8*Parameters.R
+    R = Parameters.R
+    vP_ma_max = 0.2
+    vP_R_max = 0.1
+    kP_ma = 0.0061
+    kP_R = 0.0115
+    QP_ma_max = 3.9
+    QP_R_max = 1.2
+    QP_ma_min = 1.1
+    QP_R_min = 0.7
+    f_v = 0.001
+    h = 2
+    P_ma_int = Parameters.P_ma_int
+    P_R_int = Parameters.P_R_int
+
+    # First order rate of POP mineralisation into SRP
+    k_min = ((k_AP * k_OP + k_PO * DO) / (k_OP + DO)) * f_T
+    f_ma_P = (QP_ma_max - P_ma_int)/(QP_ma_max - QP_ma_min)
+    f_R_P = (QP_R_max - P_R_int)/(QP_R_max - QP_R_min)
+    # Derivatives of the Michaelis-Menten terms SRP/(SRP + k)
+    dmm_ma = kP_ma / (SRP + kP_ma)**2
+    dmm_R = kP_R / (SRP + kP_R)**2
+
+    jac = np.zeros((4, 4) + np.shape(SRP))
+    jac[0, 0] = -k_min
+    jac[1, 0] = k_min
+    jac[1, 1] = -(R/h * vP_R_max * dmm_R * f_R_P * f_v) - (B/h * vP_ma_max * dmm_ma * f_ma_P * f_v)
+    jac[2, 1] = vP_ma_max * dmm_ma * f_ma_P
+    jac[3, 1] = vP_R_max * dmm_R * f_R_P
+    return jac
+
+
+def compile_P_model(season=Parameters):
+    """
+    Build a right-hand side and Jacobian of the phosphorus model for one set of season parameters.
+
+    The mineralisation rate, the sediment release, the uptake capacities and the macroalgae and seagrass growth rates of
+    P_model_sol only depend on the season parameters, so they are computed here once and the returned functions only do
+    the arithmetic on POP and SRP.
+
+    Parameters:
+    season: An object with the attributes DO, temperature, R, Nrint, P_ma_int, P_R_int and ORP_s, e.g. a Parameters.ModelParameters or the Parameters module.
+
+    Returns:
+    tuple: (sol, jac), with the same signatures and results as P_model_sol and P_model_jac.
+    """
+    # Season parameters, read once
+    DO = season.DO
+    T = season.temperature
+    B = 0.8*season.R
+    R = season.R
+    P_ma_int = season.P_ma_int
+    P_R_int = season.P_R_int
+    N_ma_int = 0.8*season.Nrint
+    N_R_int = season.Nrint
+    ORP_s = season.ORP_s
+
+    # Same constants as in P_model_sol
+    k_AP = 0.043
+    k_OP = 4.45
+    alpha_P_ma = 0.23
+    alpha_P_R = 0.11
+    omega_m = 0.04
+    tox = 0.11
+    K_tox = 3
+    SR = 0.08
+    k_PO = 1
+    f_T = 26
+    vP_ma_max = 0.2
+    vP_R_max = 0.1
+    kP_ma = 0.0061
+    kP_R = 0.0115
+    QP_ma_max = 3.9
+    QP_R_max = 1.2
+    QP_ma_min = 1.1
+    QP_R_min = 0.7
+    f_v = 0.001
+    h = 2
+    mu_max = 0.37
+    K_oo = 0.4
+    Ulv_ext = 0.001
+    K_I = 242
+    T_opt = 24
+    T_min = 8
+    T_max = 26
+    k_1 = 0.3
+    k_4 = 0.01
+    QN_min = 10
+    QN_max = 40
+    I = 10
+    a = 20
+    b = 2
+    c = 5
+    d = 2
+    f_o = 14
+    T_o = 26
+    R_max = 250
+    SL = 5
+    N_min = 10
+    M_cri = 15
+    rho_max = 0.23
+
+    # State-independent terms
+    k_min = ((k_AP * k_OP + k_PO * DO) / (k_OP + DO)) * f_T
+    omega_ma = omega_m + tox * math.exp(K_tox * (T - 26))
+    omega_R = SR * (0.098 + math.exp(-6.59 + 0.2217*T))
+    POP_input = alpha_P_ma * B * omega_ma + alpha_P_R * R * omega_R
+    SRP_release = lambda_rsed_P(ORP_s)
+    f_ma_P = (QP_ma_max - P_ma_int)/(QP_ma_max - QP_ma_min)
+    f_R_P = (QP_R_max - P_R_int)/(QP_R_max - QP_R_min)
+    a_ma = B/h * vP_ma_max * f_ma_P * f_v
+    a_R = R/h * vP_R_max * f_R_P * f_v
+    gamma_1 = (1 / (T_opt - T_min)) * np.log((0.98 * (1 - k_1)) / (0.02 * k_1))
+    gamma_2 = (1 / (T_max - T_min)) * np.log((0.98 * (1 - k_4)) / (0.02 * k_4))
+    K_ext = K_oo + Ulv_ext * B/h
+    f_ma_I = (1 / (K_ext * h)) * np.log((K_I + I) / (K_I + I * np.exp(-K_ext * h)))
+    f_ma_T = ((k_1 * np.exp(gamma_1 * (T - T_min))) / (1 + k_1 * (np.exp(gamma_1 * (T - T_min)) - 1))) * ((k_4 * np.exp(gamma_2 * (T - T_min))) / (1 + k_4 * (np.exp(gamma_2 * (T - T_min)) - 1)))
+    mu_ma = mu_max * f_ma_I * f_ma_T * (N_ma_int - QN_min) / (QN_max - QN_min) * f_ma_P
+    g_d = 1 - 1 / (1 + b * np.exp(a * (d - f_o)))
+    f_R_T = 1 / ((1 + (T - (T_o / c)) ** 2) ** d)
+    rho = rho_max * g_d * f_R_T * (1 - np.exp(-(R - R_max) / SL)) * (N_R_int - N_min) / (M_cri - N_min) * f_R_P
+    ma_loss = mu_ma * P_ma_int
+    R_loss = rho * P_R_int
+
+    def sol(fourPvariable, t, params):
+        POP, SRP, P_ma_int, P_R_int = fourPvariable
+        mm_ma = SRP/(SRP + kP_ma)
+        mm_R = SRP/(SRP + kP_R)
+        dPOPdt = -k_min * POP + POP_input
+        dSRPdt = k_min * POP + SRP_release - a_R * mm_R - a_ma * mm_ma
+        dP_ma_intdt = vP_ma_max * mm_ma * f_ma_P - ma_loss
+        dP_R_intdt = vP_R_max * mm_R * f_R_P - R_loss
+        return [dPOPdt, dSRPdt, dP_ma_intdt, dP_R_intdt]
+
+    def jac(fourPvariable, t, params):
+        POP, SRP, P_ma_int, P_R_int = fourPvariable
+        dmm_ma = kP_ma / (SRP + kP_ma)**2
+        dmm_R = kP_R / (SRP + kP_R)**2
+        jac = np.zeros((4, 4) + np.shape(SRP))
+        jac[0, 0] = -k_min
+        jac[1, 0] = k_min
+        jac[1, 1] = -a_R * dmm_R - a_ma * dmm_ma
+        jac[2, 1] = vP_ma_max * dmm_ma * f_ma_P
+        jac[3, 1] = vP_R_max * dmm_R * f_R_P
+        return jac
+
+    return sol, jac
+
+
 # This method calculates the current POP, SRP, P_ma_int, P_R_int using a given P_model
-def P_model(a, b, c, d, e, f, g, h, now_t):
+def P_model(a, b, c, d, e, f, g, h, now_t, jac=True, bundle=None, parameters=None, profile=None):
     POP, SRP, P_ma_int, P_R_int, R, Nrint, N_org, NH4 = a, b, c, d, e, f, g, h 
 
     init = [POP, SRP, P_ma_int, P_R_int]
     t = np.arange(0,100,1)  
+    # a solver profile (a Solver_Profiles.SolverProfile) may only ask for the values at 0 and now_t
+    t = Solver_Profiles.sample_times(t, now_t, profile)
 
     # defining the parameters for the differential equations
     params = [R, Nrint, N_org, NH4]
     # solve the ODE using scipy's odeint function
-    result = odeint(P_model_sol,init,t,args=(params,))
+    # bundle is a (sol, jac) pair from compile_P_model, used in place of P_model_sol and P_model_jac,
+    # and parameters (a Parameters.ModelParameters) builds one for those parameters instead of the Parameters module
+    if bundle is None and parameters is not None:
+        bundle = compile_P_model(parameters)
+    model_sol, model_jac = bundle if bundle is not None else (P_model_sol, P_model_jac)
+    # jac=True hands the analytic Jacobian to the solver instead of letting it estimate one by finite differences
+    result = Solver_Profiles.solve(model_sol,init,t,args=(params,),Dfun=model_jac if jac else None,profile=profile)
     # split the results into separate variables
     sol_POP = result[:,0] 
     sol_SRP = result[:,1]
@@ -7,7 +7,9 @@ The script contains several key components:
 
 1. Indices for each variable: The script defines constants for the indices of each variable in the system state, which include nitrogen (N), phosphorus (P), carbon (C), and light conditions, among others.
 
-2. Initial values for variables: The script defines initial values for variables such as seagrass growth biomass (R), internal nitrogen (Nrint), organic nitrogen (N_org), ammonia (NH4), nitrite (NO2), nitrate (NO3), and various forms of phosphorus. These initial values are set according to the number of weeks that have passed in the simulation, which is meant to represent different seasons of the year (spring, summer, autumn, and winter).
+2. Initial values for variables: The script defines initial values for variables such as seagrass growth biomass (R), internal nitrogen (Nrint), organic nitrogen (N_org), ammonia (NH4), nitrite (NO2), nitrate (NO3), and various forms of phosphorus. The values of each season of the year (spring, summer, autumn, and winter) are kept in 'SEASONS', and 'Seasonal_Forcing' builds from them the values of every week of a run. The module-level values are the defaults, used when a run has no seasonal forcing. Importing the module only defines these values, it does not depend on any other module of the model.
+
+3. 'ModelParameters': An immutable set of the values above (R to DO), owned by each CA and handed to the models, so that simulations with different values can run side by side. 'default_parameters' builds one from the values of this module.
 
 The script allows for easy modification and access to the parameters used in the CA model, aiding in the flexibility and extensibility of the model.
 """
@@ -17,7 +19,8 @@ __author__ = 'ANQI WANG (aw222@ic.ac.uk)'
 __version__ = '0.0.1'
 __license__ = "None"
 
-from main import num_of_weeks
+from collections import namedtuple
+
 # Constants representing the indices of each variables
 N_IDX = 0
 P_IDX = 1
@@ -29,96 +32,133 @@ LIGHT_IDX = 6
 R_IDX = 7
 G_IDX = 8
 M_IDX = 9
-    
-
-# Set different initial values for differnt 
-if num_of_weeks < 13:
-    # Spring
-    R=110 # Slightly increased in spring
-    Nrint = 2.4
-    N_org = 25
-    NH4 = 0.05
-    NO2 = 0.01
-    NO3 = 0.22
-    POP = 0.23
-    SRP = 0.12
-    P_ma_int = 0.02
-    P_R_int = 0.02
-    GROWTH_RATE = 0.84  # Increased by 20%
-    germination_rate = 3
-    reproduction_rate = 5.5
-    temperature = 16.5  # Increased by 10%
-    oxygen = 3.62
-    ORP_s = 100
-    DO = 4.97
 
+# Codes of the cell states held in CA.state (a uint8 array), and the name of each code
+EMPTY = 0
+GERMINATING = 1
+SEAGRASS = 2
+STATE_NAMES = ('Empty', 'Germinating', 'Seagrass')
     
-elif num_of_weeks >= 13 and num_of_weeks < 26:
-    # Summer
-    R = 120 # Further increased in summer
-    Nrint = 2.4
-    N_org = 25
-    NH4 = 0.05
-    NO2 = 0.01
-    NO3 = 0.22
-    POP = 0.23
-    SRP = 0.12
-    P_ma_int = 0.02
-    P_R_int = 0.02
-    GROWTH_RATE = 0.91  # Increased by 30%
-    germination_rate = 3
-    reproduction_rate = 5.5
-    temperature = 18.0  # Increased by 20%
-    oxygen = 3.26  # Decreased slightly
-    ORP_s = 400.0  # Dramatically increased
-    DO = 4.97
 
-    
-elif num_of_weeks >= 26 and num_of_weeks < 39:
-    # Autumn
-    R = 90 # Slightly decreased in autumn
-    Nrint = 2.4
-    N_org = 25
-    NH4 = 0.05
-    NO2 = 0.01
-    NO3 = 0.22
-    POP = 0.23
-    SRP = 0.12
-    P_ma_int = 0.02
-    P_R_int = 0.02
-    GROWTH_RATE = 0.56  # Decreased by 20%
-    germination_rate = 2.4  # Decreased by 20%
-    reproduction_rate = 4.4  # Decreased by 20%
-    temperature = 13.5  # Decreased by 10%
-    oxygen = 3.62
-    ORP_s = 200.0  # Increased
-    DO = 4.97
-
-    
-else:
-    # Winter
-    R = 70 # Significantly decreased in winter
-    Nrint = 2.4
-    N_org = 25
-    NH4 = 0.05
-    NO2 = 0.01
-    NO3 = 0.22
-    POP = 0.23
-    SRP = 0.12
-    P_ma_int = 0.02
-    P_R_int = 0.02
-    GROWTH_RATE = 0.35  # Significantly decreased
-    germination_rate = 1.5  # Significantly decreased
-    reproduction_rate = 2.75  # Significantly decreased
-    temperature = 9.0  # Significantly decreased
-    oxygen = 3.62
-    ORP_s = -100.0  # Dramatically decreased
-    DO = 4.97
-
-        
+# The values of the parameters in each season of the year. A year of 52 weeks has 13 weeks of each season, in the
+# order of SEASON_NAMES, and 'Seasonal_Forcing.SeasonalForcing' looks up the values of each week of a run
+SEASON_NAMES = ('Spring', 'Summer', 'Autumn', 'Winter')
+WEEKS_PER_SEASON = 13
+SEASONS = {
+    'Spring': dict(
+        R=110, # Slightly increased in spring
+        Nrint = 2.4,
+        N_org = 25,
+        NH4 = 0.05,
+        NO2 = 0.01,
+        NO3 = 0.22,
+        POP = 0.23,
+        SRP = 0.12,
+        P_ma_int = 0.02,
+        P_R_int = 0.02,
+        GROWTH_RATE = 0.84,  # Increased by 20%
+        germination_rate = 3,
+        reproduction_rate = 5.5,
+        temperature = 16.5,  # Increased by 10%
+        oxygen = 3.62,
+        ORP_s = 100,
+        DO = 4.97),
+    'Summer': dict(
+        R = 120, # Further increased in summer
+        Nrint = 2.4,
+        N_org = 25,
+        NH4 = 0.05,
+        NO2 = 0.01,
+        NO3 = 0.22,
+        POP = 0.23,
+        SRP = 0.12,
+        P_ma_int = 0.02,
+        P_R_int = 0.02,
+        GROWTH_RATE = 0.91,  # Increased by 30%
+        germination_rate = 3,
+        reproduction_rate = 5.5,
+        temperature = 18.0,  # Increased by 20%
+        oxygen = 3.26,  # Decreased slightly
+        ORP_s = 400.0,  # Dramatically increased
+        DO = 4.97),
+    'Autumn': dict(
+        R = 90, # Slightly decreased in autumn
+        Nrint = 2.4,
+        N_org = 25,
+        NH4 = 0.05,
+        NO2 = 0.01,
+        NO3 = 0.22,
+        POP = 0.23,
+        SRP = 0.12,
+        P_ma_int = 0.02,
+        P_R_int = 0.02,
+        GROWTH_RATE = 0.56,  # Decreased by 20%
+        germination_rate = 2.4,  # Decreased by 20%
+        reproduction_rate = 4.4,  # Decreased by 20%
+        temperature = 13.5,  # Decreased by 10%
+        oxygen = 3.62,
+        ORP_s = 200.0,  # Increased
+        DO = 4.97),
+    'Winter': dict(
+        R = 70, # Significantly decreased in winter
+        Nrint = 2.4,
+        N_org = 25,
+        NH4 = 0.05,
+        NO2 = 0.01,
+        NO3 = 0.22,
+        POP = 0.23,
+        SRP = 0.12,
+        P_ma_int = 0.02,
+        P_R_int = 0.02,
+        GROWTH_RATE = 0.35,  # Significantly decreased
+        germination_rate = 1.5,  # Significantly decreased
+        reproduction_rate = 2.75,  # Significantly decreased
+        temperature = 9.0,  # Significantly decreased
+        oxygen = 3.62,
+        ORP_s = -100.0,  # Dramatically decreased
+        DO = 4.97),
+}
 
+# The default values of the parameters, used when no seasonal forcing is given. These are the winter values, which
+# is the season that a run of 39 weeks or more always used before the seasons were looked up week by week
+R = SEASONS['Winter']['R']
+Nrint = SEASONS['Winter']['Nrint']
+N_org = SEASONS['Winter']['N_org']
+NH4 = SEASONS['Winter']['NH4']
+NO2 = SEASONS['Winter']['NO2']
+NO3 = SEASONS['Winter']['NO3']
+POP = SEASONS['Winter']['POP']
+SRP = SEASONS['Winter']['SRP']
+P_ma_int = SEASONS['Winter']['P_ma_int']
+P_R_int = SEASONS['Winter']['P_R_int']
+GROWTH_RATE = SEASONS['Winter']['GROWTH_RATE']
+germination_rate = SEASONS['Winter']['germination_rate']
+reproduction_rate = SEASONS['Winter']['reproduction_rate']
+temperature = SEASONS['Winter']['temperature']
+oxygen = SEASONS['Winter']['oxygen']
+ORP_s = SEASONS['Winter']['ORP_s']
+DO = SEASONS['Winter']['DO']
 
 
 __all__ = ['N_IDX', 'P_IDX','C_IDX','CB_IDX','NB_IDX','PB_IDX','LIGHT_IDX',
            'R_IDX','G_IDX','M_IDX','R','Nrint','N_org','NH4','NO2','NO3','POP',
            'SRP','P_ma_int','P_R_int','ORP_s']
+
+
+# The parameters that can differ between simulations, held by each CA as one immutable ModelParameters
+PARAMETER_NAMES = ('R', 'Nrint', 'N_org', 'NH4', 'NO2', 'NO3', 'POP', 'SRP', 'P_ma_int', 'P_R_int', 'GROWTH_RATE',
+                   'germination_rate', 'reproduction_rate', 'temperature', 'oxygen', 'ORP_s', 'DO')
+ModelParameters = namedtuple('ModelParameters', PARAMETER_NAMES)
+
+
+def default_parameters(**changes):
+    """
+    Build a ModelParameters from the values of this module.
+
+    Args:
+        **changes: Values to use instead of those of the module, e.g. R=66.1.
+
+    Returns:
+        ModelParameters: The parameters. Use its _replace method to derive other sets.
+    """
+    return ModelParameters(**{name: globals()[name] for name in PARAMETER_NAMES})._replace(**changes)
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+
+"""
+This Python script, 'Rendering.py', turns the weekly states of the CA into images without any window, so that runs can be drawn on headless servers and without the pause of 'CA_Model.PlotResult'.
+
+The state codes are used directly as the indices of a palette PNG: Parameters.EMPTY is drawn black (0), Parameters.GERMINATING gray (128) and Parameters.SEAGRASS white (255). These are the gray levels that 'PixcelvsT.py' counts when it reads the images back with Image.open(...).convert("L"), so no colour map, figure or Agg canvas is needed per frame.
+
+The script contains three key parts:
+
+1. 'state_image': Maps a state array to a palette image, optionally scaled up so that each cell is a square of pixels.
+
+2. 'save_frame': Writes the image of a state array to a PNG file.
+
+3. 'FrameRenderer': Writes 'week_{m}.png' files from a pool of background threads (see 'Background_Writer'), while the simulation goes on.
+
+Usage:
+    ca = CA_Model.CA(100, 100, plot_results=False, frames='../results/ClGS_image')
+    ca.evolution(52)
+"""
+
+__appname__ = 'Rendering'
+__author__ = 'ANQI WANG (aw222@ic.ac.uk)'
+__version__ = '0.0.1'
+__license__ = "None"
+
+import os
+
+import numpy as np
+from PIL import Image
+
+import Background_Writer
+
+# Gray level of each state code (Parameters.EMPTY, GERMINATING and SEAGRASS): black, gray and white
+GRAY_LEVELS = (0, 128, 255)
+
+
+def palette():
+    # The RGB palette of the images, indexed by the state codes
+    colours = [0] * (3 * 256)
+    for code, level in enumerate(GRAY_LEVELS):
+        colours[3 * code:3 * code + 3] = [level] * 3
+    return colours
+
+
+def state_image(state, scale=1):
+    """
+    Map a state array to an image.
+
+    Args:
+        state (numpy array): The coded states of the cells, as in CA.state.
+        scale (int): The number of pixels of each side of a cell.
+
+    Returns:
+        PIL.Image: A palette image, one pixel (or scale x scale pixels) per cell.
+    """
+    codes = np.ascontiguousarray(state, dtype=np.uint8)
+    if scale > 1:
+        codes = codes.repeat(scale, axis=0).repeat(scale, axis=1)
+    image = Image.fromarray(codes, mode='P')
+    image.putpalette(palette())
+    return image
+
+
+def save_frame(state, path, scale=1):
+    """
+    Write the image of a state array to a PNG file.
+
+    Args:
+        state (numpy array): The coded states of the cells.
+        path (str): The file to write.
+        scale (int): The number of pixels of each side of a cell.
+    """
+    state_image(state, scale).save(path, optimize=False)
+
+
+class FrameRenderer:
+    """
+    This class writes the weekly images of a run in background threads.
+
+    Args:
+        folder (str): The folder of the 'week_{m}.png' files, created if needed.
+        workers (int): The number of rendering threads.
+        max_pending (int): The number of frames that can wait before the simulation is held back.
+        scale (int): The number of pixels of each side of a cell.
+    """
+    def __init__(self, folder, workers=2, max_pending=8, scale=1):
+        os.makedirs(folder, exist_ok=True)
+        self.folder = folder
+        self.scale = scale
+        self.writer = Background_Writer.BackgroundWriter(workers=workers, max_pending=max_pending)
+
+    def submit(self, m, state):
+        """
+        Queue the image of week m.
+
+        Args:
+            m (int): The week.
+            state (numpy array): The coded states, which must not be changed afterwards (pass a copy).
+        """
+        self.writer.submit(save_frame, state, os.path.join(self.folder, f'week_{m}.png'), self.scale)
+
+    def close(self):
+        """
+        Wait for all the frames to be written.
+
+        Returns:
+            WriterReport: The time spent rendering, see 'Background_Writer'.
+        """
+        return self.writer.close()
@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+
+"""
+This Python script, 'Runge_Kutta.py', integrates a batch of small independent ODE systems, one per cell, with explicit Runge-Kutta methods written with NumPy arrays.
+
+'odeint' and 'solve_ivp' integrate one system at a time: a grid of cells is either solved cell by cell ('Cell.one_cell_run'), or stacked into one long system whose step size is set by its worst cell ('Batch_Model'). Here the states of the cells are held as one (cells, variables) array, every stage of the method evaluates the right-hand side once for all the cells, and with the adaptive method each cell has its own time and step size: the error of every cell is checked on its own, the cells whose step is rejected take it again with a smaller step, while the others go on.
+
+The right-hand side is called as fun(t, y, *args), with t the (cells,) times, y the (cells, variables) states and args arrays whose first axis is the cells (e.g. the params of each cell). It must return the (cells, variables) derivatives.
+
+The script contains these key parts:
+
+1. 'Tableau', 'RK4' and 'DOPRI5': The Butcher tableaus of the classic fixed-step fourth order method and of the Dormand-Prince 5(4) pair.
+
+2. 'RKStats': The number of cells, steps, rejected steps and right-hand side evaluations of an integration.
+
+3. 'fixed_step': Integrates every cell with the same number of equal steps.
+
+4. 'adaptive': Integrates every cell with its own step size, controlled by the embedded error estimate of DOPRI5.
+
+5. 'integrate': Runs one of the methods by name ('rk4' or 'dopri5').
+
+Usage:
+    y, stats = integrate(fun, y0, 0, 1, method='dopri5', rtol=1e-6, atol=1e-9, args=(params,))
+    print(stats)
+"""
+
+__appname__ = 'Runge_Kutta'
+__author__ = 'ANQI WANG (aw222@ic.ac.uk)'
+__version__ = '0.0.1'
+__license__ = "None"
+
+from collections import namedtuple
+
+import numpy as np
+
+# The methods of 'integrate'
+METHODS = ('rk4', 'dopri5')
+# The fixed step of 'rk4' if no number of steps is given, in time units (days)
+RK4_STEP = 1 / 64
+# The step size control of 'adaptive', as in scipy.integrate.RK45
+SAFETY = 0.9
+MIN_FACTOR = 0.2
+MAX_FACTOR = 10
+
+
+class Tableau(namedtuple('Tableau', ['c', 'a', 'b', 'e', 'order'])):
+    """
+    The Butcher tableau of an explicit Runge-Kutta method.
+
+    c: The times of the stages, as fractions of the step.
+    a: The weights of the earlier stages in each stage (lower triangular).
+    b: The weights of the stages in the step.
+    e: The weights of the stages in the error estimate (b minus the weights of the embedded method), None if the
+       method has no error estimate.
+    order: The order of the error estimate plus one, used to scale the step size.
+    """
+
+
+RK4 = Tableau(c=np.array([0, 1 / 2, 1 / 2, 1]),
+              a=np.array([[0, 0, 0, 0],
+                          [1 / 2, 0, 0, 0],
+                          [0, 1 / 2, 0, 0],
+                          [0, 0, 1, 0]]),
+              b=np.array([1 / 6, 1 / 3, 1 / 3, 1 / 6]),
+              e=None, order=4)
+
+# The last stage is evaluated at the end of the step with the weights b, so it is the first stage of the next step
+DOPRI5 = Tableau(c=np.array([0, 1 / 5, 3 / 10, 4 / 5, 8 / 9, 1, 1]),
+                 a=np.array([[0, 0, 0, 0, 0, 0, 0],
+                             [1 / 5, 0, 0, 0, 0, 0, 0],
+                             [3 / 40, 9 / 40, 0, 0, 0, 0, 0],
+                             [44 / 45, -56 / 15, 32 / 9, 0, 0, 0, 0],
+                             [19372 / 6561, -25360 / 2187, 64448 / 6561, -212 / 729, 0, 0, 0],
+                             [9017 / 3168, -355 / 33, 46732 / 5247, 49 / 176, -5103 / 18656, 0, 0],
+                             [35 / 384, 0, 500 / 1113, 125 / 192, -2187 / 6784, 11 / 84, 0]]),
+                 b=np.array([35 / 384, 0, 500 / 1113, 125 / 192, -2187 / 6784, 11 / 84, 0]),
+                 e=np.array([71 / 57600, 0, -71 / 16695, 71 / 1920, -17253 / 339200, 22 / 525, -1 / 40]),
+                 order=5)
+
+
+class RKStats(namedtuple('RKStats', ['cells', 'steps', 'rejected', 'evaluations'])):
+    """
+    The work of an integration.
+
+    cells: The number of cells integrated.
+    steps: The number of steps taken by the cells, summed over the cells (the rejected ones included).
+    rejected: The number of rejected steps, summed over the cells.
+    evaluations: The number of right-hand side calls (each one for a batch of cells).
+    """
+    def __str__(self):
+        per_cell = self.steps / self.cells if self.cells else 0.0
+        return (f"{self.cells} cells: {self.steps} steps ({per_cell:.1f} per cell), {self.rejected} rejected, "
+                f"{self.evaluations} right-hand side calls")
+
+
+def _step(fun, t, y, h, tableau, args, f0):
+    # One step of the method for every row of y, from the derivatives f0 at (t, y). Returns the new states, the error
+    # estimate (None without embedded method) and the derivatives of the last stage
+    k = np.empty((len(tableau.b),) + y.shape)
+    k[0] = f0
+    h = h[:, None]
+    for i in range(1, len(k)):
+        dy = np.tensordot(tableau.a[i, :i], k[:i], axes=1)
+        k[i] = fun(t + tableau.c[i] * h[:, 0], y + h * dy, *args)
+    y_new = y + h * np.tensordot(tableau.b, k, axes=1)
+    error = None if tableau.e is None else h * np.tensordot(tableau.e, k, axes=1)
+    return y_new, error, k[-1]
+
+
+def _error_norm(error, y, y_new, rtol, atol):
+    # The RMS norm of the error of each cell, scaled by the tolerances (a step is accepted if it is at most 1)
+    scale = atol + rtol * np.maximum(np.abs(y), np.abs(y_new))
+    norm = np.sqrt(np.mean((error / scale) ** 2, axis=1))
+    # A step that overflows is rejected
+    return np.where(np.isfinite(norm), norm, np.inf)
+
+
+def _initial_step(fun, t0, y0, f0, t1, order, rtol, atol, args):
+    # The first step size of each cell, as in scipy.integrate's select_initial_step (Hairer, Norsett and Wanner)
+    scale = atol + rtol * np.abs(y0)
+    d0 = np.sqrt(np.mean((y0 / scale) ** 2, axis=1))
+    d1 = np.sqrt(np.mean((f0 / scale) ** 2, axis=1))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        h0 = np.where((d0 < 1e-5) | (d1 < 1e-5), 1e-6, 0.01 * d0 / d1)
+    h0 = np.minimum(h0, t1 - t0)
+    f1 = fun(t0 + h0, y0 + h0[:, None] * f0, *args)
+    d2 = np.sqrt(np.mean(((f1 - f0) / scale) ** 2, axis=1)) / h0
+    d = np.maximum(d1, d2)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        h1 = np.where(d <= 1e-15, np.maximum(1e-6, h0 * 1e-3), (0.01 / d) ** (1 / order))
+    h1 = np.where(np.isfinite(h1), h1, 1e-6)
+    return np.minimum(np.minimum(100 * h0, h1), t1 - t0)
+
+
+def fixed_step(fun, y0, t0, t1, steps=None, tableau=RK4, args=()):
+    """
+    Integrate a batch of systems from t0 to t1 with equal steps.
+
+    Args:
+        fun (callable): The right-hand side fun(t, y, *args) of the (cells, variables) states y.
+        y0 (numpy array (cells, variables)): The states at t0.
+        t0 (float): The start time.
+        t1 (float): The end time.
+        steps (int): The number of steps, enough for steps of at most RK4_STEP if None.
+        tableau (Tableau): The method.
+        args (tuple): Arrays whose first axis is the cells, handed to fun.
+
+    Returns:
+        tuple: The (cells, variables) states at t1, and the RKStats.
+    """
+    y = np.array(y0, dtype=float)
+    if steps is None:
+        steps = max(1, int(np.ceil((t1 - t0) / RK4_STEP)))
+    if steps < 1:
+        raise ValueError(f"steps must be at least 1, got {steps}")
+    h = np.full(len(y), (t1 - t0) / steps)
+    evaluations = 0
+    for i in range(steps):
+        t = np.full(len(y), t0) + i * h
+        y, _, _ = _step(fun, t, y, h, tableau, args, fun(t, y, *args))
+        evaluations += len(tableau.b)
+    return y, RKStats(len(y), steps * len(y), 0, evaluations)
+
+
+def adaptive(fun, y0, t0, t1, rtol=1e-6, atol=1e-9, tableau=DOPRI5, max_steps=100000, args=()):
+    """
+    Integrate a batch of systems from t0 to t1, each with its own step size.
+
+    Every cell takes steps of its own size, checked against its own error estimate. The cells whose step is rejected
+    stay where they are and try again with a smaller step, the others move on, and the cells that reach t1 are left out
+    of the next steps.
+
+    Args:
+        fun (callable): The right-hand side fun(t, y, *args) of the (cells, variables) states y.
+        y0 (numpy array (cells, variables)): The states at t0.
+        t0 (float): The start time.
+        t1 (float): The end time.
+        rtol (float): The relative tolerance of the local error.
+        atol (float): The absolute tolerance of the local error.
+        tableau (Tableau): The method, with an error estimate and a last stage at the end of the step (as DOPRI5).
+        max_steps (int): The largest number of steps of a cell.
+        args (tuple): Arrays whose first axis is the cells, handed to fun.
+
+    Returns:
+        tuple: The (cells, variables) states at t1, and the RKStats.
+    """
+    if tableau.e is None:
+        raise ValueError("The adaptive steps need a method with an error estimate, e.g. DOPRI5")
+    y = np.array(y0, dtype=float)
+    num_cells = len(y)
+    t = np.full(num_cells, float(t0))
+    if num_cells == 0 or t1 == t0:
+        return y, RKStats(num_cells, 0, 0, 0)
+    args = tuple(np.asarray(arg) for arg in args)
+    f = np.asarray(fun(t, y, *args), dtype=float)
+    h = _initial_step(fun, t, y, f, t1, tableau.order, rtol, atol, args)
+    evaluations = 2
+    steps = np.zeros(num_cells, dtype=int)
+    rejected = np.zeros(num_cells, dtype=bool)
+    num_rejected = 0
+    active = np.arange(num_cells)
+    while len(active):
+        cell_args = tuple(arg[active] for arg in args)
+        # The last step of a cell ends exactly at t1
+        step = np.minimum(h[active], t1 - t[active])
+        tiny = step <= 10 * np.spacing(np.maximum(np.abs(t[active]), 1))
+        if tiny.any():
+            raise RuntimeError(f"The step size of {int(tiny.sum())} cell(s) fell to zero before t={t1}")
+        y_new, error, f_new = _step(fun, t[active], y[active], step, tableau, cell_args, f[active])
+        evaluations += len(tableau.b) - 1
+        norm = _error_norm(error, y[active], y_new, rtol, atol)
+        accept = norm <= 1
+        # The new step size of every cell, not larger than the rejected one after a rejection
+        with np.errstate(divide='ignore'):
+            factor = np.clip(SAFETY * norm ** (-1 / tableau.order), MIN_FACTOR, MAX_FACTOR)
+        factor = np.where(accept & rejected[active], np.minimum(factor, 1), factor)
+        h[active] = step * factor
+        moved = active[accept]
+        # The cells whose last step was accepted are exactly at t1, whatever the rounding of t + step
+        t[moved] = np.where(step[accept] == t1 - t[moved], t1, t[moved] + step[accept])
+        y[moved] = y_new[accept]
+        f[moved] = f_new[accept]
+        rejected[active] = ~accept
+        num_rejected += int((~accept).sum())
+        steps[active] += 1
+        if steps[active].max() > max_steps:
+            raise RuntimeError(f"More than {max_steps} steps for a cell before t={t1}")
+        active = active[t[active] < t1]
+    return y, RKStats(num_cells, int(steps.sum()), num_rejected, evaluations)
+
+
+def integrate(fun, y0, t0, t1, method='dopri5', rtol=1e-6, atol=1e-9, steps=None, args=()):
+    """
+    Integrate a batch of systems from t0 to t1 with one of the methods.
+
+    Args:
+        fun (callable): The right-hand side fun(t, y, *args) of the (cells, variables) states y.
+        y0 (numpy array (cells, variables)): The states at t0.
+        t0 (float): The start time.
+        t1 (float): The end time.
+        method (str): 'rk4' (fixed steps, the tolerances are not used) or 'dopri5' (adaptive steps for each cell).
+        rtol (float): The relative tolerance of 'dopri5'.
+        atol (float): The absolute tolerance of 'dopri5'.
+        steps (int): The number of steps of 'rk4', steps of at most RK4_STEP if None.
+        args (tuple): Arrays whose first axis is the cells, handed to fun.
+
+    Returns:
+        tuple: The (cells, variables) states at t1, and the RKStats.
+    """
+    if method == 'rk4':
+        return fixed_step(fun, y0, t0, t1, steps, RK4, args)
+    if method == 'dopri5':
+        return adaptive(fun, y0, t0, t1, rtol, atol, DOPRI5, args=args)
+    raise ValueError(f"Unknown method '{method}', expected one of {METHODS}")
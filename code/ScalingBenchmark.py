@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+This script measures the strong scaling of the tiled CA ('CA.evolution(..., processes=n)', see 'Tiled_CA.py').
+
+The same grid, with seagrass in one cell out of four, is evolved for a few weeks with 1, 2, 4, ..., 32 worker processes, without the outputs of 'CA.evolution', so that the tiles only exchange their halos every week and are gathered at the end. The script prints the wall time per week, the speedup over one process and the parallel efficiency, writes them into 'strong_scaling.csv' and plots the speedup against the number of processes in 'strong_scaling.png'.
+
+Numbers of processes above the number of cores of the machine are skipped: their processes would take turns on the cores and the wall time would not be a measure of the scaling. The curve up to 32 processes has to be run on a machine with at least 32 cores.
+
+Usage:
+    python ScalingBenchmark.py [grid size] [weeks] [output folder]
+"""
+__appname__ = 'ScalingBenchmark'
+__author__ = 'ANQI WANG (aw222@ic.ac.uk)'
+__version__ = '0.0.1'
+__license__ = "None"
+
+import csv
+import os
+import sys
+import time
+import numpy as np
+
+import CA_Model
+import Parameters
+import Tiled_CA
+
+# Numbers of processes to run
+PROCESSES = [1, 2, 4, 8, 16, 32]
+
+
+def make_ca(size, seed=0):
+    '''
+    Build a size x size CA with seagrass in one cell out of four, so that the daily ODE step has work to do
+    '''
+    np.random.seed(seed)
+    ca = CA_Model.CA(size, size, plot_results=False, engine='batch', transition='synchronous')
+    ca.grid = ca.grid.astype(float)
+    occupied = np.random.rand(size, size) < 0.25
+    ca.grid[occupied] = [Parameters.R, Parameters.Nrint, Parameters.N_org, Parameters.NH4, Parameters.NO2,
+                         Parameters.NO3, Parameters.POP, Parameters.SRP, Parameters.P_ma_int, Parameters.P_R_int]
+    ca.state[occupied] = Parameters.SEAGRASS
+    return ca
+
+
+def strong_scaling(size=200, weeks=2, processes=PROCESSES):
+    '''
+    Time the tiled evolution of the same CA with each number of processes up to the number of cores of the machine.
+    Return one row per number of processes: the wall time per week, the speedup and the efficiency
+    '''
+    rows = []
+    for n in processes:
+        if n > (os.cpu_count() or 1):
+            continue
+        ca = make_ca(size)
+        start = time.perf_counter()
+        with Tiled_CA.TiledEvolution(ca, n) as tiled:
+            for m in range(weeks):
+                tiled.week(m, state=False, grid=False)
+            tiled.gather()
+        rows.append((n, (time.perf_counter() - start) / weeks))
+    base = rows[0][1]
+    return [(n, seconds, base / seconds, base / seconds / n) for n, seconds in rows]
+
+
+def save_scaling(rows, size, weeks, path='strong_scaling.csv'):
+    '''
+    Write the rows of strong_scaling into a CSV file, with the grid, the weeks and the cores of the machine
+    '''
+    with open(path, 'w', newline='') as f:
+        f.write(f"# {size}x{size} grid, {weeks} weeks, {os.cpu_count()} cores\n")
+        writer = csv.writer(f)
+        writer.writerow(['processes', 'seconds_per_week', 'speedup', 'efficiency'])
+        for row in rows:
+            writer.writerow([row[0]] + [f"{value:.4g}" for value in row[1:]])
+
+
+def plot_scaling(rows, path='strong_scaling.png'):
+    '''
+    Plot the speedup against the number of processes, with the ideal speedup, into an image file
+    '''
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    plt.plot([r[0] for r in rows], [r[2] for r in rows], 'o-', label=f'measured ({os.cpu_count()} cores)')
+    plt.plot([r[0] for r in rows], [r[0] for r in rows], 'k--', label='ideal')
+    plt.xscale('log', base=2)
+    plt.yscale('log', base=2)
+    plt.xlabel('Processes')
+    plt.ylabel('Speedup over 1 process')
+    plt.legend()
+    plt.savefig(path, dpi=150, bbox_inches='tight')
+
+
+if __name__ == "__main__":
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    weeks = int(sys.argv[2]) if len(sys.argv) > 2 else 2
+    folder = sys.argv[3] if len(sys.argv) > 3 else '.'
+    rows = strong_scaling(size, weeks)
+    print(f"Strong scaling, {size}x{size} grid, {weeks} weeks, {os.cpu_count()} cores available")
+    skipped = [n for n in PROCESSES if n > (os.cpu_count() or 1)]
+    if skipped:
+        print(f"Not measured, more processes than cores: {skipped}")
+    print(f"{'processes':>9} {'s/week':>8} {'speedup':>8} {'efficiency':>10}")
+    for n, seconds, speedup, efficiency in rows:
+        print(f"{n:>9d} {seconds:>8.2f} {speedup:>8.2f} {efficiency:>10.2f}")
+    save_scaling(rows, size, weeks, os.path.join(folder, 'strong_scaling.csv'))
+    plot_scaling(rows, os.path.join(folder, 'strong_scaling.png'))
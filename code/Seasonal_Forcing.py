@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+
+"""
+This Python script, 'Seasonal_Forcing.py', builds the values of the model parameters for every week of a run (temperature, ORP_s, DO, the R baseline, the rates, ...), so that the seasons change as the run goes on.
+
+The schedule is built once, before the run, as one array per parameter with one entry per week. During the run, 'SeasonalForcing.parameters(m)' returns the 'Parameters.ModelParameters' of week m with one lookup; weeks with the same values share the same object, so the compiled models of a season can be reused (see 'CA.evolution').
+
+A schedule can be built in three ways:
+
+1. 'SeasonalForcing.from_seasons': The values of 'Parameters.SEASONS', 13 weeks per season and 52 weeks per year, starting in spring. With interpolate=True, the values change linearly from the middle of one season to the middle of the next instead of jumping at the start of each season.
+
+2. 'SeasonalForcing.from_csv': A time series in a CSV file, with a 'week' column and one column per parameter. The parameters without a column keep their default values.
+
+3. 'SeasonalForcing(table)': Any dict of arrays, one per parameter.
+
+Usage:
+    forcing = SeasonalForcing.from_seasons(260)
+    ca = CA_Model.CA(100, 100, forcing=forcing)
+    ca.evolution(260)
+"""
+
+__appname__ = 'Seasonal_Forcing'
+__author__ = 'ANQI WANG (aw222@ic.ac.uk)'
+__version__ = '0.0.1'
+__license__ = "None"
+
+import numpy as np
+
+import Parameters
+
+# Number of weeks in a year of the schedule
+WEEKS_PER_YEAR = len(Parameters.SEASON_NAMES) * Parameters.WEEKS_PER_SEASON
+
+
+class SeasonalForcing:
+    """
+    This class holds the values of the model parameters for every week of a run.
+
+    Args:
+        table (dict): An array of values per week for any of the parameters in Parameters.PARAMETER_NAMES. All arrays
+                      must have the same length, the number of weeks.
+        base (Parameters.ModelParameters): The values of the parameters that are not in the table, the values of the
+                                           Parameters module if None.
+    """
+    def __init__(self, table, base=None):
+        base = Parameters.default_parameters() if base is None else base
+        unknown = set(table) - set(Parameters.PARAMETER_NAMES)
+        if unknown:
+            raise ValueError(f"Unknown parameters {sorted(unknown)}, expected some of {Parameters.PARAMETER_NAMES}")
+        lengths = {len(values) for values in table.values()}
+        if len(lengths) != 1:
+            raise ValueError("The table needs the same number of weeks (at least one) for every parameter")
+        self.num_weeks = lengths.pop()
+        self.table = {name: np.asarray(table[name], dtype=float) if name in table else np.full(self.num_weeks, getattr(base, name))
+                      for name in Parameters.PARAMETER_NAMES}
+        # One ModelParameters per week, shared by the weeks with the same values
+        rows = np.column_stack([self.table[name] for name in Parameters.PARAMETER_NAMES])
+        unique, self.week_index = np.unique(rows, axis=0, return_inverse=True)
+        self.week_index = self.week_index.ravel()
+        self.sets = [Parameters.ModelParameters(*(float(v) for v in row)) for row in unique]
+
+    @classmethod
+    def from_seasons(cls, num_of_weeks, interpolate=False, start_week=0, seasons=None, base=None):
+        """
+        Build the schedule of the seasons of the year.
+
+        Args:
+            num_of_weeks (int): The number of weeks of the run.
+            interpolate (bool): Whether the values change linearly between the middles of the seasons (True), or
+                                stay the same for the 13 weeks of each season (False).
+            start_week (int): The week of the year of the first week of the run, 0 for the first week of spring.
+            seasons (dict): The values of each season, Parameters.SEASONS if None.
+            base (Parameters.ModelParameters): The values of the parameters that the seasons do not set.
+
+        Returns:
+            SeasonalForcing: The schedule.
+        """
+        seasons = Parameters.SEASONS if seasons is None else seasons
+        week_of_year = (start_week + np.arange(num_of_weeks)) % WEEKS_PER_YEAR
+        names = [name for name in Parameters.PARAMETER_NAMES if all(name in seasons[s] for s in Parameters.SEASON_NAMES)]
+        # The values of each season, one row per season
+        values = np.array([[seasons[s][name] for name in names] for s in Parameters.SEASON_NAMES], dtype=float)
+        if interpolate:
+            # Each season's values are reached in its middle week, and the year wraps around from winter to spring
+            middles = (np.arange(len(Parameters.SEASON_NAMES)) + 0.5) * Parameters.WEEKS_PER_SEASON
+            table = {name: np.interp(week_of_year, middles, values[:, i], period=WEEKS_PER_YEAR) for i, name in enumerate(names)}
+        else:
+            season = week_of_year // Parameters.WEEKS_PER_SEASON
+            table = {name: values[season, i] for i, name in enumerate(names)}
+        return cls(table, base)
+
+    @classmethod
+    def from_csv(cls, path, num_of_weeks=None, base=None):
+        """
+        Read the schedule from a CSV file with a 'week' column and one column per parameter.
+
+        Args:
+            path (str): The CSV file. Its other columns are ignored.
+            num_of_weeks (int): The number of weeks of the run. If the file has fewer weeks, it is repeated. All the
+                                weeks of the file if None.
+            base (Parameters.ModelParameters): The values of the parameters without a column.
+
+        Returns:
+            SeasonalForcing: The schedule.
+        """
+        # pandas is only needed here, so it is not loaded with the module (e.g. by main.py)
+        import pandas as pd
+
+        data = pd.read_csv(path)
+        if 'week' in data:
+            data = data.sort_values('week')
+        names = [name for name in Parameters.PARAMETER_NAMES if name in data]
+        weeks = np.arange(len(data) if num_of_weeks is None else num_of_weeks) % len(data)
+        return cls({name: data[name].to_numpy(dtype=float)[weeks] for name in names}, base)
+
+    def parameters(self, m):
+        """
+        Return the parameters of week m.
+
+        Args:
+            m (int): The week of the run. Weeks beyond the end of the schedule repeat it from the start.
+
+        Returns:
+            Parameters.ModelParameters: The values of the parameters of the week.
+        """
+        return self.sets[self.week_index[m % self.num_weeks]]
+
+    def describe(self):
+        """
+        Describe the schedule for the metadata of a run (e.g. a Snapshot_Store.SnapshotStore), as plain lists.
+
+        Returns:
+            dict: The number of weeks, and the values of every week of the parameters that change from week to week.
+                  The other parameters have the same value every week, that of parameters(0).
+        """
+        return {'num_weeks': self.num_weeks,
+                'weekly': {name: values.tolist() for name, values in self.table.items() if np.ptp(values) > 0}}
@@ -5,6 +5,9 @@ This script extends a Cellular Automata (CA) model to investigate the impact of
 parameters on seagrass density. The CA model is extended to include additional initialization methods.
 We run simulations for different parameter ranges and then perform a sensitivity analysis to find out
 which parameters have the most significant impact on seagrass density.
+
+Importing the script only defines its functions. The analysis runs with 'sensitivity_analysis', or when the script
+is run directly.
 """
 __appname__ = 'SensitiveAnalysis'
 __author__ = 'ANQI WANG (aw222@ic.ac.uk)'
@@ -12,7 +15,6 @@ __version__ = '0.0.1'
 __license__ = "None"
 
 import numpy as np
-import matplotlib.pyplot as plt
 from CA_Model import CA
 
 # Extend the CA class to include the new initialization methods
@@ -46,11 +48,11 @@ NO3_levels = np.linspace(0, 30, 10)
 SRP_levels = np.linspace(0.1, 2, 10)
 POP_levels = np.linspace(0, 10, 10)
 
-# Initialize the CA model
-ca = CA(100, 100, plot_results=False)
-
 # Function to run the simulation for each parameter range and record the final density of seagrass
-def run_simulation(param_values, param_name):
+def run_simulation(param_values, param_name, ca=None):
+    # Initialize the CA model
+    if ca is None:
+        ca = CA(100, 100, plot_results=False)
     final_seagrass_densities = []
     for value in param_values:
         ca.initialize_grid()
@@ -85,8 +87,7 @@ def run_simulation(param_values, param_name):
     
     return final_seagrass_densities
 
-# Run simulations for each parameter
-results = {}
+# The parameters to vary, and their ranges
 params = [
     ("silt", silt_levels),
     ("temperature", temperatures),
@@ -100,31 +101,45 @@ params = [
     ("POP", POP_levels)
 ]
 
-for param_name, param_values in params:
-    results[param_name] = run_simulation(param_values, param_name)
-
-# Compute the impact of each parameter
-differences = {param: max(densities) - min(densities) for param, densities in results.items()}
-
-# Normalize the differences to compute the relative impact in percentage
-total_difference = sum(differences.values())
-percent_impact = {param: (diff / total_difference) * 100 for param, diff in differences.items()}
-
-# After computing the differences and percent impacts in the sensitivity analysis code
-# Print the raw differences for each parameter
-print("Raw Differences:")
-for param, diff in differences.items():
-    print(f"{param}: {diff}")
-
-# Print the normalized percent impacts for each parameter
-print("\nPercent Impacts:")
-for param, impact in percent_impact.items():
-    print(f"{param}: {impact:.2f}%")
-
-# Plot the fractional impact using a bar chart
-plt.bar(percent_impact.keys(), percent_impact.values(), color='blue')
-plt.ylabel('Fractional Impact (%)')
-plt.title('Fractional Impact of Factors on Seagrass Density')
-plt.xticks(rotation=45, ha="right")  # Rotate x-axis labels for better readability
-plt.tight_layout()  # Ensure labels don't get cut off
-plt.show()
+def sensitivity_analysis(params=params):
+    '''
+    Run simulations for each parameter, and return the raw difference in final density of each parameter and its share
+    of the total difference (in %)
+    '''
+    # Run simulations for each parameter
+    ca = CA(100, 100, plot_results=False)
+    results = {}
+    for param_name, param_values in params:
+        results[param_name] = run_simulation(param_values, param_name, ca)
+
+    # Compute the impact of each parameter
+    differences = {param: max(densities) - min(densities) for param, densities in results.items()}
+
+    # Normalize the differences to compute the relative impact in percentage
+    total_difference = sum(differences.values())
+    percent_impact = {param: (diff / total_difference) * 100 for param, diff in differences.items()}
+    return differences, percent_impact
+
+if __name__ == "__main__":
+    import matplotlib.pyplot as plt
+
+    differences, percent_impact = sensitivity_analysis()
+
+    # After computing the differences and percent impacts in the sensitivity analysis code
+    # Print the raw differences for each parameter
+    print("Raw Differences:")
+    for param, diff in differences.items():
+        print(f"{param}: {diff}")
+
+    # Print the normalized percent impacts for each parameter
+    print("\nPercent Impacts:")
+    for param, impact in percent_impact.items():
+        print(f"{param}: {impact:.2f}%")
+
+    # Plot the fractional impact using a bar chart
+    plt.bar(percent_impact.keys(), percent_impact.values(), color='blue')
+    plt.ylabel('Fractional Impact (%)')
+    plt.title('Fractional Impact of Factors on Seagrass Density')
+    plt.xticks(rotation=45, ha="right")  # Rotate x-axis labels for better readability
+    plt.tight_layout()  # Ensure labels don't get cut off
+    plt.show()
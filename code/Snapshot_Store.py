@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+
+"""
+This Python script, 'Snapshot_Store.py', stores the weekly snapshots of a CA run (the state code of every cell and its 10 float variables) in one chunked, compressed container, instead of one pickle file per week.
+
+A store is a folder with three files:
+
+1. 'meta.json': The size of the grid, the number of variables, the chunk size, the number of weeks written so far, the seed of the run and its parameters.
+
+2. 'chunks.bin': The compressed chunks, one after the other. Every week is cut into tiles of chunk x chunk cells, and the states and the variables of each tile are compressed separately with zlib (the bytes of the floats are shuffled first, which makes them compress much better).
+
+3. 'index.bin': The offset and length of every chunk in 'chunks.bin', with one fixed-size record per week.
+
+Reading opens 'chunks.bin' and 'index.bin' as memory maps, so loading a week, or a region of the grid over many weeks, only touches and decompresses the chunks it needs.
+
+Usage:
+    with SnapshotStore('./matrix', 'w', height=100, width=100) as store:
+        store.append(ca.state, ca.grid)
+    store = SnapshotStore('./matrix')
+    week_10 = store.grid(10)
+    patch = store.state(slice(None), slice(40, 60), slice(40, 60))   # all weeks, a 20x20 region
+"""
+
+__appname__ = 'Snapshot_Store'
+__author__ = 'ANQI WANG (aw222@ic.ac.uk)'
+__version__ = '0.0.1'
+__license__ = "None"
+
+import json
+import os
+import types
+import zlib
+
+import numpy as np
+
+# Default size of the square chunks, in cells
+CHUNK = 64
+
+
+def _shuffle(block):
+    # Group the bytes of the values by their position in the value (all first bytes, then all second bytes, ...)
+    return np.ascontiguousarray(block).view(np.uint8).reshape(-1, block.dtype.itemsize).T.tobytes()
+
+
+def _unshuffle(data, dtype, shape):
+    itemsize = np.dtype(dtype).itemsize
+    return np.frombuffer(data, dtype=np.uint8).reshape(itemsize, -1).T.copy().view(dtype).reshape(shape)
+
+
+def describe_parameters(module):
+    """
+    Collect the numeric and string values of a parameter module (e.g. Parameters) into a dict that JSON can hold.
+
+    Args:
+        module: The module, or any object with the parameters as attributes.
+
+    Returns:
+        dict: The name and value of every public parameter.
+    """
+    values = {}
+    for name, value in vars(module).items():
+        if name.startswith('_') or isinstance(value, (types.ModuleType, types.FunctionType, type)):
+            continue
+        if isinstance(value, (bool, int, float, str)):
+            values[name] = value
+        elif isinstance(value, (list, tuple)) and all(isinstance(v, (bool, int, float, str)) for v in value):
+            values[name] = list(value)
+    return values
+
+
+def describe_rng(rng):
+    """
+    Describe the seed of a source of random numbers, so that a run can be traced back to it.
+
+    Args:
+        rng: A numpy.random.Generator, or the np.random module.
+
+    Returns:
+        dict or None: The entropy and spawn key of the SeedSequence of a Generator, None for np.random.
+    """
+    seed_seq = getattr(getattr(rng, 'bit_generator', None), 'seed_seq', None)
+    if seed_seq is None or not hasattr(seed_seq, 'entropy'):
+        return None
+    return {'entropy': seed_seq.entropy, 'spawn_key': list(seed_seq.spawn_key)}
+
+
+class SnapshotStore:
+    """
+    This class writes and reads the weekly snapshots of a CA run.
+
+    Args:
+        path (str): The folder of the store.
+        mode (str): 'r' to read an existing store, 'w' to create a new one (replacing any store in the folder),
+                    'a' to append weeks to an existing store.
+        height (int): The height of the grid, needed with mode='w'.
+        width (int): The width of the grid, needed with mode='w'.
+        num_vars (int): The number of float variables of each cell.
+        chunk (int): The size of the square chunks, in cells.
+        level (int): The zlib compression level, from 1 (fastest) to 9 (smallest).
+        seed: The seed of the run, stored in the metadata.
+        parameters (dict): The parameters of the run, stored in the metadata.
+    """
+    def __init__(self, path, mode='r', height=None, width=None, num_vars=10, chunk=CHUNK, level=4, seed=None,
+                 parameters=None):
+        if mode not in ('r', 'w', 'a'):
+            raise ValueError(f"Unknown mode '{mode}', expected 'r', 'w' or 'a'")
+        self.path = path
+        self.mode = mode
+        if mode == 'w':
+            if height is None or width is None:
+                raise ValueError("height and width are needed to create a store")
+            os.makedirs(path, exist_ok=True)
+            self.meta = {'height': height, 'width': width, 'num_vars': num_vars, 'chunk': chunk, 'level': level,
+                         'state_dtype': 'uint8', 'grid_dtype': 'float64', 'num_weeks': 0,
+                         'seed': seed, 'parameters': parameters or {}}
+            for name in ('chunks.bin', 'index.bin'):
+                open(os.path.join(path, name), 'wb').close()
+            self._write_meta()
+        else:
+            with open(os.path.join(path, 'meta.json')) as f:
+                self.meta = json.load(f)
+        self.rows = range(0, self.meta['height'], self.meta['chunk'])
+        self.cols = range(0, self.meta['width'], self.meta['chunk'])
+        if mode == 'r':
+            self._chunks = self._index = None
+        else:
+            self._chunks = open(os.path.join(path, 'chunks.bin'), 'ab')
+            self._index = open(os.path.join(path, 'index.bin'), 'ab')
+
+    @property
+    def num_weeks(self):
+        return self.meta['num_weeks']
+
+    def _write_meta(self):
+        # Write to a new file first, so that a reader never sees half a file
+        name = os.path.join(self.path, 'meta.json')
+        with open(name + '.tmp', 'w') as f:
+            json.dump(self.meta, f, indent=1)
+        os.replace(name + '.tmp', name)
+
+    def append(self, state, grid):
+        """
+        Add the snapshot of one more week.
+
+        Args:
+            state (numpy array (height, width)): The state codes of the cells.
+            grid (numpy array (height, width, num_vars)): The variables of the cells.
+
+        Returns:
+            int: The week of the snapshot.
+        """
+        if self.mode == 'r':
+            raise ValueError("The store is open for reading")
+        state = np.asarray(state, dtype=self.meta['state_dtype'])
+        grid = np.asarray(grid, dtype=self.meta['grid_dtype'])
+        chunk, level = self.meta['chunk'], self.meta['level']
+        offset = self._chunks.tell()
+        index = np.zeros((len(self.rows), len(self.cols), 2, 2), dtype=np.int64)
+        for i, r in enumerate(self.rows):
+            for j, c in enumerate(self.cols):
+                for k, data in enumerate((state[r:r + chunk, c:c + chunk].tobytes(),
+                                          _shuffle(grid[r:r + chunk, c:c + chunk]))):
+                    data = zlib.compress(data, level)
+                    self._chunks.write(data)
+                    index[i, j, k] = offset, len(data)
+                    offset += len(data)
+        self._chunks.flush()
+        self._index.write(index.tobytes())
+        self._index.flush()
+        self.meta['num_weeks'] += 1
+        self._write_meta()
+        return self.meta['num_weeks'] - 1
+
+    def _maps(self):
+        # Memory maps of the chunks and of the index, opened again when more weeks have been written
+        size = os.path.getsize(os.path.join(self.path, 'chunks.bin'))
+        if getattr(self, '_maps_size', None) != size:
+            self._maps_size = size
+            self._data = np.memmap(os.path.join(self.path, 'chunks.bin'), dtype=np.uint8, mode='r') if size else None
+            self._index_map = np.memmap(os.path.join(self.path, 'index.bin'), dtype=np.int64, mode='r').reshape(
+                -1, len(self.rows), len(self.cols), 2, 2) if size else None
+        return self._data, self._index_map
+
+    def _read(self, kind, week, rows, cols):
+        # Read the region rows x cols of the given weeks, kind 0 for the states and 1 for the variables
+        height, width, chunk = self.meta['height'], self.meta['width'], self.meta['chunk']
+        weeks = range(self.num_weeks)[week] if isinstance(week, slice) else [range(self.num_weeks)[week]]
+        rows = range(height)[rows]
+        cols = range(width)[cols]
+        if rows.step != 1 or cols.step != 1:
+            raise ValueError("Only regions with a step of 1 can be read")
+        dtype = self.meta['state_dtype'] if kind == 0 else self.meta['grid_dtype']
+        extra = () if kind == 0 else (self.meta['num_vars'],)
+        out = np.empty((len(weeks), len(rows), len(cols)) + extra, dtype=dtype)
+        data, index = self._maps()
+        for n, w in enumerate(weeks):
+            # Only the chunks that overlap the region are decompressed
+            for i in range(rows.start // chunk, (rows.stop - 1) // chunk + 1 if len(rows) else 0):
+                for j in range(cols.start // chunk, (cols.stop - 1) // chunk + 1 if len(cols) else 0):
+                    r, c = i * chunk, j * chunk
+                    shape = (min(chunk, height - r), min(chunk, width - c)) + extra
+                    offset, length = index[w, i, j, kind]
+                    raw = zlib.decompress(data[offset:offset + length])
+                    block = np.frombuffer(raw, dtype=dtype).reshape(shape) if kind == 0 else _unshuffle(raw, dtype, shape)
+                    r0, r1 = max(rows.start, r), min(rows.stop, r + shape[0])
+                    c0, c1 = max(cols.start, c), min(cols.stop, c + shape[1])
+                    out[n, r0 - rows.start:r1 - rows.start, c0 - cols.start:c1 - cols.start] = block[r0 - r:r1 - r, c0 - c:c1 - c]
+        return out if isinstance(week, slice) else out[0]
+
+    def state(self, week, rows=slice(None), cols=slice(None)):
+        """
+        Read the state codes of a region of the grid.
+
+        Args:
+            week (int or slice): The week, or a slice of weeks.
+            rows (slice): The rows of the region.
+            cols (slice): The columns of the region.
+
+        Returns:
+            numpy array: (rows, cols) for one week, (weeks, rows, cols) for a slice of weeks.
+        """
+        return self._read(0, week, rows, cols)
+
+    def grid(self, week, rows=slice(None), cols=slice(None)):
+        """
+        Read the variables of a region of the grid.
+
+        Args:
+            week (int or slice): The week, or a slice of weeks.
+            rows (slice): The rows of the region.
+            cols (slice): The columns of the region.
+
+        Returns:
+            numpy array: (rows, cols, num_vars) for one week, (weeks, rows, cols, num_vars) for a slice of weeks.
+        """
+        return self._read(1, week, rows, cols)
+
+    def close(self):
+        if self._chunks is not None:
+            self._chunks.close()
+            self._index.close()
+            self._chunks = self._index = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
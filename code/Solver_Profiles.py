@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+
+"""
+This Python script, 'Solver_Profiles.py', defines named solver profiles that trade the accuracy of the ODE solves of the cells for speed, and compares the results of a simulation under two of them.
+
+'Growth_model', 'Ni_model' and 'P_model' solve their ODEs with odeint at its default tolerances and ask for a dense grid of output times: every day up to now_t for the growth model, and every day of a 100-day window for the nitrogen and phosphorus models, of which only the value at now_t is kept. A profile sets, for the three models at once:
+
+- rtol and atol, the tolerances of the solver;
+- sampling, the output times: 'dense' as above, or 'endpoint', only the start and the time kept (the solver then stops at now_t instead of running to the end of the window);
+- method, 'lsoda' (odeint) or 'dopri5' (the explicit Dormand-Prince method of 'Runge_Kutta').
+
+The profile of a simulation is given as CA(..., profile='balanced') and carried with the compiled models ('Cell.compile_models(parameters, profile)'), so it also applies to the cell cache, the steady state tracker and the tiles. With engine='batch' only its tolerances are used, the method is set by CA(..., solver=...). Without a profile (None) the models are solved as they always were, which is what 'reference' does too.
+
+The script contains these key parts:
+
+1. 'SolverProfile' and 'PROFILES': The profiles 'reference', 'balanced' and 'fast'.
+
+2. 'get_profile': Looks a profile up by name.
+
+3. 'sample_times' and 'solve': The output times and the odeint-like solve of the model functions under a profile, and 'batch_tolerances' for the batch engine.
+
+4. 'ProfileComparison' and 'compare_profiles': Runs the same scenario under two profiles, with the same random numbers, and reports the speedup and how far the coverage and the variables of the cells drift apart.
+
+Usage:
+    comparison = compare_profiles('reference', 'fast', size=50, weeks=10, seed=0)
+    print(comparison)
+"""
+
+__appname__ = 'Solver_Profiles'
+__author__ = 'ANQI WANG (aw222@ic.ac.uk)'
+__version__ = '0.0.1'
+__license__ = "None"
+
+import time
+from collections import namedtuple
+
+import numpy as np
+from scipy.integrate import odeint
+
+import Parameters
+
+# The methods and output samplings of a profile
+METHODS = ('lsoda', 'dopri5')
+SAMPLINGS = ('dense', 'endpoint')
+# The variables of a cell compared by 'compare_profiles'
+FIELDS = {'growth': slice(0, 2), 'nitrogen': slice(2, 6), 'phosphorus': slice(6, 10)}
+
+
+class SolverProfile(namedtuple('SolverProfile', ['name', 'rtol', 'atol', 'sampling', 'method'])):
+    """
+    How the growth, nitrogen and phosphorus models are solved.
+
+    name: The name of the profile.
+    rtol: The relative tolerance of the solver.
+    atol: The absolute tolerance of the solver.
+    sampling: 'dense' (the output times of the model functions) or 'endpoint' (only the start and the time kept).
+    method: 'lsoda' (odeint) or 'dopri5' (Runge_Kutta.adaptive).
+    """
+    def __str__(self):
+        return f"{self.name} (rtol={self.rtol:g}, atol={self.atol:g}, {self.sampling} sampling, {self.method})"
+
+
+PROFILES = {
+    # odeint at its default tolerances on the dense output times, as the model functions have always been solved
+    'reference': SolverProfile('reference', rtol=1.49012e-8, atol=1.49012e-8, sampling='dense', method='lsoda'),
+    # odeint at looser tolerances, up to now_t only
+    'balanced': SolverProfile('balanced', rtol=1e-6, atol=1e-8, sampling='endpoint', method='lsoda'),
+    # Loose tolerances, up to now_t only
+    'fast': SolverProfile('fast', rtol=1e-3, atol=1e-6, sampling='endpoint', method='lsoda'),
+}
+
+
+def get_profile(profile):
+    """
+    Args:
+        profile: The name of a profile in PROFILES, a SolverProfile, or None.
+
+    Returns:
+        SolverProfile: The profile, or None if None was given.
+    """
+    if profile is None or isinstance(profile, SolverProfile):
+        if profile is not None and (profile.method not in METHODS or profile.sampling not in SAMPLINGS):
+            raise ValueError(f"Unknown method or sampling in {profile}, expected one of {METHODS} and {SAMPLINGS}")
+        return profile
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown solver profile '{profile}', expected one of {tuple(PROFILES)}")
+    return PROFILES[profile]
+
+
+def batch_tolerances(profile=None):
+    """
+    Args:
+        profile (SolverProfile): The profile, or None.
+
+    Returns:
+        dict: The rtol and atol of the profile for 'Batch_Model.batch_grid_run', empty (its defaults) if None.
+    """
+    return {} if profile is None else {'rtol': profile.rtol, 'atol': profile.atol}
+
+
+def sample_times(t, now_t, profile=None):
+    """
+    The output times of a model function under a profile.
+
+    Args:
+        t (numpy array): The dense output times of the model function.
+        now_t (float): The time whose value the model function keeps (the closest of t).
+        profile (SolverProfile): The profile, None for the dense times.
+
+    Returns:
+        numpy array: t, or only its first time and the one closest to now_t with the 'endpoint' sampling.
+    """
+    if profile is None or profile.sampling == 'dense':
+        return t
+    return np.unique(t[[0, np.argmin(np.abs(t - now_t))]])
+
+
+def solve(model_sol, init, t, args=(), Dfun=None, profile=None, **kwargs):
+    """
+    Solve an odeint style model under a profile.
+
+    Args:
+        model_sol (callable): The right-hand side model_sol(y, t, *args).
+        init (list): The initial values.
+        t (numpy array): The output times, the first one is the time of init.
+        args (tuple): The other arguments of model_sol.
+        Dfun (callable): The Jacobian of model_sol, for odeint.
+        profile (SolverProfile): The profile, None for odeint at its default tolerances.
+        **kwargs: Other arguments of odeint, e.g. mxstep.
+
+    Returns:
+        numpy array (len(t), len(init)): The values at the output times, as from odeint.
+    """
+    if profile is None:
+        return odeint(model_sol, init, t, args=args, Dfun=Dfun, **kwargs)
+    if profile.method == 'lsoda':
+        return odeint(model_sol, init, t, args=args, Dfun=Dfun, rtol=profile.rtol, atol=profile.atol, **kwargs)
+    import Runge_Kutta
+    # One cell for the batched integrator
+    def fun(time, y):
+        return np.asarray(model_sol(y[0], time[0], *args), dtype=float).reshape(1, -1)
+    result = np.empty((len(t), len(init)))
+    result[0] = init
+    y = np.array([init], dtype=float)
+    for i in range(1, len(t)):
+        y, _ = Runge_Kutta.adaptive(fun, y, t[i - 1], t[i], profile.rtol, profile.atol)
+        result[i] = y[0]
+    return result
+
+
+class ProfileComparison(namedtuple('ProfileComparison', ['profiles', 'seconds', 'coverage', 'coverage_drift',
+                                                         'state_mismatch', 'field_drift', 'evolving'])):
+    """
+    The same scenario run under two profiles, the second one compared with the first.
+
+    profiles: The two SolverProfiles.
+    seconds: The wall time of the evolution under each profile.
+    coverage: The share of seagrass cells at the end of each run.
+    coverage_drift: The largest difference of the weekly share of seagrass cells between the runs.
+    state_mismatch: The share of the cells whose final state differs.
+    field_drift: For the growth, nitrogen and phosphorus variables, the largest relative difference of a cell at the
+                 end (over the cells that evolve in both runs).
+    evolving: The number of cells that evolve in both runs at the end.
+    """
+    @property
+    def speedup(self):
+        return self.seconds[0] / self.seconds[1] if self.seconds[1] else np.inf
+
+    def __str__(self):
+        a, b = self.profiles
+        fields = ", ".join(f"{name} {drift:.2e}" for name, drift in self.field_drift.items())
+        return (f"{b.name} against {a.name}: {self.seconds[1]:.2f} s against {self.seconds[0]:.2f} s "
+                f"({self.speedup:.2f}x)\n"
+                f"  seagrass cover {self.coverage[1] * 100:.2f}% against {self.coverage[0] * 100:.2f}%, largest weekly "
+                f"difference {self.coverage_drift * 100:.2f} points, {self.state_mismatch * 100:.2f}% of the cells "
+                f"in another state\n"
+                f"  largest relative difference of the variables of the {self.evolving} evolving cells: {fields}")
+
+
+def run_scenario(profile, size, weeks, seed, evolving=0.0, **ca_args):
+    """
+    Run one CA of a comparison.
+
+    Args:
+        profile (SolverProfile): The profile.
+        size (int): The width and height of the grid.
+        weeks (int): The number of weeks.
+        seed (int): The seed of the random numbers of the CA.
+        evolving (float): The share of the cells, drawn with the seed, that start from the initial values of the
+                          models on a float grid, so that their ODEs are solved from the first week. 0 keeps the
+                          int grid of the CA.
+        **ca_args: Other arguments of CA, e.g. engine or forcing.
+
+    Returns:
+        tuple: The CA after the run, the wall time of the evolution and the weekly share of seagrass cells.
+    """
+    import CA_Model
+    import Cell
+
+    rng = np.random.default_rng(seed)
+    ca = CA_Model.CA(size, size, plot_results=False, rng=rng, snapshots=None, profile=profile, **ca_args)
+    ca.initialize_grid()
+    if evolving:
+        ca.grid = ca.grid.astype(float)
+        cells = np.random.default_rng([seed, 1]).random((size, size)) < evolving
+        ca.grid[cells] = Cell.initial_state(ca.week_parameters(0))
+    coverage = []
+    start = time.perf_counter()
+    ca.evolution(weeks, callback=lambda m, ca: coverage.append(np.mean(ca.state == Parameters.SEAGRASS)))
+    return ca, time.perf_counter() - start, np.array(coverage)
+
+
+def compare_profiles(a='reference', b='fast', size=50, weeks=10, seed=0, evolving=0.3, **ca_args):
+    """
+    Run the same scenario under two profiles, with the same random numbers, and compare the second run with the first.
+
+    Args:
+        a: The profile of the baseline run, a name or a SolverProfile.
+        b: The profile of the compared run.
+        size (int): The width and height of the grid.
+        weeks (int): The number of weeks.
+        seed (int): The seed of the random numbers of both runs.
+        evolving (float): The share of the cells that start from the initial values of the models, see 'run_scenario'.
+                          Above 0, since the ODEs of the other cells are never solved and the profiles would not be
+                          compared.
+        **ca_args: Other arguments of CA, e.g. engine or forcing.
+
+    Returns:
+        ProfileComparison: The wall times, and the differences of coverage and of the variables of the cells.
+    """
+    if not 0 < evolving <= 1:
+        raise ValueError(f"evolving must be above 0 and at most 1, got {evolving}: without evolving cells the "
+                         f"profiles solve no ODE and cannot be compared")
+    profiles = (get_profile(a), get_profile(b))
+    (ca_a, seconds_a, coverage_a), (ca_b, seconds_b, coverage_b) = \
+        [run_scenario(profile, size, weeks, seed, evolving, **ca_args) for profile in profiles]
+    both = ca_a.grid.all(axis=-1) & ca_b.grid.all(axis=-1)
+    grid_a, grid_b = ca_a.grid[both].astype(float), ca_b.grid[both].astype(float)
+    field_drift = {}
+    for name, columns in FIELDS.items():
+        scale = np.abs(grid_a[:, columns])
+        diff = np.abs(grid_b[:, columns] - grid_a[:, columns])
+        with np.errstate(divide='ignore', invalid='ignore'):
+            relative = np.where(scale > 0, diff / scale, diff)
+        field_drift[name] = float(np.nanmax(relative)) if relative.size else 0.0
+    return ProfileComparison(profiles, (seconds_a, seconds_b), (coverage_a[-1], coverage_b[-1]),
+                             float(np.abs(coverage_a - coverage_b).max()), float(np.mean(ca_a.state != ca_b.state)),
+                             field_drift, int(both.sum()))
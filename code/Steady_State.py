@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+
+"""
+This Python script, 'Steady_State.py', stops solving the nitrogen and phosphorus models of the cells that have reached their equilibrium.
+
+Every day, 'Ni_model' and 'P_model' integrate the 4 nitrogen and the 4 phosphorus variables of each evolving cell over a 100-day window, even when these variables no longer change. Here the right-hand sides 'Ni_model_sol' and 'P_model_sol' are evaluated at the start of the day for all the evolving cells at once, and a cell whose 8 derivatives are all below a tolerance (in absolute value) is frozen: 'Cell.one_cell_run(..., frozen=True)' keeps its nutrient variables as they are and only solves its growth model.
+
+A frozen cell stays frozen until something can move it away from its equilibrium: new model parameters (e.g. a new season), a change of its state code by the transition rules, a change of its nutrient variables from outside the solver, or the end of its growth. The share of the evolving cells that were frozen is recorded for every week.
+
+The script contains one key class:
+
+1. 'SteadyStateTracker': Keeps the frozen cells of a grid, runs the daily step of the evolving cells with 'Cell.one_cell_run', and records the share of frozen cells of every week in 'weekly' (see also 'Metrics.Frozen').
+
+Usage:
+    ca = CA_Model.CA(100, 100, steady_state=SteadyStateTracker(tol=1e-6))
+    ca.evolution(52)
+    print(ca.steady_state.weekly)
+"""
+
+__appname__ = 'Steady_State'
+__author__ = 'ANQI WANG (aw222@ic.ac.uk)'
+__version__ = '0.0.1'
+__license__ = "None"
+
+import numpy as np
+
+import Cell
+import Parameters
+
+# The nitrogen (N_org, NH4, NO2, NO3) and phosphorus (POP, SRP, P_ma_int, P_R_int) variables of a cell
+NUTRIENTS = slice(2, 10)
+
+
+def nutrient_rates(cells, bundles=None):
+    """
+    The largest absolute derivative of the nitrogen and phosphorus variables of each cell.
+
+    Args:
+        cells (numpy array (n, 10)): The variables of the cells.
+        bundles (dict): The compiled models from 'Cell.compile_models', or None for the reference functions.
+
+    Returns:
+        numpy array (n,): The largest of the 8 absolute derivatives of each cell.
+    """
+    bundles = Cell.model_functions(bundles)
+    cells = np.asarray(cells, dtype=float).T
+    # The same params as in 'Batch_Model.batch_model_sol'
+    du_dt = np.concatenate([np.asarray(bundles['Ni'][0](cells[2:6], 0, cells[0]), dtype=float).reshape(4, -1),
+                            np.asarray(bundles['P'][0](cells[6:10], 0, cells[[0, 1, 2, 3]]), dtype=float).reshape(4, -1)])
+    return np.abs(du_dt).max(axis=0)
+
+
+class SteadyStateTracker:
+    """
+    This class freezes the nitrogen and phosphorus models of the cells at their equilibrium.
+
+    Args:
+        tol (float): The largest absolute derivative of the 8 nutrient variables for a cell to be frozen.
+        jac (bool): Whether the solvers are given the analytic Jacobians, as in 'Cell.one_cell_run'.
+    """
+    def __init__(self, tol=1e-6, jac=True):
+        if tol <= 0:
+            raise ValueError(f"tol must be positive, got {tol}")
+        self.tol = tol
+        self.jac = jac
+        # The frozen cells, the parameters they were frozen with, and their nutrient variables and state codes then
+        self.frozen = None
+        self.parameters = None
+        self.values = None
+        self.state = None
+        # The evolving and frozen cell-days of the current week, and the share of frozen cells of every week
+        self.cell_days = 0
+        self.frozen_days = 0
+        self.weekly = []
+
+    def _invalidate(self, grid, evolving, parameters, state):
+        # Thaw the cells that may have left their equilibrium since the last day
+        if self.frozen is None or self.frozen.shape != evolving.shape or parameters != self.parameters:
+            self.frozen = np.zeros(evolving.shape, dtype=bool)
+            self.parameters = parameters
+            return
+        self.frozen &= evolving
+        self.frozen &= (grid[..., NUTRIENTS] == self.values).all(axis=-1)
+        if state is not None and self.state is not None:
+            self.frozen &= state == self.state
+
+    def run_grid(self, t, grid, mode='split', bundles=None, state=None):
+        """
+        Run one time step for the evolving cells of a CA grid, in place, without solving the nutrient models of the
+        frozen cells.
+
+        Args:
+            t (int): The current time point, as in 'Cell.one_cell_run'.
+            grid (numpy array (height, width, 10)): The variables of the cells.
+            mode (str): Only 'split', where the nutrient models are solved apart from the growth model.
+            bundles (dict): The compiled models from 'Cell.compile_models'.
+            state (numpy array (height, width)): The state codes of the cells, to thaw the cells whose state changed.
+
+        Returns:
+            numpy array: The grid.
+        """
+        if mode != 'split':
+            raise ValueError("The steady states can only be frozen in the split mode")
+        evolving = grid.all(axis=-1)
+        self._invalidate(grid, evolving, Cell.model_functions(bundles).get('parameters', Parameters), state)
+        candidates = evolving & ~self.frozen
+        if candidates.any():
+            self.frozen[candidates] = nutrient_rates(grid[candidates], bundles) < self.tol
+        for x, y in np.argwhere(evolving):
+            grid[x][y] = Cell.one_cell_run(t, grid[x][y], mode, self.jac, bundles, frozen=bool(self.frozen[x, y]))
+        self.values = grid[..., NUTRIENTS].copy()
+        self.state = None if state is None else state.copy()
+        self.cell_days += int(evolving.sum())
+        self.frozen_days += int(self.frozen.sum())
+        return grid
+
+    def end_week(self):
+        """
+        Record the share of the evolving cells that were frozen over the week.
+
+        Returns:
+            float: The share (the frozen cell-days over the evolving cell-days), NaN if no cell evolved.
+        """
+        fraction = self.frozen_days / self.cell_days if self.cell_days else np.nan
+        self.weekly.append(fraction)
+        self.cell_days = self.frozen_days = 0
+        return fraction
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+This script checks what 'Cell.CellStepper' reproduces of 'Cell.one_cell_run', and shows where the stepper and the daily loop of 'CA.evolution' part.
+
+'one_cell_run(t, grid)' solves the models of a cell from its stored state up to now_t = t+1, and 'CA.evolution' calls it with t = 1 to 7 on the days of a week, each time on the state stored the day before. So the stored state is integrated over 2 time units on the first day of a week and over 8 on the last one, 35 per week. A stepper integrates one time unit per day, 7 per week, along the trajectory of the cell. In the split mode its growth solver also keeps the R and Nrint that 'Growth_model_sol' is given from the start of the trajectory, where 'one_cell_run' gives it those of the stored state every day. The two therefore follow different time bases and a cell drifts apart from the first day, so the stepper is not an engine of the CA: it stays a library class until it can reproduce the daily loop.
+
+The script contains two key functions:
+
+1. 'check_stepper': Checks that a stepper started from a cell reproduces 'one_cell_run' for that same start, for every day up to the end of a week. This is the equivalence the stepper keeps.
+
+2. 'compare_engines': Advances the same cell with the daily loop of 'CA.evolution' and with a stepper, and reports how far the two end up apart, which is the divergence of the two time bases.
+
+Usage:
+    python StepperComparison.py [weeks]
+"""
+__appname__ = 'StepperComparison'
+__author__ = 'ANQI WANG (aw222@ic.ac.uk)'
+__version__ = '0.0.1'
+__license__ = "None"
+
+import sys
+from collections import namedtuple
+
+import numpy as np
+
+import Cell
+import Growth_Model
+import Ni_Model
+import P_Model
+import Parameters
+
+# The largest relative difference accepted by 'check_stepper' (the solvers run at the default tolerances of odeint)
+TOLERANCE = 1e-5
+
+
+class EngineDivergence(namedtuple('EngineDivergence', ['weeks', 'R', 'relative'])):
+    """
+    The same cell advanced with the daily loop of 'CA.evolution' and with a stepper.
+
+    weeks: The number of weeks the cell was advanced.
+    R: The R of the cell at the end, with the daily loop and with the stepper.
+    relative: The largest relative difference of a variable of the cell between the two.
+    """
+    def __str__(self):
+        return (f"After {self.weeks} weeks: R {self.R[0]:.3g} with the daily loop of CA.evolution against "
+                f"{self.R[1]:.3g} with a stepper, largest relative difference {self.relative:.2e}")
+
+
+def solve_cell(grid, now_t, mode='split'):
+    '''
+    Solve the models of a cell from grid up to now_t, as one_cell_run(now_t - 1, grid) does (for now_t > 1)
+    '''
+    if mode == 'coupled':
+        return Cell.coupled_model(grid, now_t)
+    R, Nrint, N_org, NH4, NO2, NO3, POP, SRP, P_ma_int, P_R_int = grid
+    new_R, new_Nrint = Growth_Model.Growth_model(NH4, NO3, R, Nrint, now_t)
+    new_N = Ni_Model.Ni_model(new_R, N_org, NH4, NO2, NO3, now_t)
+    new_P = P_Model.P_model(POP, SRP, P_ma_int, P_R_int, new_R, new_Nrint, new_N[0], new_N[1], now_t)
+    return [new_R, new_Nrint, *new_N, *new_P]
+
+
+def check_stepper(grid=None, days=7, mode='split', tolerance=TOLERANCE):
+    """
+    Check that a stepper started from grid at t=0 matches the model functions solved from grid up to now_t, as
+    one_cell_run(now_t - 1, grid) does after the first day, at every now_t up to days.
+
+    Args:
+        grid (list): The state of the cell, the initial values of the models if None.
+        days (int): The last time point checked.
+        mode (str): 'split' or 'coupled', as in 'Cell.one_cell_run'.
+        tolerance (float): The largest relative difference accepted.
+
+    Returns:
+        float: The largest relative difference of a variable over the days.
+
+    Raises:
+        AssertionError: If a difference is over the tolerance.
+    """
+    grid = np.asarray(Cell.initial_state(Parameters) if grid is None else grid, dtype=float)
+    stepper = Cell.CellStepper(grid, mode=mode)
+    largest = 0.0
+    for now_t in range(1, days + 1):
+        stepped = stepper.advance_to(now_t)
+        solved = np.asarray(solve_cell(grid, now_t, mode), dtype=float)
+        relative = float(np.max(np.abs(stepped - solved) / np.maximum(np.abs(solved), 1e-12)))
+        if relative > tolerance:
+            raise AssertionError(f"The stepper differs from one_cell_run by {relative:.2e} at now_t={now_t} ({mode})")
+        largest = max(largest, relative)
+    return largest
+
+
+def compare_engines(grid=None, weeks=2, mode='split'):
+    """
+    Advance the same cell with the daily loop of 'CA.evolution' (engine='cell', one_cell_run with t = 1 to 7 every
+    week on the stored state) and with a stepper (one time unit per day), under the default parameters.
+
+    Args:
+        grid (list): The state of the cell, the initial values of the models if None.
+        weeks (int): The number of weeks.
+        mode (str): 'split' or 'coupled', as in 'Cell.one_cell_run'.
+
+    Returns:
+        EngineDivergence: How far the cell ends up apart.
+    """
+    grid = np.asarray(Cell.initial_state(Parameters) if grid is None else grid, dtype=float)
+    bundles = Cell.compile_models(Parameters)
+    stepper = Cell.CellStepper(grid, mode=mode, bundles=bundles)
+    cell = grid
+    for m in range(weeks):
+        for s in range(7):
+            cell = np.asarray(Cell.one_cell_run(s+1, cell, mode, bundles=bundles), dtype=float)
+    steps = stepper.advance_to(7 * weeks)
+    relative = float(np.max(np.abs(steps - cell) / np.maximum(np.abs(cell), 1e-12)))
+    return EngineDivergence(weeks, (float(cell[0]), float(steps[0])), relative)
+
+
+if __name__ == "__main__":
+    weeks = int(sys.argv[1]) if len(sys.argv) > 1 else 2
+    for mode in ('split', 'coupled'):
+        print(f"{mode}: the stepper matches one_cell_run from the same start within {check_stepper(mode=mode):.2e}")
+    for mode in ('split', 'coupled'):
+        print(f"{mode}: {compare_engines(weeks=weeks, mode=mode)}")
@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+
+"""
+This Python script, 'Streaming_ANOVA.py', runs a one-way Analysis of Variance (ANOVA) over groups of values that are too large to hold in memory at once, e.g. the final grids of hundreds of replicates.
+
+The values of each group are read in chunks (rows of a CSV file, or blocks of rows of a week of a 'Snapshot_Store'), and every chunk only updates three numbers of its group: the count, the mean and the sum of squared deviations from the mean (M2), merged with the formulas of Welford and Chan et al. Two sets of accumulators built from different files, e.g. in different worker processes, merge the same way. The F-statistic and the p-value are then computed from these numbers as in scipy.stats.f_oneway.
+
+The script contains these key parts:
+
+1. 'GroupStats': The count, mean and M2 of one group, with 'add' for a chunk of values and 'merge' for another GroupStats.
+
+2. 'OnewayANOVA': The GroupStats of every group, with readers for arrays, CSV files and snapshot stores, and 'result' for the F-statistic and p-value.
+
+3. 'streaming_anova': Reads the files of every group in a process pool and merges their accumulators.
+
+Usage:
+    anova = OnewayANOVA()
+    for name in ('RIS', 'CCS', 'ClGS'):
+        anova.add_csv(name, f'{name}_final_state.csv')
+    print(anova.result())
+    print(streaming_anova({'RIS': ris_files, 'CCS': ccs_files}, processes=8))
+"""
+
+__appname__ = 'Streaming_ANOVA'
+__author__ = 'ANQI WANG (aw222@ic.ac.uk)'
+__version__ = '0.0.1'
+__license__ = "None"
+
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import numpy as np
+from scipy import special
+
+import Snapshot_Store
+
+# Same fields (and printout) as the result of scipy.stats.f_oneway
+F_onewayResult = namedtuple('F_onewayResult', ['statistic', 'pvalue'])
+
+# Default number of CSV rows or grid rows read at once
+CHUNK_ROWS = 1024
+
+
+class GroupStats:
+    """
+    The count, mean and sum of squared deviations from the mean (M2) of the values of one group.
+
+    The mean is kept relative to a shift (the first value added), so that values far from zero do not lose precision.
+
+    Args:
+        count (int): The number of values.
+        mean (float): Their mean, minus the shift.
+        M2 (float): The sum of their squared deviations from the mean.
+        shift (float): The shift of the mean, set by the first chunk added if None.
+    """
+    def __init__(self, count=0, mean=0.0, M2=0.0, shift=None):
+        self.count = count
+        self.mean = mean
+        self.M2 = M2
+        self.shift = shift
+
+    def merge(self, other):
+        """
+        Add the values summarised by another GroupStats (Chan et al.), in place.
+
+        Args:
+            other (GroupStats): The accumulator of the other values.
+
+        Returns:
+            GroupStats: self.
+        """
+        if other.count == 0:
+            return self
+        if self.shift is None:
+            self.shift = other.shift
+        count = self.count + other.count
+        # The mean of the other values, relative to the shift of this group
+        delta = other.mean + (other.shift - self.shift) - self.mean
+        self.mean += delta * other.count / count
+        self.M2 += other.M2 + delta * delta * self.count * other.count / count
+        self.count = count
+        return self
+
+    def add(self, values):
+        """
+        Add a chunk of values.
+
+        Args:
+            values (array-like): The values, of any shape.
+
+        Returns:
+            GroupStats: self.
+        """
+        values = np.asarray(values, dtype=np.float64).ravel()
+        if values.size == 0:
+            return self
+        shift = values[0] if self.shift is None else self.shift
+        values = values - shift
+        mean = values.mean()
+        return self.merge(GroupStats(values.size, mean, np.square(values - mean).sum(), shift))
+
+    @property
+    def total_mean(self):
+        # The mean of the values
+        return self.shift + self.mean if self.count else np.nan
+
+    @property
+    def variance(self):
+        # The unbiased variance of the values
+        return self.M2 / (self.count - 1) if self.count > 1 else np.nan
+
+    def __repr__(self):
+        return f"GroupStats(count={self.count}, mean={self.mean!r}, M2={self.M2!r}, shift={self.shift!r})"
+
+
+class OnewayANOVA:
+    """
+    This class accumulates the values of several groups, chunk by chunk, for a one-way ANOVA.
+
+    The groups are kept in the order they are first added.
+    """
+    def __init__(self):
+        self.groups = {}
+
+    def _group(self, group):
+        if group not in self.groups:
+            self.groups[group] = GroupStats()
+        return self.groups[group]
+
+    def add(self, group, values):
+        """
+        Add a chunk of values to a group.
+
+        Args:
+            group: The name of the group.
+            values (array-like): The values, of any shape.
+        """
+        self._group(group).add(values)
+
+    def add_csv(self, group, path, chunk_rows=CHUNK_ROWS, **read_args):
+        """
+        Add all the values of a CSV file of numbers (e.g. a grid saved with np.savetxt) to a group, a few rows at a time.
+
+        Args:
+            group: The name of the group.
+            path (str): The CSV file.
+            chunk_rows (int): The number of rows read at once.
+            **read_args: Other arguments of pandas.read_csv. By default the file has no header row.
+        """
+        # pandas is only needed here, so it is not loaded with the module
+        import pandas as pd
+
+        read_args.setdefault('header', None)
+        for chunk in pd.read_csv(path, chunksize=chunk_rows, **read_args):
+            self.add(group, chunk.to_numpy(dtype=np.float64))
+
+    def add_store(self, group, path, week=-1, variable=None, chunk_rows=CHUNK_ROWS):
+        """
+        Add the values of one week of a snapshot store to a group, a few rows of the grid at a time.
+
+        Args:
+            group: The name of the group.
+            path (str): The folder of the 'Snapshot_Store.SnapshotStore'.
+            week (int): The week, the last one by default.
+            variable (int): The index of the cell variable to use (e.g. Parameters.R_IDX), or None for the state codes.
+            chunk_rows (int): The number of rows of the grid read at once.
+        """
+        store = Snapshot_Store.SnapshotStore(path)
+        week = range(store.num_weeks)[week]
+        for r in range(0, store.meta['height'], chunk_rows):
+            rows = slice(r, r + chunk_rows)
+            if variable is None:
+                self.add(group, store.state(week, rows))
+            else:
+                self.add(group, store.grid(week, rows)[..., variable])
+
+    def merge(self, other):
+        """
+        Add the accumulators of another OnewayANOVA, e.g. computed in another process, in place.
+
+        Args:
+            other (OnewayANOVA): The other accumulators. Groups with the same name are merged.
+
+        Returns:
+            OnewayANOVA: self.
+        """
+        for group, stats in other.groups.items():
+            self._group(group).merge(stats)
+        return self
+
+    def result(self):
+        """
+        Compute the F-statistic and the p-value, as scipy.stats.f_oneway would on all the values.
+
+        Returns:
+            F_onewayResult: The F-statistic and its p-value. As in f_oneway, both are NaN if every value is the
+                            same, and F is infinite (p-value 0) if the values only differ between groups.
+        """
+        stats = list(self.groups.values())
+        if len(stats) < 2:
+            raise ValueError("At least two groups are needed")
+        if any(s.count == 0 for s in stats):
+            raise ValueError("Every group needs at least one value")
+        counts = np.array([s.count for s in stats], dtype=np.float64)
+        # The means of the groups, relative to the shift of the first group
+        means = np.array([s.mean + (s.shift - stats[0].shift) for s in stats])
+        total = counts.sum()
+        grand_mean = (counts * means).sum() / total
+        # Between-group and within-group sums of squares, and their degrees of freedom
+        ssbn = (counts * np.square(means - grand_mean)).sum()
+        sswn = sum(s.M2 for s in stats)
+        dfbn = len(stats) - 1
+        dfwn = total - len(stats)
+        if dfwn <= 0:
+            raise ValueError("There must be more values than groups")
+        if sswn == 0:
+            if ssbn == 0:
+                return F_onewayResult(np.nan, np.nan)
+            return F_onewayResult(np.inf, 0.0)
+        f = (ssbn / dfbn) / (sswn / dfwn)
+        return F_onewayResult(f, special.fdtrc(dfbn, dfwn, f))
+
+
+def file_stats(path, **read_args):
+    """
+    Accumulate all the values of one file, a CSV file or the last week of a snapshot store (a folder).
+
+    Args:
+        path (str): The file.
+        **read_args: Other arguments of 'OnewayANOVA.add_csv' or 'OnewayANOVA.add_store'.
+
+    Returns:
+        GroupStats: The accumulator of its values.
+    """
+    anova = OnewayANOVA()
+    if path.endswith('.csv'):
+        anova.add_csv(None, path, **read_args)
+    else:
+        anova.add_store(None, path, **read_args)
+    return anova.groups[None]
+
+
+def streaming_anova(sources, processes=None, **read_args):
+    """
+    Run a one-way ANOVA over groups of files, with the files read in a process pool.
+
+    Args:
+        sources (dict): The files (CSV files or snapshot stores) of every group, e.g. {'RIS': [...], 'CCS': [...]}.
+        processes (int): The number of worker processes, the number of cores if None. With 1, the files are read in
+                         this process.
+        **read_args: Other arguments of 'file_stats'.
+
+    Returns:
+        F_onewayResult: The F-statistic and its p-value.
+    """
+    anova = OnewayANOVA()
+    jobs = [(group, path) for group, paths in sources.items() for path in paths]
+    read = partial(file_stats, **read_args)
+    if processes == 1:
+        results = map(read, [path for _, path in jobs])
+    else:
+        with ProcessPoolExecutor(processes) as executor:
+            results = list(executor.map(read, [path for _, path in jobs]))
+    for group in sources:
+        anova._group(group)
+    for (group, _), stats in zip(jobs, results):
+        anova.groups[group].merge(stats)
+    return anova.result()
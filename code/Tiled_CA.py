@@ -0,0 +1,355 @@
+#!/usr/bin/env python3
+
+"""
+This Python script, 'Tiled_CA.py', runs the weeks of a CA on a grid split into rectangular tiles, with the tiles handled in parallel by worker processes that keep them for the whole run.
+
+When the run starts, every worker process is sent its tiles once: the variables and the states of their cells. The tiles then stay in the workers, and each week is run in two rounds:
+
+1. 'TileWorker.run_week': Every worker advances the ODEs of the cells of its tiles over the 7 days of the week (with 'Batch_Model.batch_grid_run' or 'Cell.one_cell_run'), and then applies the transitions of each cell on its own ('CA_Model.own_transitions'). The cells of different tiles do not interact here, so this round runs fully in parallel. The worker sends back the edges of each tile: whether each cell of its first and last rows and columns holds seagrass ('edges_of').
+
+2. 'TileWorker.spread': The seagrass spreads to the 8 neighbours of each cell, so a tile also needs the cells that border it. The main process puts the edges of the tiles together, and sends every tile the halo of one cell around it, which lies in the edges of its neighbours ('halo_of'). Every worker then spreads the seagrass into its own tiles ('CA_Model.spread_seagrass').
+
+So only the edges and the halos of the tiles, a few bytes per cell of their borders, go through the pipes every week. The states of the cells (and their variables) are only gathered into the CA for the weeks whose outputs need them (snapshots, images, metrics or a callback), and at the end of the run.
+
+The transitions are those of 'CA.synchronous_transition', so the CA must have transition='synchronous', and its engine must be 'batch' or 'cell' without a cell cache or a steady state tracker: the tiles raise a ValueError instead of running other settings with other rules. The random numbers of each row of the grid and each week come from their own generator, seeded with (seed, week, row), and every tile takes the columns it holds from the rows it holds ('draws_of'). So the cells draw the same numbers whatever the tiling, and a run is the same for a given seed whatever the number of processes and of tiles. It is not the run of 'CA.evolution' without processes, which draws from the random numbers of the CA (ca.rng).
+
+Usage:
+    ca = CA_Model.CA(2000, 2000, engine='batch', transition='synchronous')
+    ca.evolution(52, processes=8)
+"""
+
+__appname__ = 'Tiled_CA'
+__author__ = 'ANQI WANG (aw222@ic.ac.uk)'
+__version__ = '0.0.1'
+__license__ = "None"
+
+import multiprocessing
+
+import numpy as np
+
+import Batch_Model
+import CA_Model
+import Cell
+import Parameters
+import Solver_Profiles
+
+
+def split_tiles(height, width, num_tiles):
+    """
+    Split a grid into num_tiles rectangular tiles, as close to square as the number allows.
+
+    Args:
+        height (int): The number of rows of the grid.
+        width (int): The number of columns of the grid.
+        num_tiles (int): The number of tiles.
+
+    Returns:
+        list: The (row slice, column slice) of each tile.
+    """
+    # The factor pair of num_tiles whose tiles are the closest to square
+    rows = min((r for r in range(1, num_tiles + 1) if num_tiles % r == 0),
+               key=lambda r: abs(np.log((height / r) / (width / (num_tiles // r)))))
+    cols = num_tiles // rows
+    row_edges = np.linspace(0, height, rows + 1).astype(int).tolist()
+    col_edges = np.linspace(0, width, cols + 1).astype(int).tolist()
+    return [(slice(row_edges[i], row_edges[i + 1]), slice(col_edges[j], col_edges[j + 1]))
+            for i in range(rows) for j in range(cols)]
+
+
+def edges_of(seagrass):
+    """
+    Args:
+        seagrass (numpy array (h, w) of bool): Whether each cell of a tile holds seagrass.
+
+    Returns:
+        tuple: Its first row, last row, first column and last column.
+    """
+    return seagrass[0].copy(), seagrass[-1].copy(), seagrass[:, 0].copy(), seagrass[:, -1].copy()
+
+
+def draws_of(seed, m, k, tile, width):
+    """
+    The random numbers of the cells of a tile, from the generator of each row of the grid, so that they do not depend
+    on the tiling.
+
+    Args:
+        seed (int): The seed of the random numbers of the run.
+        m (int): The number of the week.
+        k (int): 0 for the own transitions of the cells, 1 for the spread of the seagrass.
+        tile (tuple): The (row slice, column slice) of the tile in the grid.
+        width (int): The number of columns of the grid.
+
+    Returns:
+        numpy array (h, w): A number in [0, 1) for each cell of the tile.
+    """
+    rows, cols = tile
+    return np.array([np.random.default_rng([seed, m, row, k]).random(width)[cols]
+                     for row in range(rows.start, rows.stop)]).reshape(rows.stop - rows.start, cols.stop - cols.start)
+
+
+def halo_of(frame, tile):
+    """
+    The halo of one cell around a tile.
+
+    Args:
+        frame (numpy array (height + 2, width + 2) of bool): The edges of every tile at their place in the grid,
+                                                            with a border of one cell around the grid.
+        tile (tuple): The (row slice, column slice) of the tile in the grid.
+
+    Returns:
+        tuple: The rows above and below the tile (with the corners) and the columns on its left and right.
+    """
+    rows, cols = tile
+    # In the frame, the cells of the tile are at rows.start + 1 to rows.stop, cols.start + 1 to cols.stop
+    return (frame[rows.start, cols.start:cols.stop + 2].copy(), frame[rows.stop + 1, cols.start:cols.stop + 2].copy(),
+            frame[rows.start + 1:rows.stop + 1, cols.start].copy(), frame[rows.start + 1:rows.stop + 1, cols.stop + 1].copy())
+
+
+class TileWorker:
+    """
+    This class holds the tiles of one worker process, and runs their weeks.
+
+    Args:
+        tiles (dict): The (grid, state) of each tile, by the number of the tile.
+        places (dict): The (row slice, column slice) of each tile in the grid, by the number of the tile.
+        width (int): The number of columns of the grid.
+        mode (str): 'split' or 'coupled', as in 'Cell.one_cell_run'.
+        engine (str): 'batch' or 'cell', as in 'CA'.
+        N_threshold (float): The nitrogen needed for an empty cell to germinate.
+        P_threshold (float): The phosphorus needed for an empty cell to germinate.
+        solver (str): The solver of engine='batch', as in 'Batch_Model.batch_run'.
+        profile (Solver_Profiles.SolverProfile): The solver profile of the models, None for the defaults.
+    """
+    def __init__(self, tiles, places, width, mode, engine, N_threshold, P_threshold, solver='bdf', profile=None):
+        self.tiles = tiles
+        self.places = places
+        self.width = width
+        self.mode = mode
+        self.engine = engine
+        self.N_threshold = N_threshold
+        self.P_threshold = P_threshold
+        self.solver = solver
+        self.profile = profile
+        # The compiled models of each set of parameters met so far
+        self.compiled = {}
+        # The states after run_week and whether each cell was empty before it, for spread
+        self.pending = {}
+
+    def run_week(self, m, seed, parameters):
+        """
+        Advance the cells of every tile over the 7 days of week m, then apply their own transitions.
+
+        Args:
+            m (int): The number of the week.
+            seed (int): The seed of the random numbers of the run.
+            parameters (Parameters.ModelParameters): The parameters of the models for the week.
+
+        Returns:
+            dict: The edges of the seagrass of each tile after its own transitions ('edges_of').
+        """
+        if parameters not in self.compiled:
+            self.compiled[parameters] = Cell.compile_models(parameters, self.profile)
+        bundles = self.compiled[parameters]
+        edges = {}
+        for i, (grid, state) in self.tiles.items():
+            for s in range(7):
+                if self.engine == 'batch':
+                    grid[...] = Batch_Model.batch_grid_run(s+1, grid, self.mode, bundles=bundles, solver=self.solver,
+                                                           **Solver_Profiles.batch_tolerances(self.profile))
+                else:
+                    for x, y in np.argwhere(grid.all(axis=-1)):
+                        grid[x][y] = Cell.one_cell_run(s+1, grid[x][y], self.mode, bundles=bundles)
+            draw = draws_of(seed, m, 0, self.places[i], self.width)
+            new_state = CA_Model.own_transitions(state, grid, draw, self.N_threshold, self.P_threshold)
+            self.pending[i] = (new_state, state == Parameters.EMPTY)
+            edges[i] = edges_of(new_state == Parameters.SEAGRASS)
+        return edges
+
+    def spread(self, m, seed, halos):
+        """
+        Spread the seagrass into the cells of every tile, at the end of week m.
+
+        Args:
+            m (int): The number of the week.
+            seed (int): The seed of the random numbers of the run.
+            halos (dict): The halo of each tile ('halo_of').
+        """
+        for i, (top, bottom, left, right) in halos.items():
+            new_state, empty = self.pending.pop(i)
+            seagrass = np.pad(new_state == Parameters.SEAGRASS, 1)
+            seagrass[0], seagrass[-1], seagrass[1:-1, 0], seagrass[1:-1, -1] = top, bottom, left, right
+            spread_draw = draws_of(seed, m, 1, self.places[i], self.width)
+            grid, _ = self.tiles[i]
+            self.tiles[i] = (grid, CA_Model.spread_seagrass(new_state, empty, spread_draw, seagrass))
+
+    def gather(self, grid=True):
+        """
+        Args:
+            grid (bool): Whether the variables of the cells are returned too.
+
+        Returns:
+            dict: The state of each tile, and its grid (None if grid is False).
+        """
+        return {i: (state, tile_grid if grid else None) for i, (tile_grid, state) in self.tiles.items()}
+
+
+def tile_worker(connection, tiles, places, settings):
+    '''
+    The loop of a worker process: build a TileWorker and run the commands received until None, sending back the result
+    of each one, or the error it raised
+    '''
+    worker = TileWorker(tiles, places, **settings)
+    while True:
+        message = connection.recv()
+        if message is None:
+            break
+        command, args = message
+        try:
+            connection.send((True, getattr(worker, command)(*args)))
+        except Exception as error:
+            connection.send((False, error))
+    connection.close()
+
+
+class TiledEvolution:
+    """
+    This class runs the weeks of a CA with its grid split into tiles, which worker processes keep and run in parallel.
+
+    Args:
+        ca (CA): The CA to evolve. Its grid and state are sent to the workers when the class is created, and gathered
+                 back by 'week' (if asked) and 'gather'.
+        processes (int): The number of worker processes.
+        num_tiles (int): The number of tiles, the number of processes if None. The tiles are dealt to the processes
+                         in turn. The results do not depend on it, nor on processes (see 'draws_of').
+        seed (int): The seed of the random numbers. If None, it is drawn from the random numbers of the CA (ca.rng),
+                    so that the seed of the CA also fixes the tiled runs.
+
+    Usage:
+        with TiledEvolution(ca, processes=4) as tiled:
+            for m in range(num_of_weeks):
+                tiled.week(m)
+            tiled.gather()
+    """
+    def __init__(self, ca, processes, num_tiles=None, seed=None):
+        if processes < 1:
+            raise ValueError(f"processes must be at least 1, got {processes}")
+        if ca.engine not in ('batch', 'cell'):
+            raise ValueError(f"The tiles cannot run engine='{ca.engine}', use 'batch' or 'cell'")
+        if ca.transition != 'synchronous':
+            # The tiles apply the rules of synchronous_transition, not a sweep in the order of the cells
+            raise ValueError(f"The tiles run transition='synchronous', not '{ca.transition}', run without processes "
+                             f"or with transition='synchronous'")
+        if ca.cell_cache is not None:
+            raise ValueError("The tiles cannot use a cell_cache, run without processes or without cell_cache")
+        if ca.steady_state is not None:
+            # The tiles would solve every cell and never record the weekly share of frozen cells
+            raise ValueError("The tiles cannot use a steady_state tracker, run without processes or without steady_state")
+        self.ca = ca
+        self.tiles = split_tiles(ca.height, ca.width, num_tiles or processes)
+        # random() exists both on np.random and on a numpy.random.Generator
+        self.seed = int(ca.rng.random() * 2**31) if seed is None else seed
+        # The edges of the tiles at their place in the grid, with a border of one empty cell around it
+        self.frame = np.zeros((ca.height + 2, ca.width + 2), dtype=bool)
+        # Whether the state and the grid of the CA are those of the tiles
+        self.fresh_state = self.fresh_grid = True
+        settings = {'width': ca.width, 'mode': ca.mode, 'engine': ca.engine, 'N_threshold': ca.N_THRESHOLD_GROWTH,
+                    'P_threshold': ca.P_THRESHOLD_GROWTH, 'solver': ca.solver, 'profile': ca.profile}
+        self.connections = []
+        self.workers = []
+        try:
+            for k in range(min(processes, len(self.tiles))):
+                tiles = {i: (ca.grid[tile].copy(), ca.state[tile].copy())
+                         for i, tile in enumerate(self.tiles) if i % processes == k}
+                places = {i: self.tiles[i] for i in tiles}
+                connection, worker_connection = multiprocessing.Pipe()
+                worker = multiprocessing.Process(target=tile_worker, args=(worker_connection, tiles, places, settings), daemon=True)
+                worker.start()
+                worker_connection.close()
+                self.connections.append(connection)
+                self.workers.append(worker)
+        except BaseException:
+            self.close()
+            raise
+
+    def call(self, command, args):
+        """
+        Run a command of TileWorker in every worker process at once.
+
+        Args:
+            command (str): The name of the method of TileWorker.
+            args (list): The arguments of the method for each worker.
+
+        Returns:
+            list: The result of each worker.
+        """
+        for connection, worker_args in zip(self.connections, args):
+            connection.send((command, worker_args))
+        # Receive from every worker before raising, so that no answer is left in a pipe
+        answers = [connection.recv() for connection in self.connections]
+        for ok, result in answers:
+            if not ok:
+                raise result
+        return [result for _, result in answers]
+
+    def week(self, m, state=True, grid=True):
+        """
+        Run week m on every tile.
+
+        Args:
+            m (int): The number of the week, used to seed its random numbers.
+            state (bool): Whether the states of the cells at the end of the week are gathered into the CA.
+            grid (bool): Whether the variables of the cells at the end of the week are gathered into the CA.
+        """
+        ca = self.ca
+        parameters = ca.week_parameters(m)
+        # Round 1: the days of the week and the own transitions, every tile on its own
+        for edges in self.call('run_week', [(m, self.seed, parameters)] * len(self.connections)):
+            for i, (top, bottom, left, right) in edges.items():
+                rows, cols = self.tiles[i]
+                self.frame[rows.start + 1, cols.start + 1:cols.stop + 1] = top
+                self.frame[rows.stop, cols.start + 1:cols.stop + 1] = bottom
+                self.frame[rows.start + 1:rows.stop + 1, cols.start + 1] = left
+                self.frame[rows.start + 1:rows.stop + 1, cols.stop] = right
+        # Halo exchange and round 2: the spread of the seagrass into every tile
+        halos = [(m, self.seed, {i: halo_of(self.frame, self.tiles[i]) for i in range(k, len(self.tiles), len(self.connections))})
+                 for k in range(len(self.connections))]
+        self.call('spread', halos)
+        self.fresh_state = self.fresh_grid = False
+        if state or grid:
+            self.gather(grid)
+
+    def gather(self, grid=True):
+        """
+        Gather the states of the cells of every tile into the CA, and their variables if grid is True.
+        """
+        if self.fresh_state and (self.fresh_grid or not grid):
+            return
+        ca = self.ca
+        for tiles in self.call('gather', [(grid,)] * len(self.connections)):
+            for i, (state, tile_grid) in tiles.items():
+                ca.state[self.tiles[i]] = state
+                if grid:
+                    ca.grid[self.tiles[i]] = tile_grid
+        self.fresh_state = True
+        self.fresh_grid = self.fresh_grid or grid
+
+    def close(self):
+        for connection in self.connections:
+            try:
+                connection.send(None)
+            except OSError:
+                # The worker has already stopped
+                pass
+        for connection, worker in zip(self.connections, self.workers):
+            worker.join(timeout=10)
+            if worker.is_alive():
+                worker.terminate()
+                worker.join()
+            connection.close()
+        self.connections, self.workers = [], []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
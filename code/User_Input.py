@@ -1,11 +1,11 @@
 #!/usr/bin/env python3
 
 """
-This Python script, 'User_Input.py', is developed to handle user input for the parameters used in the simulation of seagrass growth using a Cellular Automaton (CA) model. The script allows users to modify the predefined parameters in the 'Parameters.py' module according to their specific requirements.
+This Python script, 'User_Input.py', is developed to handle user input for the parameters used in the simulation of seagrass growth using a Cellular Automaton (CA) model. The script allows users to change the predefined parameters in the 'Parameters.py' module according to their specific requirements, for one simulation at a time.
 
 The script contains one key function:
 
-1. 'User_Input': This function accepts user-defined values for various parameters used in the CA model. If a user provides a value for a parameter, the function overwrites the corresponding default value in the 'Parameters.py' module with the user-defined value. If the user does not provide a value, the function leaves the default value unchanged. The parameters that can be modified include indices for each variable, initial values for variables, and constants for different growth stages.
+1. 'User_Input': This function accepts user-defined values for various parameters used in the CA model. If a user provides a value for a parameter, the function uses it in place of the corresponding default value in the 'Parameters.py' module. If the user does not provide a value, the default value is used. The values are returned as one immutable 'Parameters.ModelParameters', which is given to a CA, so simulations with different values can run side by side. The parameters that can be modified include indices for each variable, initial values for variables, and constants for different growth stages.
 
 The script provides a flexible interface for users to customize the parameters of the CA model, thereby allowing users to simulate seagrass growth under different conditions and scenarios.
 """
@@ -23,11 +23,12 @@ def User_Input(N_IDX = None, P_IDX = None, C_IDX = None, CB_IDX = None, NB_IDX =
                NO3 = None, POP = None, SRP = None, R = None, P_ma_int = None, P_R_int = None, GROWTH_RATE = None, 
                germination_rate = None, reproduction_rate = None, temperature = None, oxygen = None, ORP_s = None, DO = None):
     """
-    Function to update the parameters in the Parameters module based on user input. 
+    Function to build the parameters of a simulation based on user input. 
     
     Each argument corresponds to a parameter in the Parameters module. If an argument is provided when calling 
-    the function, the corresponding parameter in the Parameters module will be overwritten with the new value. 
-    If an argument is not provided, the corresponding parameter in the Parameters module will remain unchanged.
+    the function, the returned parameters take the new value, otherwise they take the value of the Parameters module.
+    The Parameters module itself is left unchanged, except for the indices (N_IDX to M_IDX), which set the layout of
+    the variables of every cell and so are shared by all simulations.
     
     Parameters:
     N_IDX (int): Index for parameter N.
@@ -56,85 +57,17 @@ def User_Input(N_IDX = None, P_IDX = None, C_IDX = None, CB_IDX = None, NB_IDX =
     oxygen, ORP_s, DO: Oxygen-related parameters (Default: None, Units: mg/L)
     
     Returns:
-    None
+    Parameters.ModelParameters: The parameters, to be given to a CA, e.g. CA_Model.CA(100, 100, parameters=...).
     """
-    if N_IDX is not None:
-        Parameters.N_IDX = N_IDX
-        
-    if P_IDX is not None:
-        Parameters.P_IDX = P_IDX
-        
-    if C_IDX is not None:
-        Parameters.C_IDX = C_IDX
-        
-    if CB_IDX is not None:
-        Parameters.CB_IDX = CB_IDX
-        
-    if NB_IDX is not None:
-        Parameters.NB_IDX = NB_IDX
-        
-    if PB_IDX is not None:
-        Parameters.PB_IDX = PB_IDX
-        
-    if LIGHT_IDX is not None:
-        Parameters.LIGHT_IDX = LIGHT_IDX
-        
-    if R_IDX is not None:
-        Parameters.R_IDX = R_IDX
-        
-    if G_IDX is not None:
-        Parameters.G_IDX = G_IDX
-        
-    if M_IDX is not None:
-        Parameters.M_IDX = M_IDX
-        
-    if Nrint is not None:
-        Parameters.Nrint = Nrint
-        
-    if N_org is not None:
-        Parameters.N_org = N_org
-        
-    if NH4 is not None:
-        Parameters.NH4 = NH4
-        
-    if NO2 is not None:
-        Parameters.NO2 = NO2
-        
-    if NO3 is not None:
-        Parameters.NO3 = NO3
-        
-    if POP is not None:
-        Parameters.POP = POP
-        
-    if SRP is not None:
-        Parameters.SRP = SRP
-        
-    if R is not None:
-        Parameters.R = R
-        
-    if P_ma_int is not None:
-        Parameters.P_ma_int = P_ma_int
-        
-    if P_R_int is not None:
-        Parameters.P_R_int = P_R_int
-        
-    if GROWTH_RATE is not None:
-        Parameters.GROWTH_RATE = GROWTH_RATE
-        
-    if germination_rate is not None:
-        Parameters.germination_rate = germination_rate
-        
-    if reproduction_rate is not None:
-        Parameters.reproduction_rate = reproduction_rate
-        
-    if temperature is not None:
-        Parameters.temperature = temperature
-        
-    if oxygen is not None:
-        Parameters.oxygen = oxygen
-        
-    if ORP_s is not None:
-        Parameters.ORP_s = ORP_s
-        
-    if DO is not None:
-        Parameters.DO = DO
+    # The indices are the layout of the variables of every cell, shared by all simulations
+    indices = {'N_IDX': N_IDX, 'P_IDX': P_IDX, 'C_IDX': C_IDX, 'CB_IDX': CB_IDX, 'NB_IDX': NB_IDX, 'PB_IDX': PB_IDX,
+               'LIGHT_IDX': LIGHT_IDX, 'R_IDX': R_IDX, 'G_IDX': G_IDX, 'M_IDX': M_IDX}
+    for name, value in indices.items():
+        if value is not None:
+            setattr(Parameters, name, value)
+
+    # The values of the models, kept in the returned object instead of the Parameters module
+    values = {'Nrint': Nrint, 'N_org': N_org, 'NH4': NH4, 'NO2': NO2, 'NO3': NO3, 'POP': POP, 'SRP': SRP, 'R': R,
+              'P_ma_int': P_ma_int, 'P_R_int': P_R_int, 'GROWTH_RATE': GROWTH_RATE, 'germination_rate': germination_rate,
+              'reproduction_rate': reproduction_rate, 'temperature': temperature, 'oxygen': oxygen, 'ORP_s': ORP_s, 'DO': DO}
+    return Parameters.default_parameters(**{name: value for name, value in values.items() if value is not None})
@@ -0,0 +1,383 @@
+#!/usr/bin/env python3
+
+"""
+This Python script, 'cli.py', is the single command line entry point of the model, with one subcommand per task:
+
+1. 'run': Runs one CA, with the seasons of the year or the same parameters every week, and writes its final state, snapshots, images, animation and weekly metrics.
+
+2. 'sweep': Runs one CA for each value of one parameter, in a process pool, and prints the final coverage of each.
+
+3. 'ensemble': Runs independent replicates of the CA with 'Ensemble.run_ensemble' and prints the mean and spread of the final shares of each state.
+
+4. 'compare': Runs the same scenario under two solver profiles ('Solver_Profiles') and reports the speedup and the differences of coverage and of the variables of the cells.
+
+5. 'analyze': Summarises the results of earlier runs: metrics files ('Metrics.MetricsRecorder'), ensemble results, snapshot stores and folders of weekly images ('Image_Stats.ingest').
+
+Only argparse is imported when the script starts. numpy, scipy and the model are imported by the subcommand that needs them, so that 'python cli.py --help' and the help of every subcommand answer at once (see 'ColdStartBenchmark.py').
+
+Usage:
+    python cli.py run --weeks 52 --size 100 --seed 1 --metrics run.npy --output final_state.csv
+    python cli.py run --weeks 52 --engine surrogate --constant --surrogate-load surrogate.npz
+    python cli.py sweep temperature 10 15 20 25 --weeks 26 --processes 4
+    python cli.py ensemble --replicates 20 --weeks 52 --seed 1 --output ensemble.npy
+    python cli.py compare reference fast --weeks 10 --size 50 --evolving 0.3
+    python cli.py analyze run.npy ensemble.npy ./matrix ../results/5yrs_Scenario_images/Gray/RIS_5yrs_image
+"""
+
+__appname__ = 'cli'
+__author__ = 'ANQI WANG (aw222@ic.ac.uk)'
+__version__ = '0.0.1'
+__license__ = "None"
+
+import argparse
+
+# Names of the states, in the order of their codes (Parameters.EMPTY, GERMINATING and SEAGRASS)
+STATE_NAMES = ('Empty', 'Germinating', 'Seagrass')
+
+
+# Names of the solver profiles, as in Solver_Profiles.PROFILES
+PROFILE_NAMES = ('reference', 'balanced', 'fast')
+
+
+def add_ca_options(parser, profile=True):
+    # The options of the CA shared by the subcommands that run it, all but the solver profile if profile is False
+    parser.add_argument('--size', type=int, default=100, help="width and height of the grid (default 100)")
+    parser.add_argument('--weeks', type=int, default=260, help="number of weeks to run (default 260)")
+    parser.add_argument('--engine', choices=('cell', 'batch', 'surrogate'), default='cell')
+    parser.add_argument('--solver', choices=('bdf', 'rk4', 'dopri5'), default='bdf',
+                        help="solver of --engine batch: implicit BDF, or batched explicit Runge-Kutta (default bdf)")
+    parser.add_argument('--mode', choices=('split', 'coupled'), default='split',
+                        help="split: the three models solved one after the other; coupled: a different growth model "
+                             "where R and Nrint follow their own values, not a faster solver (default split)")
+    if profile:
+        parser.add_argument('--profile', choices=PROFILE_NAMES,
+                            help="solver profile of the models (default: odeint at its default tolerances)")
+    parser.add_argument('--transition', choices=('sequential', 'synchronous', 'frontier'), default='sequential')
+    parser.add_argument('--constant', action='store_true',
+                        help="use the values of the Parameters module every week instead of the seasons")
+    parser.add_argument('--interpolate', action='store_true',
+                        help="change the parameters linearly between the middles of the seasons")
+    parser.add_argument('--forcing', metavar='CSV', help="read the parameters of every week from a CSV file")
+
+
+def make_forcing(args):
+    '''
+    Build the Seasonal_Forcing.SeasonalForcing of the options, None with --constant
+    '''
+    if args.constant:
+        return None
+    import Seasonal_Forcing
+    if args.forcing is not None:
+        return Seasonal_Forcing.SeasonalForcing.from_csv(args.forcing, args.weeks)
+    return Seasonal_Forcing.SeasonalForcing.from_seasons(args.weeks, interpolate=args.interpolate)
+
+
+def surrogate_box(path):
+    '''
+    Read the box of --surrogate-box: the box of the evolving cells of every week of a snapshot store, or the lower and
+    upper corners in the two rows of a CSV file
+    '''
+    import os
+    import numpy as np
+    import Cell_Surrogate
+
+    if not os.path.isdir(path):
+        corners = np.loadtxt(path, delimiter=",", ndmin=2)
+        if corners.shape != (2, len(Cell_Surrogate.VARIABLES)):
+            raise ValueError(f"{path} must hold the lower and upper corners of the box in two rows of "
+                             f"{len(Cell_Surrogate.VARIABLES)} values, got shape {corners.shape}")
+        return corners[0], corners[1]
+    import Snapshot_Store
+    extremes = []
+    with Snapshot_Store.SnapshotStore(path) as store:
+        # The smallest and largest values of each week give the same box as all the cells, one week in memory at a time
+        for week in range(store.num_weeks):
+            grid = store.grid(week)
+            cells = grid[grid.all(axis=-1)]
+            if len(cells):
+                extremes += [cells.min(axis=0), cells.max(axis=0)]
+    return Cell_Surrogate.box_of(extremes)
+
+
+def make_surrogate(args):
+    '''
+    Build the Cell_Surrogate.SurrogateEngine of --surrogate-box or --surrogate-load, None for the default one of the CA
+    '''
+    if args.surrogate_box is None and args.surrogate_load is None:
+        return None
+    if args.engine != 'surrogate':
+        raise ValueError("--surrogate-box and --surrogate-load need --engine surrogate")
+    import Cell_Surrogate
+    if args.surrogate_load is None:
+        return Cell_Surrogate.SurrogateEngine(box=surrogate_box(args.surrogate_box))
+    if args.surrogate_box is not None:
+        raise ValueError("Give --surrogate-box or --surrogate-load, not both")
+    if not args.constant:
+        raise ValueError("A saved surrogate is fitted for one set of parameters, use --surrogate-load with --constant")
+    import Parameters
+    surrogate = Cell_Surrogate.CellSurrogate.load(args.surrogate_load)
+    if surrogate.mode != args.mode:
+        raise ValueError(f"{args.surrogate_load} was fitted in the {surrogate.mode} mode, not --mode {args.mode}")
+    return Cell_Surrogate.SurrogateEngine(surrogates={(Parameters.default_parameters(), args.mode): surrogate})
+
+
+def state_shares(state):
+    '''
+    Return the share of cells in each state of a grid of state codes
+    '''
+    import numpy as np
+    return np.bincount(state.ravel(), minlength=len(STATE_NAMES))[:len(STATE_NAMES)] / state.size
+
+
+def command_run(args):
+    import numpy as np
+    import CA_Model
+    import Metrics
+
+    cell_cache = None
+    if args.cell_cache is not None:
+        import Cell_Cache
+        cell_cache = Cell_Cache.CellCache(args.cell_cache, tolerance=args.cell_tolerance)
+    steady_state = None
+    if args.steady_tol is not None:
+        import Steady_State
+        steady_state = Steady_State.SteadyStateTracker(args.steady_tol)
+    ca = CA_Model.CA(args.size, args.size, plot_results=args.plot, engine=args.engine, mode=args.mode,
+                     solver=args.solver, profile=args.profile, transition=args.transition, rng=None if args.seed is None else np.random.default_rng(args.seed),
+                     snapshots=args.snapshots, frames=args.frames, animation=args.animation, forcing=make_forcing(args),
+                     cell_cache=cell_cache, steady_state=steady_state, surrogate=make_surrogate(args))
+    ca.initialize_grid()
+    collectors = Metrics.default_collectors() + ([Metrics.Frozen()] if steady_state is not None else [])
+    metrics = None if args.metrics is None else Metrics.MetricsRecorder(args.metrics, collectors)
+    final_state = ca.evolution(args.weeks, processes=args.processes, metrics=metrics)
+    for name, share in zip(STATE_NAMES, state_shares(ca.state)):
+        print(f"{name}: {share * 100:.2f}%")
+    for report in (ca.writer_report, ca.render_report, cell_cache and cell_cache.report(),
+                   ca.surrogate and ca.surrogate.report()):
+        if report is not None:
+            print(report)
+    if steady_state is not None:
+        print(f"Frozen at steady state: {np.nanmean(steady_state.weekly) * 100:.1f}% of the evolving cells a week on average"
+              if not np.isnan(steady_state.weekly).all() else "Frozen at steady state: no cell evolved")
+    if args.output is not None:
+        np.savetxt(args.output, final_state, delimiter=",")
+
+
+def sweep_point(name, value, size, weeks, seed, ca_args, constant, interpolate):
+    """
+    Run one CA of a sweep, with one parameter changed. Defined at the top level of the module so that a process
+    pool can run it.
+
+    Args:
+        name (str): The parameter, one of Parameters.PARAMETER_NAMES.
+        value (float): Its value.
+        size (int): The width and height of the grid.
+        weeks (int): The number of weeks to run.
+        seed (int): The seed of the random numbers of the CA, the same for every value of the sweep.
+        ca_args (dict): Other arguments of CA, e.g. engine or transition.
+        constant (bool): Whether the parameters are the same every week, or follow the seasons.
+        interpolate (bool): Whether the seasons change linearly (see 'SeasonalForcing.from_seasons').
+
+    Returns:
+        tuple: The value, and the share of cells in each state at the end of the run.
+    """
+    import numpy as np
+    import CA_Model
+    import Parameters
+    import Seasonal_Forcing
+
+    base = Parameters.default_parameters(**{name: value})
+    forcing = None
+    if not constant:
+        # The seasons set the parameter too, unless it is held at the value of the sweep
+        seasons = {season: {key: v for key, v in values.items() if key != name}
+                   for season, values in Parameters.SEASONS.items()}
+        forcing = Seasonal_Forcing.SeasonalForcing.from_seasons(weeks, interpolate=interpolate, seasons=seasons, base=base)
+    ca = CA_Model.CA(size, size, plot_results=False, rng=np.random.default_rng(seed), snapshots=None,
+                     parameters=base, forcing=forcing, **ca_args)
+    ca.initialize_grid()
+    ca.evolution(weeks)
+    return (value,) + tuple(state_shares(ca.state))
+
+
+def command_sweep(args):
+    from concurrent.futures import ProcessPoolExecutor
+    from functools import partial
+    import Parameters
+
+    if args.parameter not in Parameters.PARAMETER_NAMES:
+        raise ValueError(f"Unknown parameter '{args.parameter}', expected one of {Parameters.PARAMETER_NAMES}")
+    if args.forcing is not None:
+        raise ValueError("A sweep uses the seasons or --constant, not --forcing")
+    run = partial(sweep_point, args.parameter, size=args.size, weeks=args.weeks, seed=args.seed,
+                  ca_args={'engine': args.engine, 'mode': args.mode, 'transition': args.transition,
+                           'solver': args.solver, 'profile': args.profile},
+                  constant=args.constant, interpolate=args.interpolate)
+    if args.processes == 1:
+        rows = list(map(run, args.values))
+    else:
+        with ProcessPoolExecutor(args.processes) as executor:
+            rows = list(executor.map(run, args.values))
+    print(f"{args.parameter:>12} " + " ".join(f"{name:>11}" for name in STATE_NAMES))
+    for value, *shares in rows:
+        print(f"{value:>12g} " + " ".join(f"{share * 100:>10.2f}%" for share in shares))
+    if args.output is not None:
+        import numpy as np
+        np.savetxt(args.output, rows, delimiter=",", header=",".join((args.parameter,) + STATE_NAMES), comments='')
+
+
+def command_ensemble(args):
+    import numpy as np
+    import Ensemble
+
+    if args.forcing is not None:
+        raise ValueError("An ensemble uses the seasons or --constant, not --forcing")
+    results = Ensemble.run_ensemble(args.replicates, args.weeks, root_seed=args.seed, processes=args.processes,
+                                    width=args.size, height=args.size, path=args.output, engine=args.engine,
+                                    mode=args.mode, transition=args.transition, solver=args.solver,
+                                    profile=args.profile, forcing=make_forcing(args))
+    final = np.asarray(results[:, -1])
+    print(f"{args.replicates} replicates, week {args.weeks - 1}")
+    for i, name in enumerate(STATE_NAMES):
+        print(f"{name}: {final[:, i].mean() * 100:.2f}% (sd {final[:, i].std() * 100:.2f}%)")
+
+
+def command_compare(args):
+    import Solver_Profiles
+
+    if not 0 < args.evolving <= 1:
+        raise ValueError(f"--evolving must be above 0 and at most 1, got {args.evolving}")
+    comparison = Solver_Profiles.compare_profiles(args.baseline, args.candidate, size=args.size, weeks=args.weeks,
+                                                  seed=args.seed, evolving=args.evolving, engine=args.engine,
+                                                  mode=args.mode, solver=args.solver, transition=args.transition,
+                                                  forcing=make_forcing(args))
+    for profile in comparison.profiles:
+        print(profile)
+    print(comparison)
+
+
+def summarise(path, args):
+    '''
+    Return the lines of the summary of one result: a .npy file, a snapshot store or a folder of weekly images
+    '''
+    import os
+    import numpy as np
+
+    if path.endswith('.npy'):
+        values = np.load(path, mmap_mode='r')
+        if values.dtype.names is not None:
+            # Metrics written by a MetricsRecorder
+            import Metrics
+            values = Metrics.load_metrics(path)
+            if len(values) == 0:
+                return ["no week run yet"]
+            last = values[-1]
+            return [f"{len(values)} weeks, week {last['week']}: " +
+                    ", ".join(f"{name} {last[name]:.4g}" for name in values.dtype.names[1:])]
+        # Results of an ensemble, (replicates, weeks, 3)
+        final = np.asarray(values[:, -1])
+        done = ~np.isnan(final).any(axis=1)
+        return [f"{len(final)} replicates ({done.sum()} finished)"] + \
+               [f"{name}: {final[done, i].mean() * 100:.2f}% (sd {final[done, i].std() * 100:.2f}%)"
+                for i, name in enumerate(STATE_NAMES)]
+    if os.path.exists(os.path.join(path, 'meta.json')):
+        import Snapshot_Store
+        with Snapshot_Store.SnapshotStore(path) as store:
+            if store.num_weeks == 0:
+                return ["no week stored yet"]
+            shares = state_shares(store.state(store.num_weeks - 1))
+            return [f"{store.num_weeks} weeks, {store.meta['height']}x{store.meta['width']}, last week: " +
+                    ", ".join(f"{name} {share * 100:.2f}%" for name, share in zip(STATE_NAMES, shares))]
+    import Image_Stats
+    table = Image_Stats.ingest([path], processes=args.processes, cache=args.cache)[path]
+    if len(table) == 0:
+        return ["no weekly images"]
+    last = table[-1]
+    return [f"{len(table)} images, week {last['week']}: coverage {last['coverage']:.2f}%, "
+            f"germinating {last['germinating']:.2f}%"]
+
+
+def command_analyze(args):
+    for path in args.paths:
+        print(f"{path}:")
+        for line in summarise(path, args):
+            print(f"  {line}")
+
+
+def build_parser():
+    '''
+    Build the parser of the command line, with one subparser per subcommand
+    '''
+    parser = argparse.ArgumentParser(prog='cli.py', description="Seagrass growth cellular automata")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run = commands.add_parser('run', help="run one CA")
+    add_ca_options(run)
+    run.add_argument('--seed', type=int, help="seed of the random numbers (the global np.random functions if omitted)")
+    run.add_argument('--processes', type=int,
+                     help="split the grid into tiles run by this many processes (with --transition synchronous)")
+    run.add_argument('--plot', action='store_true', help="show the grid every week")
+    run.add_argument('--snapshots', metavar='FOLDER', help="write the weekly snapshots into a snapshot store")
+    run.add_argument('--frames', metavar='FOLDER', help="render the weekly images into a folder")
+    run.add_argument('--animation', metavar='FILE', help="append the weekly frames to a .gif or .pdf file")
+    run.add_argument('--metrics', metavar='FILE', help="write the weekly metrics into a .npy file")
+    run.add_argument('--output', metavar='CSV', help="save the final state into a CSV file")
+    run.add_argument('--cell-cache', type=int, metavar='ENTRIES',
+                     help="with --engine cell, solve each group of identical cells once and keep this many results")
+    run.add_argument('--cell-tolerance', type=float, help="group the cells whose variables differ by less than this")
+    run.add_argument('--steady-tol', type=float,
+                     help="with --engine cell, stop solving the nutrients of the cells whose derivatives are below this")
+    run.add_argument('--surrogate-box', metavar='PATH',
+                     help="with --engine surrogate, fit over the box of the cells of a snapshot store, or of a CSV file "
+                          "with its lower and upper corners in two rows (default: the box of the cells of each day)")
+    run.add_argument('--surrogate-load', metavar='NPZ',
+                     help="with --engine surrogate and --constant, use a surrogate saved by CellSurrogate.save")
+    run.set_defaults(handler=command_run)
+
+    sweep = commands.add_parser('sweep', help="run one CA for each value of one parameter")
+    sweep.add_argument('parameter', help="the parameter to change, one of Parameters.PARAMETER_NAMES")
+    sweep.add_argument('values', type=float, nargs='+', help="its values")
+    add_ca_options(sweep)
+    sweep.add_argument('--seed', type=int, default=0, help="seed of the random numbers of every run (default 0)")
+    sweep.add_argument('--processes', type=int, help="number of worker processes (default: number of cores)")
+    sweep.add_argument('--output', metavar='CSV', help="save the final shares of each value into a CSV file")
+    sweep.set_defaults(handler=command_sweep)
+
+    ensemble = commands.add_parser('ensemble', help="run independent replicates of the CA")
+    add_ca_options(ensemble)
+    ensemble.add_argument('--replicates', type=int, default=10, help="number of replicates (default 10)")
+    ensemble.add_argument('--seed', type=int, help="root seed of the ensemble")
+    ensemble.add_argument('--processes', type=int, help="number of worker processes (default: number of cores)")
+    ensemble.add_argument('--output', metavar='FILE', help="keep the weekly shares in a .npy file")
+    ensemble.set_defaults(handler=command_ensemble)
+
+    compare = commands.add_parser('compare', help="run one scenario under two solver profiles and compare them")
+    compare.add_argument('baseline', choices=PROFILE_NAMES, help="the profile the other one is compared with")
+    compare.add_argument('candidate', choices=PROFILE_NAMES, help="the profile compared with the baseline")
+    add_ca_options(compare, profile=False)
+    compare.add_argument('--seed', type=int, default=0, help="seed of the random numbers of both runs (default 0)")
+    compare.add_argument('--evolving', type=float, default=0.3,
+                         help="share of the cells started from the initial values of the models on a float grid, so "
+                              "that their ODEs are solved from the first week, above 0 (default 0.3)")
+    compare.set_defaults(handler=command_compare)
+
+    analyze = commands.add_parser('analyze', help="summarise the results of earlier runs")
+    analyze.add_argument('paths', nargs='+',
+                         help="metrics or ensemble .npy files, snapshot stores, or folders of week_N.png images")
+    analyze.add_argument('--processes', type=int, help="number of processes counting the images")
+    analyze.add_argument('--cache', default='image_stats.json', help="cache of the image counts (default image_stats.json)")
+    analyze.set_defaults(handler=command_analyze)
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    try:
+        args.handler(args)
+    except ValueError as error:
+        parser.error(str(error))
+
+
+if __name__ == "__main__":
+    main()
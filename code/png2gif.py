@@ -6,6 +6,7 @@ Script to Create a GIF from PNG Images
 This script takes multiple PNG images from a specified directory, 
 filters them based on their filename ending with '_week.png', 
 and then creates a GIF animation from these images.
+The images are appended to the GIF one at a time with 'Animation.AnimationWriter'.
 
 Requirements:
 - PIL (Pillow) library for image manipulation.
@@ -19,32 +20,42 @@ Author: Your Name
 Date: Date of Creation
 """
 
-from PIL import Image
 import os
 
+# PIL and Animation are imported in main, so that importing this module has no side effects
+
 # Define the directory where the images are saved
 image_dir = '../results/Scenario_output/RIS/RIS_image'
 
-# List all files in the directory without any filtering
-all_files_in_subfolder = os.listdir(image_dir)
+# The GIF to create
+gif_path = '../results/RIS_output.gif'
+
 
-# Filter the filenames to include only those that start with 'week_' and end with '.png'
-image_files = [f for f in all_files_in_subfolder if f.startswith('week_') and f.endswith('.png')]
+def main(image_dir=image_dir, gif_path=gif_path):
+    """
+    Append the 'week_*.png' images of image_dir to one GIF.
+    """
+    from PIL import Image
 
-# Sort the image files
-image_files = sorted(image_files)
+    from Animation import AnimationWriter
 
-# Create a list to hold Image objects
-images = []
+    # List all files in the directory without any filtering
+    all_files_in_subfolder = os.listdir(image_dir)
 
-# Load all the images
-for filename in image_files:
-    images.append(Image.open(os.path.join(image_dir, filename)))
+    # Filter the filenames to include only those that start with 'week_' and end with '.png'
+    image_files = [f for f in all_files_in_subfolder if f.startswith('week_') and f.endswith('.png')]
 
-# Create the GIF
-gif_path = '../results/RIS_output.gif'
-images[0].save(gif_path,
-               save_all=True,
-               append_images=images[1:],
-               loop=0,  # 0 for infinite loop
-               duration=300)  # Duration for each frame in milliseconds
+    # Sort the image files
+    image_files = sorted(image_files)
+
+    # Create the GIF, one image at a time, so that only one image is held in memory
+    with AnimationWriter(gif_path,
+                         loop=0,  # 0 for infinite loop
+                         duration=300) as gif:  # Duration for each frame in milliseconds
+        for filename in image_files:
+            with Image.open(os.path.join(image_dir, filename)) as image:
+                gif.append(image)
+
+
+if __name__ == "__main__":
+    main()